@@ -0,0 +1,350 @@
+import asyncio
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+# Admission configuration (overridable through the environment / .env file)
+MAX_QUEUE_DEPTH = int(os.getenv("MINDFLOW_MAX_QUEUE_DEPTH", "64"))
+MAX_QUEUE_WAIT = float(os.getenv("MINDFLOW_MAX_QUEUE_WAIT", "30"))
+GLOBAL_TPM = int(os.getenv("MINDFLOW_GLOBAL_TPM", "0"))  # 0 disables the budget
+CLIENT_TPM = int(os.getenv("MINDFLOW_CLIENT_TPM", "0"))  # 0 disables the budget
+STATE_PATH = os.getenv("MINDFLOW_STATE_PATH", "")  # SQLite file shared by workers; unset keeps budgets per process
+
+# Idle per-client buckets are pruned once this many clients have been seen
+MAX_TRACKED_CLIENTS = 10000
+# Shared bucket state drops refilled buckets every this many charges
+PRUNE_EVERY = 1000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused before reaching the LLM"""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Tokens-per-minute budget that refills continuously"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """Return unused tokens; a negative amount charges extra usage"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+BucketSpec = Tuple[str, float, float]  # (name, capacity, tokens per second)
+
+
+class BucketState:
+    """Token bucket levels in a SQLite file shared by every worker process.
+
+    Checking the budgets and charging them is one short ``BEGIN IMMEDIATE``
+    transaction over all of a request's buckets, so concurrent workers can
+    never both pass the check and overdraw a budget; reads don't write.
+    Levels use wall-clock time and therefore also survive restarts. The
+    calls block on the file lock, so callers on the event loop run them in
+    a thread.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+            "updated REAL NOT NULL, capacity REAL NOT NULL, rate REAL NOT NULL)"
+        )
+        self._charges = 0
+
+    def _levels(self, buckets: List[BucketSpec], now: float) -> List[float]:
+        levels = []
+        for name, capacity, rate in buckets:
+            row = self._conn.execute(
+                "SELECT tokens, updated FROM token_buckets WHERE name = ?", (name,)
+            ).fetchone()
+            levels.append(capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate))
+        return levels
+
+    def _write(self, buckets: List[BucketSpec], levels: List[float], now: float):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO token_buckets (name, tokens, updated, capacity, rate) VALUES (?, ?, ?, ?, ?)",
+            [(name, tokens, now, capacity, rate) for (name, capacity, rate), tokens in zip(buckets, levels)],
+        )
+
+    def level(self, name: str, capacity: float, rate: float) -> float:
+        """Current level of bucket ``name`` (read-only)"""
+        with self._lock:
+            return self._levels([(name, capacity, rate)], time.time())[0]
+
+    def take(self, buckets: List[BucketSpec], amount: float) -> float:
+        """Charge ``amount`` to every bucket if all of them hold enough and
+        return 0; otherwise charge none and return the seconds until they would"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            levels = self._levels(buckets, now)
+            charges = [min(amount, capacity) for _, capacity, _ in buckets]
+            wait = max(
+                ((charge - tokens) / rate for (_, _, rate), tokens, charge in zip(buckets, levels, charges)),
+                default=0.0,
+            )
+            if wait > 0:
+                return wait
+            self._write(buckets, [tokens - charge for tokens, charge in zip(levels, charges)], now)
+            self._charges += 1
+            if self._charges % PRUNE_EVERY == 0:
+                # Forget buckets that have refilled completely
+                self._conn.execute(
+                    "DELETE FROM token_buckets WHERE tokens + (? - updated) * rate >= capacity", (now,)
+                )
+        return 0.0
+
+    def refund(self, buckets: List[BucketSpec], amount: float):
+        """Return unused tokens to every bucket; a negative amount charges extra usage"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            levels = self._levels(buckets, now)
+            self._write(buckets, [min(capacity, tokens + amount) for (_, capacity, _), tokens in zip(buckets, levels)], now)
+
+
+class SharedTokenBucket:
+    """TokenBucket whose level lives in a BucketState; the controller
+    charges and refunds it through the BucketState, in a thread"""
+
+    def __init__(self, state: BucketState, name: str, tokens_per_minute: int):
+        self.state = state
+        self.name = name
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+
+    @property
+    def spec(self) -> BucketSpec:
+        return (self.name, self.capacity, self.rate)
+
+    @property
+    def tokens(self) -> float:
+        return self.state.level(self.name, self.capacity, self.rate)
+
+    @property
+    def full(self) -> bool:
+        return self.tokens >= self.capacity
+
+
+Bucket = Union[TokenBucket, SharedTokenBucket]
+
+
+class Ticket:
+    """An admitted request holding one LLM slot until released"""
+
+    def __init__(self, controller: "AdmissionController", client_id: str, tokens: int):
+        self._controller = controller
+        self.client_id = client_id
+        self.reserved_tokens = tokens
+        self.used_tokens: Optional[int] = None
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self._controller._release(self)
+
+    async def __aenter__(self) -> "Ticket":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """Gatekeeper in front of the LLM.
+
+    Requests are charged an estimated token cost against a global and a
+    per-client tokens-per-minute budget, then wait in a priority queue for
+    one of ``max_concurrency`` slots (higher ``priority`` runs first). When
+    the queue is full or a budget is exhausted the request is rejected at
+    once with a retry hint rather than piling up behind the upstream limit.
+
+    Slots are per worker process. With ``state_path`` the token budgets
+    are kept in that SQLite file instead, so they hold across all workers.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_depth: int = MAX_QUEUE_DEPTH,
+        max_queue_wait: float = MAX_QUEUE_WAIT,
+        global_tpm: int = GLOBAL_TPM,
+        client_tpm: int = CLIENT_TPM,
+        state_path: str = STATE_PATH,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_queue_wait = max_queue_wait
+        self.client_tpm = client_tpm
+        self._available = max_concurrency
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._queue_depth = 0
+        self._state = BucketState(state_path) if state_path and (global_tpm or client_tpm) else None
+        self._global = self._bucket("global", global_tpm) if global_tpm else None
+        self._clients: Dict[str, Bucket] = {}
+        self._global_level: Optional[float] = None  # last read level of a shared global bucket
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue_depth
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_concurrency - self._available
+
+    def _bucket(self, name: str, tokens_per_minute: int) -> Bucket:
+        if self._state is not None:
+            return SharedTokenBucket(self._state, name, tokens_per_minute)
+        return TokenBucket(tokens_per_minute)
+
+    def _client_bucket(self, client_id: str) -> Optional[Bucket]:
+        if not self.client_tpm:
+            return None
+        bucket = self._clients.get(client_id)
+        if bucket is None:
+            if len(self._clients) >= MAX_TRACKED_CLIENTS:
+                if self._state is not None:
+                    self._clients = {}  # the BucketState prunes its own rows
+                else:
+                    self._clients = {k: b for k, b in self._clients.items() if not b.full}
+            bucket = self._clients[client_id] = self._bucket(f"client:{client_id}", self.client_tpm)
+        return bucket
+
+    def _reject(self, detail: str, retry_after: float):
+        self.rejected += 1
+        raise AdmissionRejected(detail, retry_after)
+
+    async def acquire(self, client_id: str = "anonymous", priority: int = 0, tokens: int = 0) -> Ticket:
+        """Charge ``tokens`` to the budgets and wait for a free slot"""
+        if self._available <= 0 and self._queue_depth >= self.max_queue_depth:
+            self._reject("Server is busy. Please retry shortly.", self.max_queue_wait / 2)
+
+        buckets = [b for b in (self._global, self._client_bucket(client_id)) if b is not None]
+        if self._state is not None:
+            wait = await asyncio.to_thread(self._state.take, [b.spec for b in buckets], tokens)
+        else:
+            wait = max((b.wait_time(tokens) for b in buckets), default=0.0)
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.consume(tokens)
+        if wait > 0:
+            self._reject("Token budget exhausted. Please retry later.", wait)
+        ticket = Ticket(self, client_id, tokens)
+
+        if self._available > 0 and not self._queue_depth:
+            self._available -= 1
+            return ticket
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._seq), waiter))
+        self._queue_depth += 1
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.max_queue_wait)
+        except BaseException:
+            self._abandon(waiter, ticket)
+            raise
+        if not done:
+            self._abandon(waiter, ticket)
+            self._reject("Timed out waiting in the request queue.", self.max_queue_wait / 2)
+        return ticket
+
+    def _abandon(self, waiter: asyncio.Future, ticket: Ticket):
+        """Give back the budget (and the slot, if it was already handed over)"""
+        if waiter.done() and not waiter.cancelled():
+            ticket.release()
+            return
+        waiter.cancel()
+        self._queue_depth -= 1
+        ticket.used_tokens = 0
+        self._settle(ticket)
+
+    def _settle(self, ticket: Ticket):
+        """Refund the difference between reserved and actually used tokens"""
+        if ticket.used_tokens is None:
+            return
+        unused = ticket.reserved_tokens - ticket.used_tokens
+        buckets = [b for b in (self._global, self._client_bucket(ticket.client_id)) if b is not None]
+        if self._state is None:
+            for bucket in buckets:
+                bucket.refund(unused)
+        elif buckets and unused:
+            specs = [b.spec for b in buckets]
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self._state.refund, specs, unused)
+            except RuntimeError:  # no event loop (released from a plain thread)
+                self._state.refund(specs, unused)
+
+    def _release(self, ticket: Ticket):
+        self._settle(ticket)
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self._queue_depth -= 1
+                waiter.set_result(None)
+                return
+        self._available += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Counters and budget levels; never blocks, so a shared global
+        budget is reported as of the last ``astats`` call"""
+        if isinstance(self._global, SharedTokenBucket):
+            global_tokens = self._global_level
+        else:
+            global_tokens = self._global.tokens if self._global else None
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self._queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "rejected": self.rejected,
+            "global_tokens_available": global_tokens,
+        }
+
+    async def astats(self) -> Dict[str, float]:
+        """``stats`` with the shared global budget level read in a thread"""
+        if isinstance(self._global, SharedTokenBucket):
+            self._global_level = await asyncio.to_thread(lambda: self._global.tokens)
+        return self.stats()
@@ -0,0 +1,300 @@
+import threading
+from collections import deque
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Node fields that change the graph structure and force a full rebuild
+STRUCTURAL_FIELDS = ("dependencies", "type")
+
+
+def deadline_ordinal(value: Optional[str]) -> float:
+    """Day number of a YYYY-MM-DD deadline, NaN when missing or malformed"""
+    try:
+        return float(date.fromisoformat(value[:10]).toordinal())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def as_cost(value) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class GraphAnalytics:
+    """Array-backed analytics over one workflow graph.
+
+    Edges come from both ``edges`` (source -> target) and each node's
+    ``dependencies`` (dependency -> node). Costs are held in numpy arrays
+    and rolled up per weakly connected component, node type and status;
+    cost and status edits adjust those rollups in place, deadline edits
+    only invalidate the schedule, and dependency/type edits need a rebuild.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        self.ids = [n["id"] for n in nodes]
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+        n = len(self.ids)
+
+        pairs = set()
+        for edge in edges:
+            s, t = self.index.get(edge.get("source")), self.index.get(edge.get("target"))
+            if s is not None and t is not None:
+                pairs.add((s, t))
+        for i, node in enumerate(nodes):
+            for dep in node.get("dependencies") or []:
+                s = self.index.get(dep)
+                if s is not None:
+                    pairs.add((s, i))
+        self.edge_count = len(pairs)
+        self.succ: List[List[int]] = [[] for _ in range(n)]
+        self.pred: List[List[int]] = [[] for _ in range(n)]
+        for s, t in pairs:
+            self.succ[s].append(t)
+            self.pred[t].append(s)
+
+        self.order, self.cycle_nodes = self._topological_order()
+        self.component = self._components()
+        self.component_count = int(self.component.max()) + 1 if n else 0
+
+        self.deadline = np.array([deadline_ordinal(n.get("deadline")) for n in nodes], dtype=np.float64)
+        self.estimated = np.array([as_cost(n.get("estimated_cost")) for n in nodes], dtype=np.float64)
+        self.actual = np.array([as_cost(n.get("actual_cost")) for n in nodes], dtype=np.float64)
+        self.type_labels, type_codes = np.unique(
+            np.array([str(n.get("type") or "") for n in nodes], dtype=object), return_inverse=True
+        )
+        self.type_code = type_codes.astype(np.int64)
+        self.status_labels = sorted({str(n.get("status") or "") for n in nodes})
+        status_index = {label: i for i, label in enumerate(self.status_labels)}
+        self.status_code = np.array(
+            [status_index[str(n.get("status") or "")] for n in nodes], dtype=np.int64
+        )
+
+        self._rollups = {
+            "component": self._rollup(self.component, self.component_count),
+            "type": self._rollup(self.type_code, len(self.type_labels)),
+            "status": self._rollup(self.status_code, len(self.status_labels)),
+        }
+        self._schedule: Optional[Dict[str, Any]] = None
+
+    # ----- structure -----
+
+    def _topological_order(self) -> Tuple[List[int], List[int]]:
+        """Kahn's algorithm; nodes left over are on (or behind) a cycle"""
+        indegree = [len(p) for p in self.pred]
+        queue = deque(i for i, d in enumerate(indegree) if d == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for t in self.succ[i]:
+                indegree[t] -= 1
+                if indegree[t] == 0:
+                    queue.append(t)
+        remaining = [i for i, d in enumerate(indegree) if d > 0]
+        return order, remaining
+
+    def _components(self) -> np.ndarray:
+        """Weakly connected component label per node"""
+        component = np.full(len(self.ids), -1, dtype=np.int64)
+        label = 0
+        for start in range(len(self.ids)):
+            if component[start] >= 0:
+                continue
+            component[start] = label
+            stack = [start]
+            while stack:
+                i = stack.pop()
+                for j in self.succ[i] + self.pred[i]:
+                    if component[j] < 0:
+                        component[j] = label
+                        stack.append(j)
+            label += 1
+        return component
+
+    # ----- costs -----
+
+    def _rollup(self, codes: np.ndarray, size: int) -> np.ndarray:
+        """(size, 2) array of estimated / actual cost sums per group"""
+        return np.stack(
+            [
+                np.bincount(codes, weights=self.estimated, minlength=size),
+                np.bincount(codes, weights=self.actual, minlength=size),
+            ],
+            axis=1,
+        )
+
+    def _move_costs(self, i: int, est_delta: float, act_delta: float, codes=None):
+        codes = codes or {
+            "component": self.component[i],
+            "type": self.type_code[i],
+            "status": self.status_code[i],
+        }
+        for name, code in codes.items():
+            self._rollups[name][code, 0] += est_delta
+            self._rollups[name][code, 1] += act_delta
+
+    def update_nodes(self, changes: List[Dict[str, Any]]) -> bool:
+        """Apply changed node fields in place.
+
+        Returns False when a change affects the graph structure (or names an
+        unknown node) and the analytics have to be rebuilt instead.
+        """
+        for change in changes:
+            i = self.index.get(change["id"])
+            if i is None or any(field in change for field in STRUCTURAL_FIELDS):
+                return False
+            if "estimated_cost" in change or "actual_cost" in change:
+                est = as_cost(change.get("estimated_cost", self.estimated[i]))
+                act = as_cost(change.get("actual_cost", self.actual[i]))
+                self._move_costs(i, est - self.estimated[i], act - self.actual[i])
+                self.estimated[i], self.actual[i] = est, act
+            if "status" in change:
+                status = str(change["status"] or "")
+                if status not in self.status_labels:
+                    self.status_labels.append(status)
+                    self._rollups["status"] = np.vstack([self._rollups["status"], np.zeros((1, 2))])
+                old = self.status_code[i]
+                new = self.status_labels.index(status)
+                self._move_costs(i, -self.estimated[i], -self.actual[i], {"status": old})
+                self._move_costs(i, self.estimated[i], self.actual[i], {"status": new})
+                self.status_code[i] = new
+            if "deadline" in change:
+                self.deadline[i] = deadline_ordinal(change["deadline"])
+                self._schedule = None
+        return True
+
+    def cost_rollups(self) -> Dict[str, Any]:
+        def groups(name: str, labels) -> Dict[str, Dict[str, float]]:
+            sums = self._rollups[name]
+            return {
+                str(label): {
+                    "estimated": float(sums[k, 0]),
+                    "actual": float(sums[k, 1]),
+                    "variance": float(sums[k, 1] - sums[k, 0]),
+                }
+                for k, label in enumerate(labels)
+            }
+
+        estimated, actual = float(self.estimated.sum()), float(self.actual.sum())
+        return {
+            "total": {"estimated": estimated, "actual": actual, "variance": actual - estimated},
+            "by_component": groups("component", range(self.component_count)),
+            "by_type": groups("type", self.type_labels),
+            "by_status": groups("status", self.status_labels),
+        }
+
+    # ----- schedule -----
+
+    def schedule(self) -> Dict[str, Any]:
+        """Critical path and per-node slack (in days) derived from deadlines.
+
+        A node's duration is the gap between its deadline and the latest
+        deadline among its predecessors (zero without a deadline). Forward
+        and backward passes over the topological order give earliest/latest
+        finish times; nodes with zero slack form the critical path.
+        """
+        if self._schedule is not None:
+            return self._schedule
+        if self.cycle_nodes:
+            self._schedule = {"critical_path": [], "project_duration_days": None, "slack_days": {}}
+            return self._schedule
+
+        n = len(self.ids)
+        duration = np.zeros(n)
+        for i in self.order:
+            if np.isnan(self.deadline[i]):
+                continue
+            previous = [self.deadline[p] for p in self.pred[i] if not np.isnan(self.deadline[p])]
+            if previous:
+                duration[i] = max(0.0, self.deadline[i] - max(previous))
+
+        earliest_finish = np.zeros(n)
+        for i in self.order:
+            start = max((earliest_finish[p] for p in self.pred[i]), default=0.0)
+            earliest_finish[i] = start + duration[i]
+        total = float(earliest_finish.max()) if n else 0.0
+
+        latest_finish = np.full(n, total)
+        for i in reversed(self.order):
+            if self.succ[i]:
+                latest_finish[i] = min(latest_finish[s] - duration[s] for s in self.succ[i])
+        slack = latest_finish - earliest_finish
+
+        critical = np.isclose(slack, 0.0)
+        path = []
+        current = next(
+            (i for i in self.order if critical[i] and not any(critical[p] for p in self.pred[i])),
+            None,
+        )
+        while current is not None:
+            path.append(self.ids[current])
+            current = next(
+                (
+                    s for s in self.succ[current]
+                    if critical[s] and np.isclose(earliest_finish[current], earliest_finish[s] - duration[s])
+                ),
+                None,
+            )
+
+        self._schedule = {
+            "critical_path": path,
+            "project_duration_days": total,
+            "slack_days": {node_id: float(slack[i]) for i, node_id in enumerate(self.ids)},
+        }
+        return self._schedule
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "node_count": len(self.ids),
+            "edge_count": self.edge_count,
+            "has_cycle": bool(self.cycle_nodes),
+            "cycle_nodes": [self.ids[i] for i in self.cycle_nodes],
+            "topological_order": [] if self.cycle_nodes else [self.ids[i] for i in self.order],
+            **self.schedule(),
+            "costs": self.cost_rollups(),
+        }
+
+
+class AnalyticsCache:
+    """GraphAnalytics per workflow, tagged with the workflow version it reflects"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, GraphAnalytics]] = {}
+
+    def report(
+        self, workflow_id: str, version: int, load: Callable[[], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Analytics report for ``version`` of a workflow, rebuilding it via ``load`` on a miss"""
+        with self._lock:
+            entry = self._entries.get(workflow_id)
+            if entry is None or entry[0] != version:
+                workflow = load()
+                if workflow is None:
+                    return None
+                entry = (workflow["version"], GraphAnalytics(workflow["nodes"], workflow["edges"]))
+                self._entries[workflow_id] = entry
+            return {"workflow_id": workflow_id, "version": entry[0], **entry[1].report()}
+
+    def apply_patch(self, workflow_id: str, patch: Dict[str, Any]):
+        """Roll a cached entry forward by one node patch, or drop it"""
+        with self._lock:
+            entry = self._entries.pop(workflow_id, None)
+            if entry is None or not patch["nodes"]:
+                if entry is not None:
+                    self._entries[workflow_id] = entry
+                return
+            version, analytics = entry
+            if version == patch["version"] - 1 and analytics.update_nodes(patch["nodes"]):
+                self._entries[workflow_id] = (patch["version"], analytics)
+
+    def invalidate(self, workflow_id: str):
+        with self._lock:
+            self._entries.pop(workflow_id, None)
+
+
+analytics_cache = AnalyticsCache()
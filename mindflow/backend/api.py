@@ -1,18 +1,65 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
-import openai
+from fastapi import FastAPI, HTTPException, Depends, Request, Query, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError, model_validator
 import os
+import importlib
+import hashlib
+import gc
+from contextlib import contextmanager
 from dotenv import load_dotenv
-import json
-from typing import List, Dict, Optional
+import orjson
+import math
+import asyncio
+import threading
+import uuid
+from typing import Any, List, Dict, Optional, Set, Tuple
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse, ORJSONResponse
+from starlette.background import BackgroundTask
+from datetime import date, datetime
 
-# Load environment variables and configure OpenAI
+# Load environment variables before the LLM client reads its configuration
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-app = FastAPI(title="MindFlow API", version="1.0.0")
+from llm import (
+    get_llm_client, close_llm_client, retry_after_seconds, continuation_messages,
+    strip_code_fence, strip_leading_fence, upstream_errors, LLM_MAX_CONTINUATIONS, LLM_MAX_CONCURRENCY,
+)
+from admission import AdmissionRejected, MAX_QUEUE_DEPTH
+from store import get_workflow_store, WorkflowNotFound, NodeNotFound, VersionConflict
+from analytics import analytics_cache
+from portfolio import portfolio
+from layout import layout_engine
+from cache import workflow_cache, make_cache_key
+from stream_parser import WorkflowStreamParser
+from wire import (
+    SYSTEM_PROMPT, wire_workflow_validator, wire_node_validator, wire_edge_validator,
+    expand_edge, expand_edges, link_dependencies,
+)
+from hierarchy import OUTLINE_PROMPT, parse_outline, phase_request, stitch_phases
+from collab import collab_hub, Subscriber, encode as collab_frame
+from similarity import (
+    similarity_index, same_term_order, SIMILARITY_THRESHOLD, SIMILARITY_EXAMPLE_MIN_SCORE, SIMILARITY_EXAMPLES,
+    SIMILARITY_POLL_INTERVAL,
+)
+from render import get_render_service, RenderError, MEDIA_TYPES
+from metrics import (
+    registry, stage, MetricsMiddleware, Gauge, CallbackCounter,
+    ERRORS, SALVAGED, LLM_CONTINUATIONS, SIMILARITY_LOOKUPS,
+)
+
+app = FastAPI(title="MindFlow API", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Sampling parameters for workflow generation (part of the cache key)
+GENERATION_PARAMS = {"temperature": 0.7, "max_tokens": 2000}
+# Workflows cached under an older system prompt are not reused once it changes
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + OUTLINE_PROMPT).encode("utf-8")).hexdigest()[:12]
+
+# Largest number of requests accepted by /generate-workflows
+BATCH_MAX_SIZE = int(os.getenv("MINDFLOW_BATCH_MAX_SIZE", "100"))
+# Batch requests generated at once across all batches; the rest of the LLM
+# slots and the admission queue stay free for interactive requests
+BATCH_CONCURRENCY = int(os.getenv("MINDFLOW_BATCH_CONCURRENCY", str(max(1, LLM_MAX_CONCURRENCY // 2))))
+batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
 
 # Configure CORS
 app.add_middleware(
@@ -23,19 +70,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure OpenAI
-openai.api_key = os.getenv('OPENAI_API_KEY')
+# Request latency histograms plus Server-Timing for requests sending X-MindFlow-Trace
+app.add_middleware(MetricsMiddleware)
+
+def cache_stat(name: str):
+    return lambda: workflow_cache.stats()[name]
+
+def admission_stat(name: str):
+    return lambda: get_llm_client().admission.stats()[name]
+
+registry.register(CallbackCounter(
+    "mindflow_cache_hits_total", "Generated-workflow cache hits (memory and disk)", cache_stat("hits")
+))
+registry.register(CallbackCounter(
+    "mindflow_cache_disk_hits_total", "Generated-workflow cache hits served by the disk tier", cache_stat("disk_hits")
+))
+registry.register(CallbackCounter(
+    "mindflow_cache_misses_total", "Generated-workflow cache misses", cache_stat("misses")
+))
+registry.register(Gauge("mindflow_cache_hit_ratio", "Cache hits / lookups since start", cache_stat("hit_rate")))
+registry.register(Gauge("mindflow_cache_entries", "Workflows held in the in-memory cache", cache_stat("entries")))
+registry.register(Gauge("mindflow_similarity_entries", "Prompts in the similarity index", lambda: len(similarity_index)))
+registry.register(Gauge(
+    "mindflow_collab_subscribers", "Open collaboration WebSockets", lambda: collab_hub.stats()["subscribers"]
+))
+registry.register(Gauge("mindflow_llm_in_flight", "LLM calls currently running", admission_stat("in_flight")))
+registry.register(Gauge("mindflow_llm_queue_depth", "Requests waiting for an LLM slot", admission_stat("queue_depth")))
+registry.register(CallbackCounter(
+    "mindflow_admission_rejected_total", "Requests rejected by the admission layer", admission_stat("rejected")
+))
+
+# Background warm-up started with each worker; /ready answers 503 until it is done
+warm_up_task: Optional[asyncio.Task] = None
+# Picks up prompts cached or saved by the other workers (see SIMILARITY_POLL_INTERVAL)
+similarity_poll_task: Optional[asyncio.Task] = None
+
+async def warm_up():
+    """Open the workflow store, load the portfolio columns, the similarity index
+    and the OpenAI SDK off the event loop, so the worker accepts connections at
+    once and the first requests don't pay for them"""
+    await asyncio.to_thread(portfolio.sync, get_workflow_store())
+    await asyncio.to_thread(rebuild_similarity_index)
+    await asyncio.to_thread(importlib.import_module, "openai")
+    get_llm_client()
+    global similarity_poll_task
+    if SIMILARITY_POLL_INTERVAL > 0:
+        similarity_poll_task = asyncio.create_task(poll_similarity_index())
+
+async def poll_similarity_index():
+    while True:
+        await asyncio.sleep(SIMILARITY_POLL_INTERVAL)
+        try:
+            await asyncio.to_thread(sync_similarity_index)
+        except Exception as e:
+            print(f"Failed to refresh the similarity index: {e}")
+
+@app.on_event("startup")
+async def check_batch_limits():
+    """Refuse to start when batches alone could fill the admission layer"""
+    capacity = LLM_MAX_CONCURRENCY + MAX_QUEUE_DEPTH
+    if not 1 <= BATCH_CONCURRENCY < capacity:
+        raise RuntimeError(
+            f"MINDFLOW_BATCH_CONCURRENCY ({BATCH_CONCURRENCY}) must be at least 1 and below "
+            f"MINDFLOW_LLM_MAX_CONCURRENCY + MINDFLOW_MAX_QUEUE_DEPTH ({capacity})"
+        )
+
+@app.on_event("startup")
+async def start_warm_up():
+    global warm_up_task
+    warm_up_task = asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    if similarity_poll_task is not None:
+        similarity_poll_task.cancel()
+    await close_llm_client()
+
+class RenderRequest(BaseModel):
+    dot: str  # Graphviz DOT source of the diagram
+    format: str = "png"  # png, svg or pdf
 
 class WorkflowRequest(BaseModel):
     prompt: str
     type: str  # e.g., "business_plan", "workflow", "timeline"
     include_details: bool = True
     format: str = "json"
+    timeout: Optional[float] = None  # seconds; defaults to MINDFLOW_LLM_TIMEOUT
+    use_cache: bool = True  # False skips the cache lookup and refreshes the entry
+    priority: int = 0  # higher values are admitted to the LLM first
+    hierarchical: bool = False  # outline phases first, then generate every phase in parallel
 
 class Node(BaseModel):
     id: str
     label: str
-    position: Dict[str, float]
+    position: Optional[Dict[str, float]] = None  # filled in by the layout engine
     type: str
     status: Optional[str] = "Not Started"
     notes: Optional[str] = ""
@@ -51,6 +179,93 @@ class Edge(BaseModel):
     target: str
     label: Optional[str] = ""
 
+def link_node_dependencies(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+    link_dependencies(
+        {node["id"]: node["dependencies"] for node in nodes},
+        ((edge["source"], edge["target"]) for edge in edges),
+    )
+
+@contextmanager
+def paused_gc():
+    """Hold off the cyclic garbage collector while a large document is built.
+    Parsing allocates every node at once, which otherwise sets off full
+    collections (costing time proportional to the whole heap) part-way."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def parse_generated_workflow(content) -> Dict[str, Any]:
+    """Parse, validate and expand a wire-format completion (str or bytes).
+
+    orjson parses the document and one precompiled validator checks it,
+    expanding the node keys and filling in the Node defaults; a single
+    pass over the edges then adds edge ids, checks the endpoints and links
+    node dependencies. Raises orjson.JSONDecodeError for invalid JSON,
+    ValidationError for schema mismatches and ValueError for duplicate
+    node ids or edges to unknown nodes.
+    """
+    with paused_gc():
+        workflow = wire_workflow_validator.validate_python(orjson.loads(content))
+        edges = expand_edges(workflow["nodes"], workflow["edges"])
+    return {"nodes": workflow["nodes"], "edges": edges, "description": workflow["description"]}
+
+def salvage_generated_workflow(content: str) -> Tuple[Dict[str, Any], bool]:
+    """Recover every complete, valid node and edge from a malformed or truncated completion.
+
+    Returns the workflow and whether anything was lost (the document was
+    cut off, or items were invalid, duplicated or dangling). Raises
+    ValueError when no node can be recovered.
+    """
+    parser = WorkflowStreamParser()
+    nodes, edges, description, dropped = [], [], None, 0
+    ids = set()
+    for kind, value in parser.feed(content):
+        try:
+            if kind == "node":
+                node = wire_node_validator.validate_python(value)
+                if node["id"] in ids:
+                    dropped += 1
+                    continue
+                ids.add(node["id"])
+                nodes.append(node)
+            elif kind == "edge":
+                edges.append(expand_edge(wire_edge_validator.validate_python(value), len(edges) + 1))
+            elif kind == "description" and isinstance(value, str):
+                description = value
+        except ValidationError:
+            dropped += 1
+    if not nodes:
+        raise ValueError("No complete node in the AI response")
+    kept = [edge for edge in edges if edge["source"] in ids and edge["target"] in ids]
+    dropped += len(edges) - len(kept)
+    link_node_dependencies(nodes, kept)
+    partial = dropped + parser.dropped > 0 or not parser.complete or description is None
+    return {"nodes": nodes, "edges": kept, "description": description or ""}, partial
+
+def invalid_output_exception(e: ValueError, content: str) -> HTTPException:
+    """Map a completion that could not be used at all onto a 500"""
+    # Both are ValueErrors; pydantic reports invalid JSON as "json_invalid"
+    if isinstance(e, orjson.JSONDecodeError) or (
+        isinstance(e, ValidationError) and any(error["type"] == "json_invalid" for error in e.errors())
+    ):
+        ERRORS.inc(error_class="JSONDecodeError")
+        print(f"Error parsing AI response: {str(e)}")
+        print(f"Raw response: {content}")
+        return HTTPException(
+            status_code=500,
+            detail="Failed to parse AI response. Please try again with a different prompt."
+        )
+    ERRORS.inc(error_class="ValidationError")
+    print(f"Validation error: {str(e)}")
+    return HTTPException(
+        status_code=500,
+        detail="Invalid workflow structure generated. Please try again with a different prompt."
+    )
+
 class WorkflowResponse(BaseModel):
     nodes: List[Node]
     edges: List[Edge]
@@ -58,6 +273,268 @@ class WorkflowResponse(BaseModel):
     workflow_type: str
     created_at: str
     updated_at: str
+    partial: bool = False  # True when recovered from a truncated or malformed completion
+
+class SaveWorkflowRequest(BaseModel):
+    name: str
+    owner: str = "default"
+    prompt: str = ""
+    workflow_type: str
+    description: str = ""
+    nodes: List[Node]
+    edges: List[Edge]
+
+    @model_validator(mode="after")
+    def check_graph(self) -> "SaveWorkflowRequest":
+        """Same rule as for generated workflows: unique node ids, edges between existing nodes"""
+        ids = {node.id for node in self.nodes}
+        if len(ids) != len(self.nodes):
+            raise ValueError("Duplicate node ids")
+        for edge in self.edges:
+            if edge.source not in ids or edge.target not in ids:
+                raise ValueError(f"Edge {edge.id} references an unknown node")
+        return self
+
+class WorkflowSummary(BaseModel):
+    id: str
+    name: str
+    owner: str
+    workflow_type: str
+    node_count: int
+    version: int
+    created_at: str
+    updated_at: str
+
+class WorkflowListResponse(BaseModel):
+    workflows: List[WorkflowSummary]
+    limit: int
+    offset: int
+    next_offset: Optional[int] = None
+
+class StoredWorkflow(WorkflowResponse):
+    id: str
+    name: str
+    owner: str
+    prompt: str
+    version: int
+
+class NodeFields(BaseModel):
+    """Editable node fields; only the fields that are sent are applied"""
+    label: Optional[str] = None
+    type: Optional[str] = None
+    position: Optional[Dict[str, float]] = None
+    status: Optional[str] = None
+    notes: Optional[str] = None
+    deadline: Optional[str] = None
+    resources: Optional[List[str]] = None
+    dependencies: Optional[List[str]] = None
+    estimated_cost: Optional[float] = None
+    actual_cost: Optional[float] = None
+
+class NodePatchRequest(NodeFields):
+    version: int
+
+class NodeDelta(NodeFields):
+    id: str
+
+class NodeBatchPatchRequest(BaseModel):
+    version: int
+    nodes: List[NodeDelta]
+
+class NodeEditMessage(BaseModel):
+    """Edit sent over /ws/workflows/{id}, made against workflow ``version``"""
+    type: str = "edit"
+    op: str  # client-chosen id echoed in the ack and the delta
+    version: int
+    nodes: List[NodeDelta]
+
+class NodePatchResponse(BaseModel):
+    workflow_id: str
+    version: int
+    nodes: List[Dict[str, Any]]  # changed fields only, keyed by node "id"
+
+# Steps of each few-shot example shown to the model
+EXAMPLE_MAX_STEPS = 12
+
+def example_outline(prompt: str, workflow: Dict[str, Any]) -> str:
+    """One-line summary of a past workflow used as a few-shot example"""
+    labels = [node["label"] for node in workflow["nodes"][:EXAMPLE_MAX_STEPS]]
+    if len(workflow["nodes"]) > EXAMPLE_MAX_STEPS:
+        labels.append("...")
+    return f'- "{prompt}": ' + " -> ".join(labels)
+
+def build_messages(
+    request: WorkflowRequest, workflow_type: "WorkflowType", examples: List[str] = ()
+) -> List[Dict[str, str]]:
+    """Chat messages asking the model for a workflow matching the request"""
+    content = f"Generate a workflow diagram for: {request.prompt}. Type: {request.type}\nTemplate: {workflow_type.template}"
+    if examples:
+        content += "\n\nSteps of similar workflows generated before, for reference:\n" + "\n".join(examples)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content}
+    ]
+
+def phase_messages(
+    request: WorkflowRequest, workflow_type: "WorkflowType", outline: Dict[str, Any], phase: Dict[str, Any]
+) -> List[Dict[str, str]]:
+    """Chat messages asking for the sub-workflow of one outlined phase"""
+    messages = build_messages(request, workflow_type)
+    messages[-1]["content"] += "\n\n" + phase_request(outline, phase)
+    return messages
+
+def generation_cache_key(request: WorkflowRequest, workflow_type: "WorkflowType", llm_client) -> str:
+    # Hierarchical results differ from single-call ones, so they get their own entries
+    mode = {"mode": "hierarchical"} if request.hierarchical else {}
+    return make_cache_key(
+        request.prompt,
+        request.type,
+        workflow_type.template,
+        model=llm_client.model,
+        prompt_version=PROMPT_VERSION,
+        **GENERATION_PARAMS,
+        **mode
+    )
+
+def similarity_group(request: WorkflowRequest, llm_client) -> str:
+    """Only workflows generated the same way (type, mode and model) are matched"""
+    mode = "hierarchical" if request.hierarchical else "single"
+    return f"{request.type}:{mode}:{llm_client.model}"
+
+# Saved workflows are indexed under their id with this prefix, in a group per type
+SAVED_KEY_PREFIX = "saved:"
+
+def saved_similarity_group(workflow_type: str) -> str:
+    return f"{workflow_type}:saved"
+
+def find_similar(request: WorkflowRequest, llm_client) -> Tuple[Optional[dict], List[str]]:
+    """A cached workflow whose prompt is a near-duplicate of the request's,
+    or else few-shot outlines of the closest generated or saved ones.
+
+    Only a cached workflow whose prompt has the same content words in the
+    same order is returned directly; saved workflows (edited by their
+    owners) and other close matches only serve as examples.
+    """
+    k = max(SIMILARITY_EXAMPLES, 1)
+    matches = sorted(
+        similarity_index.search(request.prompt, similarity_group(request, llm_client), k)
+        + similarity_index.search(request.prompt, saved_similarity_group(request.type), k),
+        reverse=True,
+    )
+    examples = []
+    for score, key, prompt in matches:
+        saved = key.startswith(SAVED_KEY_PREFIX)
+        if saved:
+            workflow = get_workflow_store().get(key[len(SAVED_KEY_PREFIX):])
+        else:
+            workflow = workflow_cache.get(key, count=False)
+        if workflow is None:
+            # The workflow expired, was evicted from the cache or was deleted
+            similarity_index.discard(key)
+            continue
+        if (
+            score >= SIMILARITY_THRESHOLD and request.use_cache and not examples and not saved
+            and same_term_order(request.prompt, prompt)
+        ):
+            print(f"Returning similar workflow ({score:.2f}) generated for: {prompt}")
+            SIMILARITY_LOOKUPS.inc(result="hit")
+            return workflow, []
+        if score >= SIMILARITY_EXAMPLE_MIN_SCORE and len(examples) < SIMILARITY_EXAMPLES:
+            examples.append(example_outline(prompt, workflow))
+    SIMILARITY_LOOKUPS.inc(result="examples" if examples else "miss")
+    return None, examples
+
+async def remember_workflow(request: WorkflowRequest, llm_client, cache_key: str, workflow: Dict[str, Any]):
+    """Cache a complete workflow and index its prompt for similar requests"""
+    group = similarity_group(request, llm_client)
+    await workflow_cache.aset(cache_key, workflow, request.prompt, group)
+    similarity_index.add(cache_key, request.prompt, group)
+
+def index_saved_workflow(workflow_id: str, workflow_type: str, prompt: str):
+    """Offer a saved workflow's steps as few-shot examples for similar prompts"""
+    if prompt:
+        similarity_index.add(SAVED_KEY_PREFIX + workflow_id, prompt, saved_similarity_group(workflow_type))
+    else:
+        similarity_index.discard(SAVED_KEY_PREFIX + workflow_id)
+
+# How far the similarity index has read the disk cache tier (latest expiry
+# indexed) and the store's change log (None before the first full read)
+similarity_lock = threading.Lock()
+similarity_marks: Dict[str, Any] = {"expires_at": 0.0, "seq": None}
+
+def rebuild_similarity_index():
+    """Index the prompts of every workflow on the disk cache tier and in the
+    store from scratch, so similar-prompt matching survives restarts"""
+    with similarity_lock:
+        similarity_index.clear()
+        similarity_marks.update(expires_at=0.0, seq=None)
+        index_new_prompts()
+
+def sync_similarity_index():
+    """Index the prompts cached or saved (by any worker) since the last sync"""
+    with similarity_lock:
+        index_new_prompts()
+
+def index_new_prompts():
+    for key, prompt, group, expires_at in workflow_cache.prompts(similarity_marks["expires_at"]):
+        if key not in similarity_index:
+            similarity_index.add(key, prompt, group)
+        similarity_marks["expires_at"] = expires_at
+    store = get_workflow_store()
+    found = store.changes_since(similarity_marks["seq"]) if similarity_marks["seq"] is not None else None
+    if found is None:
+        seq, rows = store.change_seq(), store.prompts()
+    else:
+        seq, ids = found
+        rows = store.prompts(ids) if ids else []
+        for workflow_id in set(ids) - {row[0] for row in rows}:
+            similarity_index.discard(SAVED_KEY_PREFIX + workflow_id)  # deleted
+    for workflow_id, workflow_type, prompt in rows:
+        index_saved_workflow(workflow_id, workflow_type, prompt)
+    similarity_marks["seq"] = seq
+
+def client_id_for(http_request: Request) -> str:
+    """Identify the caller for per-client token budgets"""
+    client_id = http_request.headers.get("X-Client-ID")
+    if client_id:
+        return client_id
+    return http_request.client.host if http_request.client else "anonymous"
+
+def llm_http_exception(e: Exception) -> HTTPException:
+    """Map an admission or OpenAI error onto the HTTP error returned to the client"""
+    import openai
+
+    if isinstance(e, AdmissionRejected):
+        return HTTPException(
+            status_code=429,
+            detail=e.detail,
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    if isinstance(e, openai.RateLimitError):
+        return HTTPException(
+            status_code=429,
+            detail="The AI model is rate limited. Please retry shortly.",
+            headers={"Retry-After": str(math.ceil(retry_after_seconds(e) or 5))}
+        )
+    if isinstance(e, openai.APITimeoutError):
+        return HTTPException(
+            status_code=504,
+            detail="Timed out waiting for the AI model. Please try again."
+        )
+    if isinstance(e, openai.AuthenticationError):
+        return HTTPException(
+            status_code=401,
+            detail="Invalid OpenAI API key. Please check your configuration."
+        )
+    if isinstance(e, openai.APIError):
+        return HTTPException(
+            status_code=500,
+            detail=f"OpenAI API error: {str(e)}"
+        )
+    return HTTPException(
+        status_code=500,
+        detail=f"Failed to generate workflow: {str(e)}"
+    )
 
 class WorkflowType(BaseModel):
     id: str
@@ -91,130 +568,426 @@ async def get_workflow_types():
             "template": "Create a process flow for {process_name} with steps: {steps}"
         }
     ]
-    return {"workflow_types": workflow_types}
+    return WorkflowTypesResponse(workflow_types=workflow_types)
 
-@app.post("/generate-workflow", response_model=WorkflowResponse)
-async def generate_workflow(request: WorkflowRequest):
-    """Generate a workflow based on user input using AI"""
+async def generate_workflow_data(
+    llm_client, messages: List[Dict[str, str]], request: WorkflowRequest, client_id: str
+) -> Tuple[Dict[str, Any], bool]:
+    """Run one completion and validate it into nodes and edges.
+
+    Returns the workflow data and whether it was salvaged from an invalid
+    completion; raises HTTPException when nothing usable came back.
+    """
+    with stage("llm"):
+        content, finish_reason = await llm_client.complete(
+            messages=messages,
+            timeout=request.timeout,
+            client_id=client_id,
+            priority=request.priority,
+            **GENERATION_PARAMS
+        )
+    print(f"Received response from OpenAI API (finish_reason={finish_reason})")
+
+    # Parse and validate the AI response
+    content = strip_code_fence(content)
+    try:
+        with stage("validate"):
+            workflow_data = parse_generated_workflow(content)
+        print("Workflow data validation successful")
+        return workflow_data, False
+
+    except ValueError as e:
+        # Keep every usable node and edge rather than failing the whole request
+        try:
+            with stage("salvage"):
+                workflow_data, partial = salvage_generated_workflow(content)
+        except ValueError:
+            raise invalid_output_exception(e, content)
+        SALVAGED.inc()
+        print(f"Salvaged {len(workflow_data['nodes'])} nodes from an invalid AI response: {str(e)}")
+        return workflow_data, partial
+
+async def generate_hierarchical_data(
+    llm_client, request: WorkflowRequest, workflow_type: "WorkflowType", client_id: str
+) -> Tuple[Dict[str, Any], bool]:
+    """Outline the plan's phases, generate every phase concurrently and stitch the results.
+
+    Wall time is about one outline call plus the slowest phase. Phases that
+    fail are left out and mark the result partial; it is an error only when
+    every phase fails.
+    """
+    outline_messages = build_messages(request, workflow_type)
+    outline_messages[0] = {"role": "system", "content": OUTLINE_PROMPT}
+    with stage("outline"):
+        content, _ = await llm_client.complete(
+            messages=outline_messages,
+            timeout=request.timeout,
+            client_id=client_id,
+            priority=request.priority,
+            **GENERATION_PARAMS
+        )
+    content = strip_code_fence(content)
+    try:
+        outline = parse_outline(content)
+    except ValueError as e:
+        raise invalid_output_exception(e, content)
+    print(f"Generating {len(outline['phases'])} phases in parallel")
+
+    results = await asyncio.gather(*(
+        generate_workflow_data(llm_client, phase_messages(request, workflow_type, outline, phase), request, client_id)
+        for phase in outline["phases"]
+    ), return_exceptions=True)
+
+    phase_workflows, partial = [], False
+    for phase, result in zip(outline["phases"], results):
+        if isinstance(result, BaseException):
+            if not isinstance(result, HTTPException):
+                ERRORS.inc(error_class=type(result).__name__)
+            print(f"Phase {phase['name']!r} failed ({type(result).__name__}): {str(result)}")
+            phase_workflows.append(None)
+            partial = True
+        else:
+            phase_workflows.append(result[0])
+            partial = partial or result[1]
+    if all(workflow is None for workflow in phase_workflows):
+        raise results[0]
+
+    with stage("stitch"):
+        return stitch_phases(outline, phase_workflows), partial
+
+async def create_workflow(request: WorkflowRequest, client_id: str = "anonymous"):
+    """Generate a workflow based on user input using AI, raising HTTPException on failure"""
     try:
         print(f"Generating workflow for prompt: {request.prompt}")
         print(f"Workflow type: {request.type}")
         
         # Get workflow type template
-        workflow_type = await get_workflow_type(request.type)
+        with stage("template"):
+            workflow_type = await get_workflow_type(request.type)
         print(f"Using workflow template: {workflow_type.template}")
-        
-        # Set up the system prompt
-        system_prompt = """
-        You are a workflow designer. Generate a workflow diagram based on the user's request.
-        Return the result in JSON format with the following structure:
-        {
-            "nodes": [
-                {
-                    "id": "string",
-                    "label": "string",
-                    "position": {"x": number, "y": number},
-                    "type": "start|task|end",
-                    "status": "Not Started|In Progress|Completed|Failed",
-                    "notes": "string",
-                    "deadline": "YYYY-MM-DD",
-                    "resources": ["string"],
-                    "dependencies": ["string"],
-                    "estimated_cost": number,
-                    "actual_cost": number
-                }
-            ],
-            "edges": [
-                {
-                    "id": "string",
-                    "source": "string",
-                    "target": "string",
-                    "label": "string"
-                }
-            ],
-            "description": "string"
-        }
-        """
+
+        llm_client = get_llm_client()
+        cache_key = generation_cache_key(request, workflow_type, llm_client)
+        if request.use_cache:
+            with stage("cache"):
+                cached = await workflow_cache.aget(cache_key)
+            if cached is not None:
+                print("Returning cached workflow")
+                return cached
+
+        with stage("similar"):
+            similar, examples = await asyncio.to_thread(find_similar, request, llm_client)
+        if similar is not None:
+            return similar
         
         # Generate workflow using AI
         print("Sending request to OpenAI API...")
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Generate a workflow diagram for: {request.prompt}. Type: {request.type}\nTemplate: {workflow_type.template}"}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        print("Received response from OpenAI API")
-        
-        # Parse and validate the AI response
-        try:
-            workflow_data = json.loads(response.choices[0].message.content)
-            print("Successfully parsed AI response")
-            
-            # Validate required fields
-            if not all(key in workflow_data for key in ["nodes", "edges", "description"]):
-                raise ValueError("AI response missing required fields")
-                
-            # Validate nodes structure
-            for node in workflow_data["nodes"]:
-                if not all(key in node for key in ["id", "label", "position", "type"]):
-                    raise ValueError(f"Invalid node structure: {node}")
-                    
-            # Validate edges structure
-            for edge in workflow_data["edges"]:
-                if not all(key in edge for key in ["id", "source", "target"]):
-                    raise ValueError(f"Invalid edge structure: {edge}")
-                    
-            print("Workflow data validation successful")
-            
-            # Format response
-            return WorkflowResponse(
-                nodes=workflow_data["nodes"],
-                edges=workflow_data["edges"],
-                description=workflow_data["description"],
-                workflow_type=request.type,
-                created_at=datetime.now().isoformat(),
-                updated_at=datetime.now().isoformat()
-            )
-            
-        except json.JSONDecodeError as e:
-            print(f"Error parsing AI response: {str(e)}")
-            print(f"Raw response: {response.choices[0].message.content}")
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to parse AI response. Please try again with a different prompt."
-            )
-            
-        except ValueError as e:
-            print(f"Validation error: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail="Invalid workflow structure generated. Please try again with a different prompt."
+        if request.hierarchical:
+            workflow_data, partial = await generate_hierarchical_data(llm_client, request, workflow_type, client_id)
+        else:
+            workflow_data, partial = await generate_workflow_data(
+                llm_client, build_messages(request, workflow_type, examples), request, client_id
             )
+
+        # Positions come from the layout engine, not the model
+        with stage("layout"):
+            layout_engine.apply(workflow_data["nodes"], workflow_data["edges"])
+
+        now = datetime.now().isoformat()
+        workflow = {
+            **workflow_data,
+            "workflow_type": request.type,
+            "created_at": now,
+            "updated_at": now,
+            "partial": partial,
+        }
+        if not partial:
+            await remember_workflow(request, llm_client, cache_key, workflow)
+        return workflow
             
-    except openai.error.APIError as e:
-        print(f"OpenAI API error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"OpenAI API error: {str(e)}"
-        )
-        
-    except openai.error.AuthenticationError as e:
-        print(f"OpenAI Authentication error: {str(e)}")
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid OpenAI API key. Please check your configuration."
-        )
+    except HTTPException:
+        raise
+
+    except (AdmissionRejected, *upstream_errors()) as e:
+        ERRORS.inc(error_class=type(e).__name__)
+        print(f"LLM request failed ({type(e).__name__}): {str(e)}")
+        raise llm_http_exception(e)
         
     except Exception as e:
+        ERRORS.inc(error_class=type(e).__name__)
         print(f"Unexpected error: {str(e)}")
+        raise llm_http_exception(e)
+
+@app.post("/generate-workflow", response_model=WorkflowResponse)
+async def generate_workflow(request: WorkflowRequest, http_request: Request):
+    """Generate a workflow based on user input using AI"""
+    workflow = await create_workflow(request, client_id_for(http_request))
+    with stage("serialize"):
+        return ORJSONResponse(workflow)
+
+class BatchWorkflowRequest(BaseModel):
+    requests: List[WorkflowRequest]
+
+async def generate_batch_item(index: int, request: WorkflowRequest, client_id: str) -> dict:
+    try:
+        async with batch_slots:
+            workflow = await create_workflow(request, client_id)
+        return {"index": index, "status": "ok", "workflow": workflow}
+    except HTTPException as e:
+        result = {"index": index, "status": "error", "status_code": e.status_code, "detail": e.detail}
+        if e.headers and "Retry-After" in e.headers:
+            result["retry_after"] = int(e.headers["Retry-After"])
+        return result
+
+async def stream_batch_results(batch: BatchWorkflowRequest, client_id: str):
+    """Yield one NDJSON line per request, in completion order"""
+    tasks = [
+        asyncio.create_task(generate_batch_item(index, request, client_id))
+        for index, request in enumerate(batch.requests)
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield orjson.dumps(await finished) + b"\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/generate-workflows")
+async def generate_workflows(batch: BatchWorkflowRequest, http_request: Request):
+    """Generate many workflows concurrently, streaming each result or error as
+    NDJSON as soon as it finishes. Lines carry the ``index`` of their request.
+    At most BATCH_CONCURRENCY batch requests are generated at once."""
+    if len(batch.requests) > BATCH_MAX_SIZE:
         raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate workflow: {str(e)}"
+            status_code=413,
+            detail=f"Batch too large: at most {BATCH_MAX_SIZE} requests are allowed"
+        )
+    print(f"Generating batch of {len(batch.requests)} workflows")
+    return StreamingResponse(
+        stream_batch_results(batch, client_id_for(http_request)),
+        media_type="application/x-ndjson"
+    )
+
+def stream_frame(kind: str, data) -> bytes:
+    """One NDJSON line of the streaming generation protocol"""
+    return orjson.dumps({"type": kind, "data": data}) + b"\n"
+
+def finished_workflow_frames(workflow: dict, cached: bool):
+    """Frames of a workflow that is already complete, in streaming order"""
+    for node in workflow["nodes"]:
+        yield stream_frame("node", node)
+    for edge in workflow["edges"]:
+        yield stream_frame("edge", edge)
+    yield stream_frame("description", workflow["description"])
+    yield stream_frame("done", {
+        "workflow_type": workflow["workflow_type"],
+        "created_at": workflow["created_at"],
+        "updated_at": workflow["updated_at"],
+        "node_count": len(workflow["nodes"]),
+        "edge_count": len(workflow["edges"]),
+        "skipped": 0,
+        "continuations": 0,
+        "partial": workflow.get("partial", False),
+        "cached": cached,
+        "dependencies": {node["id"]: node["dependencies"] for node in workflow["nodes"]},
+        "positions": {node["id"]: node["position"] for node in workflow["nodes"]}
+    })
+
+async def stream_workflow_frames(
+    request: WorkflowRequest, deltas, cache_key: str, cached: Optional[dict], resume=None
+):
+    """Yield node, edge, description and summary frames as the completion streams in.
+
+    When the completion is cut off at max_tokens, ``resume(text_so_far)``
+    opens a stream of just the remainder, which is fed into the same parser.
+    Nodes reusing an id are skipped; an edge is sent once both of its nodes
+    have been, and edges still dangling at the end are skipped. Anything
+    skipped marks the result partial, which is never cached.
+    """
+    if cached is not None:
+        print("Streaming cached workflow")
+        for frame in finished_workflow_frames(cached, cached=True):
+            yield frame
+        return
+
+    parser = WorkflowStreamParser()
+    nodes: List[Node] = []
+    edges: List[Edge] = []
+    ids: Set[str] = set()
+    held: List[List[str]] = []  # wire edges waiting for one of their nodes
+    description = None
+    skipped = 0
+    received: List[str] = []
+    continuations = 0
+    stream, text = deltas, deltas
+    try:
+        while True:
+            async for delta in text:
+                received.append(delta)
+                for kind, value in parser.feed(delta):
+                    try:
+                        if kind == "node":
+                            node = Node(**wire_node_validator.validate_python(value))
+                            if node.id in ids:
+                                raise ValueError(f"Duplicate node id {node.id}")
+                            ids.add(node.id)
+                            nodes.append(node)
+                            yield stream_frame("node", node.model_dump())
+                            ready = [wire for wire in held if wire[0] in ids and wire[1] in ids]
+                            for wire in ready:
+                                held.remove(wire)
+                                edge = Edge(**expand_edge(wire, len(edges) + 1))
+                                edges.append(edge)
+                                yield stream_frame("edge", edge.model_dump())
+                        elif kind == "edge":
+                            wire = wire_edge_validator.validate_python(value)
+                            if wire[0] not in ids or wire[1] not in ids:
+                                held.append(wire)
+                                continue
+                            edge = Edge(**expand_edge(wire, len(edges) + 1))
+                            edges.append(edge)
+                            yield stream_frame("edge", edge.model_dump())
+                        elif kind == "description" and isinstance(value, str):
+                            description = value
+                            yield stream_frame("description", value)
+                    except (TypeError, ValueError) as e:
+                        print(f"Skipping invalid {kind}: {str(e)}")
+                        skipped += 1
+            print(f"OpenAI stream finished (finish_reason={stream.finish_reason})")
+            if (
+                parser.complete
+                or stream.finish_reason != "length"
+                or resume is None
+                or continuations >= LLM_MAX_CONTINUATIONS
+            ):
+                break
+            continuations += 1
+            LLM_CONTINUATIONS.inc()
+            print("Stream truncated; requesting the remainder")
+            stream = await resume("".join(received))
+            text = strip_leading_fence(stream)
+
+    except Exception as e:
+        ERRORS.inc(error_class=type(e).__name__)
+        print(f"Stream failed ({type(e).__name__}): {str(e)}")
+        if not continuations:
+            error = llm_http_exception(e)
+            yield stream_frame("error", {"status_code": error.status_code, "detail": error.detail})
+            return
+        # A failed continuation still leaves everything received so far
+    finally:
+        if stream is not deltas:
+            await stream.aclose()
+
+    if held:
+        print(f"Skipping {len(held)} edges to unknown nodes")
+    skipped += parser.dropped + len(held)
+    if not nodes:
+        yield stream_frame("error", {"status_code": 500, "detail": "Invalid workflow structure generated. Please try again with a different prompt."})
+        return
+
+    link_dependencies(
+        {node.id: node.dependencies for node in nodes}, ((edge.source, edge.target) for edge in edges)
+    )
+    with stage("layout"):
+        positions = layout_engine.apply(
+            [node.model_dump() for node in nodes], [edge.model_dump() for edge in edges]
+        )
+    for node in nodes:
+        node.position = positions[node.id]
+
+    now = datetime.now().isoformat()
+    workflow = WorkflowResponse(
+        nodes=nodes,
+        edges=edges,
+        description=description or "",
+        workflow_type=request.type,
+        created_at=now,
+        updated_at=now
+    )
+    workflow.partial = not parser.complete or description is None or bool(skipped)
+    if not workflow.partial:
+        await remember_workflow(request, get_llm_client(), cache_key, workflow.model_dump())
+    yield stream_frame("done", {
+        "workflow_type": workflow.workflow_type,
+        "created_at": workflow.created_at,
+        "updated_at": workflow.updated_at,
+        "node_count": len(nodes),
+        "edge_count": len(edges),
+        "skipped": skipped,
+        "continuations": continuations,
+        "partial": workflow.partial,
+        "cached": False,
+        "dependencies": {node.id: node.dependencies for node in nodes},
+        "positions": positions
+    })
+
+@app.post("/generate-workflow/stream")
+async def generate_workflow_stream(request: WorkflowRequest, http_request: Request):
+    """Stream a workflow as NDJSON: each node and edge as soon as it is complete
+    and valid, then the description and a final summary frame"""
+    print(f"Streaming workflow for prompt: {request.prompt}")
+    with stage("template"):
+        workflow_type = await get_workflow_type(request.type)
+    llm_client = get_llm_client()
+    cache_key = generation_cache_key(request, workflow_type, llm_client)
+    with stage("cache"):
+        cached = await workflow_cache.aget(cache_key) if request.use_cache else None
+    if cached is not None:
+        return StreamingResponse(
+            stream_workflow_frames(request, None, cache_key, cached),
+            media_type="application/x-ndjson"
+        )
+
+    client_id = client_id_for(http_request)
+    if request.hierarchical:
+        # Phases finish out of order and are stitched at the end, so the result is sent in one go
+        workflow = await create_workflow(request, client_id)
+        return StreamingResponse(
+            finished_workflow_frames(workflow, cached=False),
+            media_type="application/x-ndjson"
+        )
+
+    with stage("similar"):
+        similar, examples = await asyncio.to_thread(find_similar, request, llm_client)
+    if similar is not None:
+        return StreamingResponse(
+            finished_workflow_frames(similar, cached=True),
+            media_type="application/x-ndjson"
         )
+    messages = build_messages(request, workflow_type, examples)
+
+    async def resume(partial: str):
+        # JSON mode would force a fresh JSON object, so continuations are plain text
+        return await llm_client.stream_chat(
+            messages=continuation_messages(messages, partial),
+            timeout=request.timeout,
+            client_id=client_id,
+            priority=request.priority,
+            json_mode=False,
+            **GENERATION_PARAMS
+        )
+
+    # Admission and upstream errors surface as HTTP errors before streaming starts
+    try:
+        print("Streaming request to OpenAI API...")
+        with stage("llm_open"):
+            deltas = await llm_client.stream_chat(
+                messages=messages,
+                timeout=request.timeout,
+                client_id=client_id,
+                priority=request.priority,
+                **GENERATION_PARAMS
+            )
+    except (AdmissionRejected, *upstream_errors()) as e:
+        ERRORS.inc(error_class=type(e).__name__)
+        print(f"LLM request failed ({type(e).__name__}): {str(e)}")
+        raise llm_http_exception(e)
+    return StreamingResponse(
+        stream_workflow_frames(request, deltas, cache_key, None, resume),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(deltas.aclose)
+    )
 
 @app.get("/workflow-types/{workflow_type_id}", response_model=WorkflowType)
 async def get_workflow_type(workflow_type_id: str):
@@ -225,7 +998,244 @@ async def get_workflow_type(workflow_type_id: str):
             return wt
     raise HTTPException(status_code=404, detail="Workflow type not found")
 
+@app.post("/workflows", response_model=WorkflowSummary, status_code=201)
+def save_workflow(workflow: SaveWorkflowRequest):
+    """Save a workflow to the store"""
+    summary = get_workflow_store().create(workflow.model_dump())
+    index_saved_workflow(summary["id"], workflow.workflow_type, workflow.prompt)
+    return summary
+
+@app.get("/workflows", response_model=WorkflowListResponse)
+def list_workflows(
+    owner: Optional[str] = None,
+    workflow_type: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """List saved workflow summaries, newest first"""
+    rows = get_workflow_store().list(owner, workflow_type, limit + 1, offset)
+    return {
+        "workflows": rows[:limit],
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(rows) > limit else None
+    }
+
+@app.get("/workflows/{workflow_id}", response_model=StoredWorkflow)
+def load_workflow(workflow_id: str):
+    """Load a saved workflow with its full graph"""
+    workflow = get_workflow_store().get(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return workflow
+
+@app.put("/workflows/{workflow_id}", response_model=WorkflowSummary)
+def replace_workflow(workflow_id: str, workflow: SaveWorkflowRequest):
+    """Overwrite a saved workflow"""
+    summary = get_workflow_store().replace(workflow_id, workflow.model_dump())
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    index_saved_workflow(workflow_id, workflow.workflow_type, workflow.prompt)
+    analytics_cache.invalidate(workflow_id)
+    collab_hub.reset(workflow_id, "replaced")
+    return summary
+
+def apply_node_deltas(workflow_id: str, version: int, deltas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        result = get_workflow_store().patch_nodes(workflow_id, version, deltas)
+        analytics_cache.apply_patch(workflow_id, result)
+        collab_hub.publish(workflow_id, result)
+        return result
+    except WorkflowNotFound:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    except NodeNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Node not found: {e.args[0]}")
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Workflow was modified (now at version {e.current_version}). Reload and retry."
+        )
+
+@app.patch("/workflows/{workflow_id}/nodes/{node_id}", response_model=NodePatchResponse)
+def patch_node(workflow_id: str, node_id: str, patch: NodePatchRequest):
+    """Update fields of a single node, if the workflow is still at ``version``"""
+    delta = patch.model_dump(exclude_unset=True, exclude={"version"})
+    return apply_node_deltas(workflow_id, patch.version, [{"id": node_id, **delta}])
+
+@app.patch("/workflows/{workflow_id}/nodes", response_model=NodePatchResponse)
+def patch_nodes(workflow_id: str, patch: NodeBatchPatchRequest):
+    """Update fields of several nodes atomically, if the workflow is still at ``version``"""
+    deltas = [delta.model_dump(exclude_unset=True) for delta in patch.nodes]
+    return apply_node_deltas(workflow_id, patch.version, deltas)
+
+@app.delete("/workflows/{workflow_id}", status_code=204)
+def delete_workflow(workflow_id: str):
+    """Delete a saved workflow"""
+    if not get_workflow_store().delete(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    similarity_index.discard(SAVED_KEY_PREFIX + workflow_id)
+    analytics_cache.invalidate(workflow_id)
+    collab_hub.reset(workflow_id, "deleted")
+
+@app.websocket("/ws/workflows/{workflow_id}")
+async def workflow_socket(websocket: WebSocket, workflow_id: str, since: Optional[int] = None):
+    """Live node edits of a saved workflow.
+
+    The server first sends a ``snapshot`` of the workflow (or, when
+    reconnecting with ``?since=<version>``, a ``hello`` followed by the
+    missed deltas). Clients send ``NodeEditMessage`` frames; edits are
+    batched, applied to the store and broadcast to every subscriber as a
+    ``delta`` with just the changed fields. The author also gets an ``ack``
+    listing fields rejected because someone else changed them first. A
+    ``resync`` or ``reset`` frame means the client must reload.
+    """
+    await websocket.accept()
+    client_id = websocket.headers.get("X-Client-ID") or websocket.query_params.get("client") or uuid.uuid4().hex[:8]
+    subscriber = Subscriber(client_id)
+    if not await collab_hub.join(workflow_id, subscriber, since):
+        await websocket.close(code=4404, reason="Workflow not found")
+        return
+
+    async def send_frames():
+        while True:
+            frame = await subscriber.queue.get()
+            if frame is None:
+                await websocket.close(code=4408, reason="Too far behind; reconnect with ?since=<version>")
+                return
+            await websocket.send_text(frame.decode("utf-8"))
+
+    sender = asyncio.create_task(send_frames())
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                edit = NodeEditMessage.model_validate_json(message)
+            except ValidationError as e:
+                subscriber.send(collab_frame("error", op=None, detail=str(e)))
+                continue
+            collab_hub.submit(
+                workflow_id, subscriber, edit.op, edit.version,
+                [delta.model_dump(exclude_unset=True) for delta in edit.nodes],
+            )
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        sender.cancel()
+        collab_hub.leave(workflow_id, subscriber)
+
+@app.get("/workflows/{workflow_id}/layout")
+def workflow_layout(workflow_id: str):
+    """Layered node positions for a saved workflow. Layouts are cached by graph
+    structure; after an edit only the layers touched by the change move."""
+    workflow = get_workflow_store().get(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    layout = layout_engine.layout(workflow["nodes"], workflow["edges"], key=workflow_id)
+    return {
+        "workflow_id": workflow_id,
+        "version": workflow["version"],
+        "positions": layout.positions,
+        "moved_layers": layout.moved_layers
+    }
+
+@app.get("/workflows/{workflow_id}/analytics")
+def workflow_analytics(workflow_id: str):
+    """Cycle check, topological order, critical path, slack and cost rollups
+    for a saved workflow (cached per workflow version)"""
+    store = get_workflow_store()
+    summary = store.summary(workflow_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    report = analytics_cache.report(workflow_id, summary["version"], lambda: store.get(workflow_id))
+    if report is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return report
+
+@app.get("/portfolio/analytics")
+def portfolio_analytics(
+    owner: Optional[str] = None,
+    workflow_type: Optional[str] = None,
+    as_of: Optional[date] = None,
+    bucket_days: int = Query(7, ge=1, le=365),
+):
+    """Completion rate by type, estimated vs. actual cost variance, overdue steps
+    and deadline burn-down across all saved workflows.
+
+    Aggregates the portfolio's node columns, which first catch up on the
+    workflows saved, patched or deleted since the last request by reading
+    the store's change log.
+    """
+    portfolio.sync(get_workflow_store())
+    return portfolio.report(owner, workflow_type, as_of, bucket_days)
+
+@app.post("/render")
+async def render_diagram(request: RenderRequest):
+    """Render DOT source to PNG/SVG/PDF.
+
+    Rendering runs in a bounded number of ``dot`` subprocesses, and outputs
+    are cached on disk by (DOT hash, format), so re-exporting an unchanged
+    diagram is instant. Oversized DOT (413) and DOT that would read files
+    on the server (400) are refused.
+    """
+    fmt = request.format.lower()
+    try:
+        digest, path, cached = await get_render_service().render(request.dot, fmt)
+    except RenderError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[fmt],
+        filename=f"workflow.{fmt}",
+        headers={"ETag": f'"{digest}"', "X-Render-Cache": "hit" if cached else "miss"},
+    )
+
+@app.get("/render/{digest}.{fmt}")
+async def get_rendered_diagram(digest: str, fmt: str):
+    """Download a previously rendered diagram by its content address"""
+    if fmt not in MEDIA_TYPES or not digest.isalnum():
+        raise HTTPException(status_code=404, detail="Render not found")
+    path = get_render_service().cached_path(digest, fmt)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Render not found")
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers={"ETag": f'"{digest}"'})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the generated-workflow cache"""
+    return workflow_cache.stats()
+
+@app.delete("/cache")
+async def clear_cache():
+    """Drop every cached workflow from memory and disk"""
+    await asyncio.to_thread(workflow_cache.clear)
+    await asyncio.to_thread(rebuild_similarity_index)  # saved workflows stay indexed
+    return {"status": "cleared"}
+
+@app.get("/similarity/stats")
+async def similarity_stats():
+    """Size of the prompt similarity index"""
+    return similarity_index.stats()
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Concurrency, queue depth and token budget of the LLM admission layer"""
+    return await get_llm_client().admission.astats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: request and stage latency, tokens, cache, queue and errors"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until this worker has finished warming up"""
+    if warm_up_task is None or not warm_up_task.done():
+        raise HTTPException(status_code=503, detail="Starting up", headers={"Retry-After": "1"})
+    if warm_up_task.exception() is not None:
+        raise HTTPException(status_code=503, detail=f"Startup failed: {warm_up_task.exception()}")
+    return {"status": "ready", "worker": os.getpid()}
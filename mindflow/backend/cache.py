@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Cache configuration (overridable through the environment / .env file)
+CACHE_MAX_ENTRIES = int(os.getenv("MINDFLOW_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.getenv("MINDFLOW_CACHE_TTL", "86400"))
+CACHE_PATH = os.getenv("MINDFLOW_CACHE_PATH")  # unset disables the disk tier
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("MINDFLOW_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# Disk tier writes between sweeps of expired and surplus rows
+SWEEP_EVERY = 100
+
+# Part of every key; bump it when the shape of cached workflows changes so
+# entries written by older versions (e.g. on the disk tier) are not served
+CACHE_FORMAT_VERSION = 2
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share an entry"""
+    return " ".join(prompt.split()).casefold()
+
+
+def make_cache_key(prompt: str, workflow_type: str, template: Optional[str], **params) -> str:
+    """Hash the normalized (prompt, type, template, model parameters) tuple"""
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, normalize_prompt(prompt), workflow_type, template or "", params],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """SQLite-backed cache tier that survives restarts and is shared by
+    every worker process pointing at the same file.
+
+    Expired rows are deleted when the file is opened and every SWEEP_EVERY
+    writes, together with the rows closest to expiry (the oldest) beyond
+    ``max_entries``.
+    """
+
+    def __init__(self, path: str, max_entries: int = CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workflow_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "prompt TEXT NOT NULL DEFAULT '', prompt_group TEXT NOT NULL DEFAULT '')"
+        )
+        # Files written before prompts were recorded lack the prompt columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(workflow_cache)")}
+        for column in ("prompt", "prompt_group"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE workflow_cache ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_workflow_cache_expires_at ON workflow_cache (expires_at)"
+        )
+        self._sweep()
+        self._conn.commit()
+
+    def _sweep(self):
+        self._conn.execute("DELETE FROM workflow_cache WHERE expires_at < ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM workflow_cache WHERE key IN "
+            "(SELECT key FROM workflow_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(value, expires_at) of an unexpired entry"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM workflow_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM workflow_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: float, prompt: str = "", group: str = ""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workflow_cache (key, value, expires_at, prompt, prompt_group) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, prompt, group),
+            )
+            self._writes += 1
+            if self._writes % SWEEP_EVERY == 0:
+                self._sweep()
+            self._conn.commit()
+
+    def prompts(self, expires_after: float = 0.0) -> List[Tuple[str, str, str, float]]:
+        """(key, prompt, group, expires_at) of every unexpired entry stored with
+        its prompt and expiring after ``expires_after``, i.e. written since an
+        entry expiring then (every worker uses the same TTL)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, prompt, prompt_group, expires_at FROM workflow_cache "
+                "WHERE prompt != '' AND expires_at > ? AND expires_at >= ? ORDER BY expires_at",
+                (expires_after, time.time()),
+            ).fetchall()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM workflow_cache")
+            self._conn.commit()
+
+
+class WorkflowCache:
+    """In-memory LRU cache with TTL, optionally backed by a DiskCache"""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL,
+        path: Optional[str] = CACHE_PATH,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = DiskCache(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """Cached workflow for ``key``; ``count=False`` leaves the hit/miss counters alone.
+        Blocks on the disk tier, so code on the event loop uses ``aget``."""
+        value = self._get_memory(key, count)
+        if value is None and self._disk is not None:
+            value = self._get_disk(key, count)
+        if value is None:
+            self._count_miss(count)
+        return value
+
+    async def aget(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """``get`` that reads the disk tier in a thread"""
+        value = self._get_memory(key, count)
+        if value is None and self._disk is not None:
+            value = await asyncio.to_thread(self._get_disk, key, count)
+        if value is None:
+            self._count_miss(count)
+        return value
+
+    def _get_memory(self, key: str, count: bool) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += count
+                    return value
+                del self._entries[key]
+        return None
+
+    def _get_disk(self, key: str, count: bool) -> Optional[Dict[str, Any]]:
+        found = self._disk.get(key)
+        if found is None:
+            return None
+        value, expires_at = found
+        # Keep the entry's original expiry; a disk hit must not extend its life
+        self._remember(key, value, expires_at)
+        with self._lock:
+            self.hits += count
+            self.disk_hits += count
+        return value
+
+    def _count_miss(self, count: bool):
+        with self._lock:
+            self.misses += count
+
+    def set(self, key: str, value: Dict[str, Any], prompt: str = "", group: str = ""):
+        """Cache ``value``; the disk tier also records the ``prompt`` (and its
+        similarity ``group``) it was generated for, see ``prompts``. Blocks
+        on the disk tier, so code on the event loop uses ``aset``."""
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._disk is not None:
+            self._disk.set(key, value, expires_at, prompt, group)
+
+    async def aset(self, key: str, value: Dict[str, Any], prompt: str = "", group: str = ""):
+        """``set`` that writes the disk tier in a thread"""
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, expires_at, prompt, group)
+
+    def prompts(self, expires_after: float = 0.0) -> List[Tuple[str, str, str, float]]:
+        """(key, prompt, group, expires_at) of the entries on disk, to rebuild
+        the similarity index after a restart and follow other workers' entries"""
+        return self._disk.prompts(expires_after) if self._disk is not None else []
+
+    def _remember(self, key: str, value: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "disk_enabled": self._disk is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+workflow_cache = WorkflowCache()
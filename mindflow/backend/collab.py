@@ -0,0 +1,360 @@
+import asyncio
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+from analytics import analytics_cache
+from store import get_workflow_store, NodeNotFound, VersionConflict, Writers, OP_LOG_SIZE
+
+# Collaboration configuration (overridable through the environment / .env file)
+COLLAB_BATCH_WINDOW = float(os.getenv("MINDFLOW_COLLAB_BATCH_WINDOW", "0.02"))
+COLLAB_SEND_QUEUE = int(os.getenv("MINDFLOW_COLLAB_SEND_QUEUE", "256"))
+# Polling only matters when several workers share the store, which production
+# mode signals by sharing state through MINDFLOW_STATE_PATH; 0 disables
+COLLAB_POLL_INTERVAL = float(os.getenv(
+    "MINDFLOW_COLLAB_POLL_INTERVAL", "0.05" if os.getenv("MINDFLOW_STATE_PATH") else "0"
+))
+
+# Attempts at applying a batch when the workflow changed underneath it
+APPLY_ATTEMPTS = 3
+
+
+def encode(kind: str, **data) -> bytes:
+    return orjson.dumps({"type": kind, **data})
+
+
+class Subscriber:
+    """One WebSocket connection's outgoing message queue.
+
+    A subscriber that falls COLLAB_SEND_QUEUE messages behind is cut off
+    (its queue then yields ``None``) rather than buffering without bound;
+    it can reconnect with ``since`` to catch up from the operation log.
+    """
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=COLLAB_SEND_QUEUE)
+        self.closed = False
+
+    def send(self, message: bytes):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Room:
+    """Subscribers, recent operations and queued edits of one workflow"""
+
+    def __init__(self, workflow_id: str, version: int):
+        self.workflow_id = workflow_id
+        self.version = version
+        self.subscribers: Set[Subscriber] = set()
+        # (version, changes, writers) of the latest applied patches, oldest first
+        self.log: Deque[Tuple[int, List[Dict[str, Any]], Writers]] = deque(maxlen=OP_LOG_SIZE)
+        self.pending: List[Dict[str, Any]] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()  # one batch is applied at a time
+
+    def broadcast(self, message: bytes):
+        for subscriber in list(self.subscribers):
+            subscriber.send(message)
+
+    def record(self, version: int, changes: List[Dict[str, Any]], writers: Writers, ops: List[str] = ()):
+        """Log an applied patch and send its changed fields to every subscriber"""
+        if self.log and version <= self.log[-1][0]:
+            return  # already recorded
+        self.version = max(self.version, version)
+        if changes:
+            self.log.append((version, changes, writers))
+            self.broadcast(encode(
+                "delta", version=version, nodes=changes,
+                authors=list(dict.fromkeys(writers.values())), ops=list(ops),
+            ))
+
+    def touched_since(self, base_version: int) -> Optional[Writers]:
+        """Writers of every field changed after ``base_version``, or None
+        when the log no longer reaches back that far"""
+        if base_version < self.version and (not self.log or self.log[0][0] > base_version + 1):
+            return None
+        touched: Writers = {}
+        for version, _, writers in self.log:
+            if version > base_version:
+                touched.update(writers)
+        return touched
+
+
+def field_writers(changes: List[Dict[str, Any]], client: str) -> Writers:
+    return {(change["id"], field): client for change in changes for field in change if field != "id"}
+
+
+class CollaborationHub:
+    """Fans node edits of a workflow out to everyone editing it.
+
+    Edits arriving within COLLAB_BATCH_WINDOW of each other are coalesced
+    into one store patch (one version bump) per workflow. Each edit names
+    the version it was made against; a field that another client changed
+    after that version is rejected (first writer wins) while the rest of
+    the edit is applied, so concurrent edits to different fields or nodes
+    never conflict. Later edits from the same client simply overwrite its
+    earlier ones, which keeps fast typing cheap.
+
+    Patches made through the REST endpoints are logged and broadcast too.
+    Every patch is also logged in the workflow store; with several workers
+    each hub checks the versions of the workflows it has open every
+    COLLAB_POLL_INTERVAL and reads the log of those that changed, so
+    collaborators connected to different worker processes see each
+    other's edits and can reconnect to any worker.
+    """
+
+    def __init__(self, batch_window: float = COLLAB_BATCH_WINDOW, poll_interval: float = COLLAB_POLL_INTERVAL):
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.rooms: Dict[str, Room] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    async def join(self, workflow_id: str, subscriber: Subscriber, since: Optional[int] = None) -> bool:
+        """Subscribe to a workflow and queue its state for the subscriber.
+
+        With ``since`` the subscriber gets the deltas it missed, if they are
+        still in the log; otherwise (or without it) a full snapshot. Returns
+        False when the workflow does not exist.
+        """
+        self._loop = asyncio.get_running_loop()
+        room = await self._open_room(workflow_id)
+        if room is None:
+            return False
+        if since is not None:
+            replay = [entry for entry in room.log if entry[0] > since]
+            if room.version == since or (replay and replay[0][0] == since + 1):
+                room.subscribers.add(subscriber)
+                subscriber.send(encode("hello", version=room.version))
+                for version, changes, writers in replay:
+                    subscriber.send(encode(
+                        "delta", version=version, nodes=changes,
+                        authors=list(dict.fromkeys(writers.values())), ops=[],
+                    ))
+                return True
+
+        workflow = await asyncio.to_thread(get_workflow_store().get, workflow_id)
+        if workflow is None:
+            self._drop_if_idle(room)
+            return False
+        if workflow["version"] > room.version:
+            # Changed without being logged (e.g. replaced) since the room was opened
+            room.version = workflow["version"]
+            room.log.clear()
+        room.subscribers.add(subscriber)
+        subscriber.send(encode("snapshot", version=workflow["version"], workflow=workflow))
+        return True
+
+    async def _open_room(self, workflow_id: str) -> Optional[Room]:
+        """The workflow's room, created with its patch log from the store if needed"""
+        room = self.rooms.get(workflow_id)
+        if room is not None:
+            return room
+        found = await asyncio.to_thread(get_workflow_store().ops_since, workflow_id, 0)
+        if found is None:
+            return None
+        room = self.rooms.get(workflow_id)
+        if room is None:
+            version, ops = found
+            room = self.rooms[workflow_id] = Room(workflow_id, version)
+            if ops and ops[-1][0] == version:
+                room.log.extend(ops)
+            if self.poll_interval > 0 and self._poll_task is None:
+                self._poll_task = asyncio.create_task(self._poll())
+        return room
+
+    async def _poll(self):
+        """Pick up patches other worker processes applied to the open workflows"""
+        try:
+            while self.rooms:
+                await asyncio.sleep(self.poll_interval)
+                # One query per tick finds the rooms whose workflow moved on
+                rooms = [room for room in self.rooms.values() if room.version >= 0]  # -1: awaiting a resync
+                try:
+                    current = await asyncio.to_thread(
+                        get_workflow_store().current_versions, [room.workflow_id for room in rooms]
+                    )
+                except Exception as e:
+                    print(f"Failed to poll the workflow store: {e}")
+                    continue
+                for room in rooms:
+                    if current.get(room.workflow_id) != room.version and not room.lock.locked():
+                        async with room.lock:
+                            try:
+                                await self._catch_up(room)
+                            except Exception as e:
+                                print(f"Failed to poll workflow {room.workflow_id}: {e}")
+                    self._drop_if_idle(room)
+        finally:
+            self._poll_task = None
+
+    async def _catch_up(self, room: Room):
+        found = await asyncio.to_thread(get_workflow_store().ops_since, room.workflow_id, room.version)
+        if found is None:
+            self._reset(room.workflow_id, "deleted")
+            return
+        version, ops = found
+        if version == room.version:
+            return
+        if [op[0] for op in ops] != list(range(room.version + 1, version + 1)):
+            self._reset(room.workflow_id, "replaced")
+            return
+        for op_version, changes, writers in ops:
+            room.record(op_version, changes, writers)
+
+    def leave(self, workflow_id: str, subscriber: Subscriber):
+        room = self.rooms.get(workflow_id)
+        if room is None:
+            return
+        room.subscribers.discard(subscriber)
+        self._drop_if_idle(room)
+
+    def submit(self, workflow_id: str, subscriber: Subscriber, op: str, base_version: int, nodes: List[Dict[str, Any]]):
+        """Queue an edit; it is applied together with the rest of its batch window"""
+        room = self.rooms[workflow_id]
+        room.pending.append({
+            "op": op, "subscriber": subscriber, "base_version": base_version, "nodes": nodes,
+        })
+        if room.flush_task is None:
+            room.flush_task = asyncio.create_task(self._flush(room))
+
+    async def _flush(self, room: Room):
+        await asyncio.sleep(self.batch_window)
+        room.flush_task = None
+        edits, room.pending = room.pending, []
+        try:
+            async with room.lock:
+                await self._apply(room, edits)
+        finally:
+            self._drop_if_idle(room)
+
+    async def _apply(self, room: Room, edits: List[Dict[str, Any]]):
+        conflicts = 0
+        while True:
+            merged, writers, rejected = self._merge(room, edits)
+            if not merged:
+                break
+            try:
+                result = await asyncio.to_thread(
+                    get_workflow_store().patch_nodes,
+                    room.workflow_id, room.version, list(merged.values()), writers=writers,
+                )
+            except VersionConflict as e:
+                # A REST patch may have committed first; its record reaches the loop shortly
+                conflicts += 1
+                await asyncio.sleep(self.batch_window)
+                if room.version == e.current_version and conflicts < APPLY_ATTEMPTS:
+                    continue
+                room.version = e.current_version
+                room.log.clear()
+                for edit in edits:
+                    edit["subscriber"].send(encode("resync", op=edit["op"], version=e.current_version))
+                return
+            except NodeNotFound as e:
+                # Drop the unknown node and apply everything else
+                missing = e.args[0]
+                for edit in edits:
+                    if any(delta["id"] == missing for delta in edit["nodes"]):
+                        edit["subscriber"].send(encode("error", op=edit["op"], detail=f"Node not found: {missing}"))
+                        edit["nodes"] = [delta for delta in edit["nodes"] if delta["id"] != missing]
+                continue
+            except LookupError:
+                for edit in edits:
+                    edit["subscriber"].send(encode("error", op=edit["op"], detail="Workflow not found"))
+                return
+            analytics_cache.apply_patch(room.workflow_id, result)
+            applied = {(change["id"], field) for change in result["nodes"] for field in change if field != "id"}
+            room.record(
+                result["version"],
+                result["nodes"],
+                {key: client for key, client in writers.items() if key in applied},
+                [edit["op"] for edit in edits],
+            )
+            break
+        for edit in edits:
+            edit["subscriber"].send(encode(
+                "ack", op=edit["op"], version=room.version, rejected=rejected.get(edit["op"], []),
+            ))
+
+    def _merge(self, room: Room, edits: List[Dict[str, Any]]):
+        """Combine a batch of edits into one delta per node, dropping conflicting fields"""
+        merged: Dict[str, Dict[str, Any]] = {}
+        writers: Writers = {}
+        rejected: Dict[str, List[Dict[str, str]]] = {}
+        for edit in edits:
+            client = edit["subscriber"].client_id
+            touched = room.touched_since(edit["base_version"])
+            for delta in edit["nodes"]:
+                for field, value in delta.items():
+                    if field == "id":
+                        continue
+                    key = (delta["id"], field)
+                    if touched is None or touched.get(key, client) != client or writers.get(key, client) != client:
+                        rejected.setdefault(edit["op"], []).append({"id": delta["id"], "field": field})
+                        continue
+                    writers[key] = client
+                    merged.setdefault(delta["id"], {"id": delta["id"]})[field] = value
+        return merged, writers, rejected
+
+    def _drop_if_idle(self, room: Room):
+        if not room.subscribers and not room.pending and room.flush_task is None and not room.lock.locked():
+            if self.rooms.get(room.workflow_id) is room:
+                del self.rooms[room.workflow_id]
+
+    def publish(self, workflow_id: str, result: Dict[str, Any], author: str = "rest"):
+        """Log and broadcast a patch applied outside the hub; callable from any thread"""
+        self._call_in_loop(self._record, workflow_id, result, author)
+
+    def reset(self, workflow_id: str, reason: str):
+        """Tell subscribers to reload a workflow that was replaced or deleted; callable from any thread"""
+        self._call_in_loop(self._reset, workflow_id, reason)
+
+    def _record(self, workflow_id: str, result: Dict[str, Any], author: str):
+        room = self.rooms.get(workflow_id)
+        if room is not None:
+            room.record(result["version"], result["nodes"], field_writers(result["nodes"], author))
+
+    def _reset(self, workflow_id: str, reason: str):
+        room = self.rooms.get(workflow_id)
+        if room is not None:
+            # Unknown version: the next batch gets a VersionConflict and its authors a resync
+            room.version = -1
+            room.log.clear()
+            room.broadcast(encode("reset", reason=reason))
+
+    def _call_in_loop(self, callback, *args):
+        if self._loop is None or not self.rooms:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            callback(*args)
+        else:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workflows": len(self.rooms),
+            "subscribers": sum(len(room.subscribers) for room in self.rooms.values()),
+            "pending_edits": sum(len(room.pending) for room in self.rooms.values()),
+        }
+
+
+collab_hub = CollaborationHub()
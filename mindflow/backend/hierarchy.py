@@ -0,0 +1,156 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from typing_extensions import NotRequired, TypedDict
+
+# Hierarchical generation (overridable through the environment / .env file)
+HIERARCHY_MAX_PHASES = int(os.getenv("MINDFLOW_HIERARCHY_MAX_PHASES", "8"))
+HIERARCHY_STEPS_PER_PHASE = int(os.getenv("MINDFLOW_HIERARCHY_STEPS_PER_PHASE", "8"))
+
+# System prompt for the first, phase-level call of a hierarchical generation
+# (constant and unindented, like the generation prompt, so it caches upstream)
+OUTLINE_PROMPT = (
+    "You are a workflow designer. Break the user's request into its major phases and reply "
+    "with one JSON object:\n"
+    '{"phases":[{"id":"string","name":"string","goal":"string","depends_on":["phase id"]}],'
+    '"description":"string"}\n'
+    "Phases are large, self-contained stages of the plan; depends_on lists the phases that "
+    "must finish before a phase can start. Do not add whitespace outside strings."
+)
+
+
+class PhaseOutline(TypedDict):
+    id: str
+    name: str
+    goal: NotRequired[str]
+    depends_on: NotRequired[List[str]]
+
+
+class WorkflowOutline(TypedDict):
+    phases: List[PhaseOutline]
+    description: str
+
+
+outline_validator = TypeAdapter(WorkflowOutline)
+
+
+def parse_outline(content, max_phases: int = HIERARCHY_MAX_PHASES) -> Dict[str, Any]:
+    """Validate an outline completion and normalize its phase graph.
+
+    Keeps at most ``max_phases`` phases, drops duplicate phase ids and
+    dependencies on unknown (or later-listed) phases, so the phase graph is
+    acyclic. Raises ValidationError for invalid JSON or schema mismatches
+    and ValueError when the outline has no phases.
+    """
+    outline = outline_validator.validate_json(content)
+    phases, seen = [], set()
+    for phase in outline["phases"]:
+        if phase["id"] in seen:
+            continue
+        if len(phases) == max_phases:
+            break
+        phases.append({
+            "id": phase["id"],
+            "name": phase["name"],
+            "goal": phase.get("goal", ""),
+            "depends_on": [p for p in dict.fromkeys(phase.get("depends_on") or []) if p in seen],
+        })
+        seen.add(phase["id"])
+    if not phases:
+        raise ValueError("The outline has no phases")
+    return {"phases": phases, "description": outline["description"]}
+
+
+def phase_request(outline: Dict[str, Any], phase: Dict[str, Any], steps: int = HIERARCHY_STEPS_PER_PHASE) -> str:
+    """User message asking for the sub-workflow of one phase of ``outline``"""
+    names = {p["id"]: p["name"] for p in outline["phases"]}
+    overview = "\n".join(f"- {p['name']}: {p['goal']}" for p in outline["phases"])
+    after = ", ".join(names[p] for p in phase["depends_on"]) or "nothing (it starts the plan)"
+    return (
+        f"The overall plan has these phases:\n{overview}\n\n"
+        f"Generate only the steps of the phase \"{phase['name']}\" ({phase['goal']}), "
+        f"which follows {after}. Use about {steps} nodes, give every node a deadline, "
+        f"and connect them with edges from the first step of the phase to its last. "
+        f"Do not include steps of other phases."
+    )
+
+
+def phase_boundaries(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """Entry (no incoming edge) and exit (no outgoing edge) node ids of a sub-workflow"""
+    ids = [node["id"] for node in nodes]
+    known = set(ids)
+    sources = {edge["source"] for edge in edges}
+    targets = {edge["target"] for edge in edges}
+    for node in nodes:
+        for dep in node.get("dependencies") or []:
+            if dep in known:
+                sources.add(dep)
+                targets.add(node["id"])
+    entries = [i for i in ids if i not in targets] or ids[:1]
+    exits = [i for i in ids if i not in sources] or ids[-1:]
+    return entries, exits
+
+
+def stitch_phases(
+    outline: Dict[str, Any], phase_workflows: List[Optional[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """Merge per-phase workflows into one graph.
+
+    Node and edge ids are prefixed with the phase's position (``p1-``,
+    ``p2-`` ...) so they stay unique across phases, and every exit node of
+    a phase is linked to every entry node of each phase depending on it.
+    Phases that failed (``None``) are left out; a phase depending on one
+    is linked to that phase's own predecessors instead.
+    """
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+    boundaries: Dict[str, Tuple[List[str], List[str]]] = {}
+    depends_on = {phase["id"]: phase["depends_on"] for phase in outline["phases"]}
+
+    for index, (phase, workflow) in enumerate(zip(outline["phases"], phase_workflows), start=1):
+        if workflow is None:
+            continue
+        prefix = f"p{index}-"
+        for node in workflow["nodes"]:
+            nodes.append({
+                **node,
+                "id": prefix + node["id"],
+                "dependencies": [prefix + dep for dep in node.get("dependencies") or []],
+            })
+        for edge in workflow["edges"]:
+            edges.append({
+                **edge,
+                "id": prefix + edge["id"],
+                "source": prefix + edge["source"],
+                "target": prefix + edge["target"],
+            })
+        entries, exits = phase_boundaries(workflow["nodes"], workflow["edges"])
+        boundaries[phase["id"]] = ([prefix + i for i in entries], [prefix + i for i in exits])
+
+    def generated_predecessors(phase_id: str, visited: set) -> List[str]:
+        found = []
+        for dep in depends_on[phase_id]:
+            if dep in visited:
+                continue
+            visited.add(dep)
+            found.extend([dep] if dep in boundaries else generated_predecessors(dep, visited))
+        return found
+
+    by_id = {node["id"]: node for node in nodes}
+    for phase in outline["phases"]:
+        if phase["id"] not in boundaries:
+            continue
+        entries = boundaries[phase["id"]][0]
+        for dep in dict.fromkeys(generated_predecessors(phase["id"], set())):
+            for source in boundaries[dep][1]:
+                for target in entries:
+                    edges.append({
+                        "id": f"{source}>{target}",
+                        "source": source,
+                        "target": target,
+                        "label": "next phase",
+                    })
+                    by_id[target]["dependencies"].append(source)
+
+    return {"nodes": nodes, "edges": edges, "description": outline["description"]}
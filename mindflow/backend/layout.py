@@ -0,0 +1,235 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Layout configuration (overridable through the environment / .env file)
+LAYOUT_X_SPACING = float(os.getenv("MINDFLOW_LAYOUT_X_SPACING", "200"))
+LAYOUT_Y_SPACING = float(os.getenv("MINDFLOW_LAYOUT_Y_SPACING", "120"))
+LAYOUT_CACHE_ENTRIES = int(os.getenv("MINDFLOW_LAYOUT_CACHE_ENTRIES", "256"))
+
+# Barycenter sweeps (one down plus one up each) used to reduce crossings
+ORDERING_SWEEPS = 4
+
+Positions = Dict[str, Dict[str, float]]
+
+
+def graph_pairs(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """Distinct (source, target) pairs from edges and node dependencies"""
+    ids = {n["id"] for n in nodes}
+    pairs = set()
+    for edge in edges:
+        if edge.get("source") in ids and edge.get("target") in ids:
+            pairs.add((edge["source"], edge["target"]))
+    for node in nodes:
+        for dep in node.get("dependencies") or []:
+            if dep in ids:
+                pairs.add((dep, node["id"]))
+    return sorted(pairs)
+
+
+def graph_hash(ids: List[str], pairs: List[Tuple[str, str]]) -> str:
+    payload = json.dumps([ids, pairs], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def changed_layers(previous: Optional["LayeredLayout"], layout: "LayeredLayout") -> List[int]:
+    """Layers of ``layout`` whose nodes sit differently than in ``previous``
+    (coordinates follow from each layer's order, so equal layers did not move)"""
+    if previous is None:
+        return list(range(len(layout.layers)))
+    return [
+        k for k, members in enumerate(layout.layers)
+        if k >= len(previous.layers) or previous.layers[k] != members
+    ]
+
+
+class LayeredLayout:
+    """Sugiyama-style layered layout of one graph.
+
+    Cycles are broken by reversing DFS back edges, nodes are layered by
+    longest path from the sources, layers are ordered with barycenter
+    sweeps and then spread evenly around x = 0, one layer per row.
+
+    Given the layout of a previous version of the graph, only layers whose
+    membership or incident edges changed are reordered; every other layer
+    keeps its order and therefore its exact coordinates.
+    """
+
+    def __init__(self, ids: List[str], pairs: List[Tuple[str, str]], previous: Optional["LayeredLayout"] = None):
+        self.ids = ids
+        self.pairs = pairs
+        succ: Dict[str, List[str]] = {i: [] for i in ids}
+        for s, t in pairs:
+            if s != t:
+                succ[s].append(t)
+        self.succ = self._break_cycles(succ)
+        self.pred: Dict[str, List[str]] = {i: [] for i in ids}
+        for s, targets in self.succ.items():
+            for t in targets:
+                self.pred[t].append(s)
+
+        self.layer_of = self._assign_layers()
+        depth = max(self.layer_of.values(), default=-1) + 1
+        self.layers: List[List[str]] = [[] for _ in range(depth)]
+        for node_id in ids:
+            self.layers[self.layer_of[node_id]].append(node_id)
+
+        affected = self._affected_layers(previous)
+        if previous is not None:
+            self._seed_order(previous, affected)
+        self._order_layers(affected)
+        self.moved_layers = sorted(affected)
+        self.positions = self._coordinates()
+
+    def _break_cycles(self, succ: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Reverse back edges found by an iterative DFS so the graph is acyclic"""
+        state = {i: 0 for i in succ}  # 0 = unvisited, 1 = on stack, 2 = done
+        acyclic: Dict[str, List[str]] = {i: [] for i in succ}
+        for root in self.ids:
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(succ[root]))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    state[node] = 2
+                    stack.pop()
+                elif state[child] == 1:
+                    if node not in acyclic[child]:
+                        acyclic[child].append(node)
+                else:
+                    acyclic[node].append(child)
+                    if state[child] == 0:
+                        state[child] = 1
+                        stack.append((child, iter(succ[child])))
+        for node_id in acyclic:
+            acyclic[node_id] = list(dict.fromkeys(acyclic[node_id]))
+        return acyclic
+
+    def _assign_layers(self) -> Dict[str, int]:
+        """Longest-path layering: each node sits one row below its deepest predecessor"""
+        indegree = {i: len(self.pred[i]) for i in self.ids}
+        layer = {i: 0 for i in self.ids}
+        ready = [i for i in self.ids if indegree[i] == 0]
+        while ready:
+            node = ready.pop()
+            for child in self.succ[node]:
+                layer[child] = max(layer[child], layer[node] + 1)
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+        return layer
+
+    def _affected_layers(self, previous: Optional["LayeredLayout"]) -> Set[int]:
+        if previous is None:
+            return set(range(len(self.layers)))
+        affected = set()
+        for k, members in enumerate(self.layers):
+            if k >= len(previous.layers) or set(members) != set(previous.layers[k]):
+                affected.add(k)
+        for s, t in set(self.pairs).symmetric_difference(previous.pairs):
+            for node_id in (s, t):
+                if node_id in self.layer_of:
+                    affected.add(self.layer_of[node_id])
+        return affected
+
+    def _seed_order(self, previous: "LayeredLayout", affected: Set[int]):
+        """Start from the previous order: surviving nodes keep their x, new ones go last"""
+        old_x = {i: p["x"] for i, p in previous.positions.items()}
+        for k, members in enumerate(self.layers):
+            if k in affected:
+                members.sort(key=lambda i: (i not in old_x, old_x.get(i, 0.0)))
+            else:
+                members[:] = previous.layers[k]
+
+    def _order_layers(self, affected: Set[int]):
+        if not affected:
+            return
+        for _ in range(ORDERING_SWEEPS):
+            for k in range(1, len(self.layers)):
+                if k in affected:
+                    self._reorder(k, self.layers[k - 1], self.pred)
+            for k in range(len(self.layers) - 2, -1, -1):
+                if k in affected:
+                    self._reorder(k, self.layers[k + 1], self.succ)
+
+    def _reorder(self, k: int, reference: List[str], neighbours: Dict[str, List[str]]):
+        """Sort layer ``k`` by the mean index of each node's neighbours in ``reference``"""
+        rank = {node_id: idx for idx, node_id in enumerate(reference)}
+        members = self.layers[k]
+
+        def barycenter(item):
+            idx, node_id = item
+            linked = [rank[n] for n in neighbours[node_id] if n in rank]
+            return sum(linked) / len(linked) if linked else float(idx)
+
+        self.layers[k] = [node_id for _, node_id in sorted(enumerate(members), key=barycenter)]
+
+    def _coordinates(self) -> Positions:
+        positions = {}
+        for k, members in enumerate(self.layers):
+            offset = (len(members) - 1) / 2
+            for idx, node_id in enumerate(members):
+                positions[node_id] = {
+                    "x": (idx - offset) * LAYOUT_X_SPACING,
+                    "y": k * LAYOUT_Y_SPACING,
+                }
+        return positions
+
+
+class LayoutEngine:
+    """Layouts cached by graph hash, plus the latest layout per workflow key
+    so the next version of that workflow can be laid out incrementally"""
+
+    def __init__(self, max_entries: int = LAYOUT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._by_hash: "OrderedDict[str, LayeredLayout]" = OrderedDict()
+        self._latest: "OrderedDict[str, LayeredLayout]" = OrderedDict()
+
+    def layout(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], key: Optional[str] = None) -> LayeredLayout:
+        ids = list(dict.fromkeys(n["id"] for n in nodes))
+        pairs = graph_pairs(nodes, edges)
+        digest = graph_hash(ids, pairs)
+        with self._lock:
+            result = self._by_hash.get(digest)
+            if result is not None:
+                self._by_hash.move_to_end(digest)
+            previous = self._latest.get(key) if key else None
+
+        if result is None:
+            result = LayeredLayout(ids, pairs, previous)
+            with self._lock:
+                self._remember(self._by_hash, digest, result)
+        elif key:
+            # The cached layout's moved_layers describe the edit it was first
+            # computed for; report the layers moved since this workflow's last layout
+            result = copy.copy(result)
+            result.moved_layers = changed_layers(previous, result)
+
+        if key:
+            with self._lock:
+                self._remember(self._latest, key, result)
+        return result
+
+    def _remember(self, entries: "OrderedDict[str, LayeredLayout]", key: str, value: LayeredLayout):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def apply(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], key: Optional[str] = None) -> Positions:
+        """Lay out the graph and write each node's ``position`` in place"""
+        positions = self.layout(nodes, edges, key).positions
+        for node in nodes:
+            node["position"] = dict(positions[node["id"]])
+        return positions
+
+
+layout_engine = LayoutEngine()
@@ -0,0 +1,342 @@
+import asyncio
+import os
+import random
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from admission import AdmissionController, Ticket
+from metrics import LLM_TOKENS, LLM_RETRIES, LLM_CONTINUATIONS
+
+# LLM configuration (overridable through the environment / .env file)
+LLM_MODEL = os.getenv("MINDFLOW_LLM_MODEL", "gpt-4")
+LLM_TIMEOUT = float(os.getenv("MINDFLOW_LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("MINDFLOW_LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("MINDFLOW_LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_CONNECTIONS = int(os.getenv("MINDFLOW_LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_RETRIES = int(os.getenv("MINDFLOW_LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("MINDFLOW_LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("MINDFLOW_LLM_BACKOFF_MAX", "8"))
+LLM_JSON_MODE = os.getenv("MINDFLOW_LLM_JSON_MODE", "auto").lower()  # auto, on or off
+LLM_MAX_CONTINUATIONS = int(os.getenv("MINDFLOW_LLM_MAX_CONTINUATIONS", "2"))
+
+# Model name prefixes that accept response_format={"type": "json_object"}
+JSON_MODE_MODELS = (
+    "gpt-4o",
+    "gpt-4-turbo",
+    "gpt-4-1106",
+    "gpt-4-0125",
+    "gpt-4.1",
+    "gpt-3.5-turbo-1106",
+    "gpt-3.5-turbo-0125",
+)
+
+CONTINUE_PROMPT = (
+    "Your previous reply was cut off. Continue it exactly from its last character. "
+    "Do not repeat anything, do not restart the JSON and do not add commentary or code fences."
+)
+
+
+def upstream_errors() -> Tuple[type, ...]:
+    """OpenAI SDK errors a failed LLM call may raise.
+
+    The SDK is imported on first use rather than at module import: it is
+    the slowest import of the backend, and workers should start serving
+    cache hits and health checks before it has loaded.
+    """
+    import openai
+
+    return (openai.APIError,)
+
+
+def retryable_errors() -> Tuple[type, ...]:
+    """Upstream errors worth retrying after a pause"""
+    import openai
+
+    return (openai.RateLimitError, openai.InternalServerError)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Rough upper bound on a completion's token usage (~4 characters per token)"""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+def json_mode_for(model: str, setting: str = LLM_JSON_MODE) -> bool:
+    """Whether to request JSON mode: always, never, or (auto) for models known to support it"""
+    if setting in ("on", "true", "1"):
+        return True
+    if setting in ("off", "false", "0"):
+        return False
+    return model.startswith(JSON_MODE_MODELS)
+
+
+def continuation_messages(messages: List[Dict[str, str]], partial: str) -> List[Dict[str, str]]:
+    """Messages asking the model for only the rest of a truncated reply"""
+    return messages + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUE_PROMPT},
+    ]
+
+
+def strip_code_fence(text: str) -> str:
+    """Drop a Markdown code fence around (or at either end of) a reply.
+
+    Text without a fence is returned untouched; a continuation may begin
+    with whitespace that belongs inside a string.
+    """
+    if text.lstrip().startswith("```"):
+        text = text.lstrip()
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    if text.rstrip().endswith("```"):
+        text = text.rstrip()[:-3]
+    return text
+
+
+async def strip_leading_fence(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Pass streamed text through, minus a code fence opening the reply"""
+    head: Optional[str] = ""
+    async for delta in deltas:
+        if head is None:
+            yield delta
+            continue
+        head += delta
+        stripped = head.lstrip()
+        if "```".startswith(stripped) or (stripped.startswith("```") and "\n" not in stripped):
+            continue  # not yet known whether the reply opens with a fence
+        text, head = strip_code_fence(head), None
+        if text:
+            yield text
+    if head:
+        yield strip_code_fence(head)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the upstream Retry-After header, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ChatStream:
+    """Async iterator over completion text that holds an admission slot until closed"""
+
+    def __init__(self, stream, ticket: Ticket, prompt_tokens: int):
+        self._stream = stream
+        self._ticket = ticket
+        self._prompt_tokens = prompt_tokens
+        self._output_chars = 0
+        self.finish_reason: Optional[str] = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        try:
+            async for chunk in self._stream:
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    self.finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    self._output_chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        if not self._ticket.released:
+            self._ticket.used_tokens = self._prompt_tokens + self._output_chars // 4
+            LLM_TOKENS.inc(self._prompt_tokens, kind="prompt")
+            LLM_TOKENS.inc(self._output_chars // 4, kind="completion")
+            self._ticket.release()
+            await self._stream.response.aclose()
+
+
+class LLMClient:
+    """Async chat-completion client backed by a shared keep-alive connection pool.
+
+    Every call is admitted through an AdmissionController, which bounds the
+    number of completions in flight, orders waiting callers by priority and
+    enforces tokens-per-minute budgets. Upstream throttling is retried with
+    jittered exponential backoff. Models that support it are asked for JSON
+    mode output.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = LLM_MODEL,
+        timeout: float = LLM_TIMEOUT,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_retries: int = LLM_MAX_RETRIES,
+        admission: Optional[AdmissionController] = None,
+        json_mode: Optional[bool] = None,
+    ):
+        self.model = model
+        self.json_mode = json_mode_for(model) if json_mode is None else json_mode
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=self.timeout,
+        )
+        from openai import AsyncOpenAI
+
+        # Retries are handled by _with_backoff so they stay inside the admission slot
+        self._client = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=self._http,
+            max_retries=0,
+        )
+        self.admission = admission or AdmissionController(max_concurrency)
+
+    def _request_timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        """Per-call read/write timeout; connecting keeps the client's own limit"""
+        if not timeout:
+            return self.timeout
+        return httpx.Timeout(timeout, connect=self.timeout.connect)
+
+    def _format_params(self, json_mode: Optional[bool]) -> Dict[str, object]:
+        enabled = self.json_mode if json_mode is None else json_mode
+        return {"response_format": {"type": "json_object"}} if enabled else {}
+
+    async def _with_backoff(self, **params):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._client.chat.completions.create(**params)
+            except retryable_errors() as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = retry_after_seconds(e)
+                if retry_after and retry_after > LLM_BACKOFF_MAX:
+                    raise  # the caller gets a 429 carrying the Retry-After instead of a stalled slot
+                if retry_after:
+                    # Never retry before the server asked; jitter only spreads retries out after it
+                    delay = min(LLM_BACKOFF_MAX, retry_after + random.uniform(0, LLM_BACKOFF_BASE))
+                else:
+                    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                LLM_RETRIES.inc(error_class=type(e).__name__)
+                print(f"Upstream throttled ({type(e).__name__}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        timeout: Optional[float] = None,
+        client_id: str = "anonymous",
+        priority: int = 0,
+        json_mode: Optional[bool] = None,
+    ):
+        """Run a single chat completion once admitted"""
+        ticket = await self.admission.acquire(client_id, priority, estimate_tokens(messages, max_tokens))
+        async with ticket:
+            response = await self._with_backoff(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self._request_timeout(timeout),
+                **self._format_params(json_mode),
+            )
+            if response.usage is not None:
+                ticket.used_tokens = response.usage.total_tokens
+                LLM_TOKENS.inc(response.usage.prompt_tokens, kind="prompt")
+                LLM_TOKENS.inc(response.usage.completion_tokens, kind="completion")
+            return response
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        timeout: Optional[float] = None,
+        client_id: str = "anonymous",
+        priority: int = 0,
+        max_continuations: int = LLM_MAX_CONTINUATIONS,
+    ) -> Tuple[str, Optional[str]]:
+        """Completion text and final finish reason.
+
+        A reply cut off at ``max_tokens`` is extended with up to
+        ``max_continuations`` follow-up calls that ask only for the missing
+        remainder, instead of regenerating the whole reply.
+        """
+        response = await self.chat(
+            messages, temperature, max_tokens, timeout, client_id, priority
+        )
+        text = response.choices[0].message.content or ""
+        finish_reason = response.choices[0].finish_reason
+        for _ in range(max_continuations):
+            if finish_reason != "length":
+                break
+            LLM_CONTINUATIONS.inc()
+            print(f"Completion truncated after {len(text)} characters; requesting the remainder")
+            # JSON mode would force a fresh JSON object, so continuations are plain text
+            response = await self.chat(
+                continuation_messages(messages, text),
+                temperature, max_tokens, timeout, client_id, priority, json_mode=False,
+            )
+            text += strip_code_fence(response.choices[0].message.content or "")
+            finish_reason = response.choices[0].finish_reason
+        return text, finish_reason
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        timeout: Optional[float] = None,
+        client_id: str = "anonymous",
+        priority: int = 0,
+        json_mode: Optional[bool] = None,
+    ) -> ChatStream:
+        """Open a streaming completion once admitted.
+
+        Admission and upstream errors are raised here, before any text is
+        produced; the returned ChatStream releases its slot when exhausted
+        or closed.
+        """
+        ticket = await self.admission.acquire(client_id, priority, estimate_tokens(messages, max_tokens))
+        try:
+            stream = await self._with_backoff(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self._request_timeout(timeout),
+                stream=True,
+                **self._format_params(json_mode),
+            )
+        except BaseException:
+            ticket.release()
+            raise
+        return ChatStream(stream, ticket, estimate_tokens(messages, 0))
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client, creating it on first use"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
+
+
+async def close_llm_client():
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
@@ -0,0 +1,258 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) shared by the request and stage histograms
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def label_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        f'{k}="' + v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(label_key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{format_labels(k)} {format_value(v)}" for k, v in values]
+
+
+class Gauge(Metric):
+    """Point-in-time values, read from ``callback`` at scrape time.
+
+    The callback returns either a plain number or ``{label_key(labels): value}``
+    for labelled series; ``None`` values are skipped.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], object]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self.header() + [
+            f"{self.name}{format_labels(k)} {format_value(v)}" for k, v in values.items() if v is not None
+        ]
+
+
+class CallbackCounter(Gauge):
+    """Counter whose totals are kept elsewhere and read at scrape time"""
+
+    kind = "counter"
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            series = [(k, list(counts), total[0]) for k, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(key, ('le', format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                print(f"Failed to collect {metric.name}: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "mindflow_http_request_duration_seconds", "HTTP request latency by route, method and status"
+))
+STAGE_SECONDS = registry.register(Histogram(
+    "mindflow_generation_stage_duration_seconds", "Time spent in each stage of workflow generation"
+))
+LLM_TOKENS = registry.register(Counter(
+    "mindflow_llm_tokens_total", "LLM tokens used, by kind (prompt/completion; streamed output is estimated)"
+))
+LLM_RETRIES = registry.register(Counter(
+    "mindflow_llm_retries_total", "Upstream calls retried after throttling or server errors"
+))
+LLM_CONTINUATIONS = registry.register(Counter(
+    "mindflow_llm_continuations_total", "Follow-up calls requesting the rest of a truncated completion"
+))
+SALVAGED = registry.register(Counter(
+    "mindflow_salvaged_workflows_total", "Invalid completions recovered from their complete nodes and edges"
+))
+SIMILARITY_LOOKUPS = registry.register(Counter(
+    "mindflow_similarity_lookups_total", "Similarity index lookups by result (hit, examples, miss)"
+))
+ERRORS = registry.register(Counter(
+    "mindflow_errors_total", "Failed generations by error class"
+))
+
+
+# ----- per-request tracing -----
+
+# Stage timings of the request being handled (None outside a request)
+current_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into STAGE_SECONDS and the current request's trace"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+def server_timing(trace: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value (durations in milliseconds)"""
+    entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in trace]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template.
+
+    Requests carrying ``trace_header`` get a ``Server-Timing`` response
+    header listing the stages timed while producing the response.
+    """
+
+    def __init__(self, app, trace_header: str = "x-mindflow-trace"):
+        self.app = app
+        self.trace_header = trace_header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        traced = any(k == self.trace_header for k, _ in scope.get("headers", ()))
+        trace: List[Tuple[str, float]] = []
+        token = current_trace.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if traced:
+                    header = server_timing(trace, time.perf_counter() - start)
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))],
+                    }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_trace.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                route=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=status,
+            )
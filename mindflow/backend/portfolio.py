@@ -0,0 +1,313 @@
+import math
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from analytics import as_cost, deadline_ordinal
+
+# Status that counts a step as done (completion rate, overdue steps)
+COMPLETED_STATUS = "Completed"
+# Columns are compacted once this fraction of their rows belongs to replaced or deleted workflows
+COMPACT_FRACTION = 0.5
+# Workflows reloaded in one sync above which all node rows are read in a single scan
+FULL_SCAN_FRACTION = 0.5
+# Most points in a deadline burn-down; wider deadline ranges get wider buckets
+BURNDOWN_MAX_POINTS = 400
+# Workflows listed in the overdue ranking
+OVERDUE_TOP = 10
+
+ROW_COLUMNS = ("workflow", "status", "deadline", "estimated", "actual", "live")
+
+
+def grow(column: np.ndarray, capacity: int, used: int) -> np.ndarray:
+    """Zero-padded copy of the first ``used`` entries of ``column`` with room for ``capacity``"""
+    grown = np.zeros(capacity, dtype=column.dtype)
+    grown[:used] = column[:used]
+    return grown
+
+
+class Labels:
+    """Dense integer codes for strings (statuses, types, owners)"""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, label: str) -> int:
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def get(self, label: str) -> Optional[int]:
+        return self._codes.get(label)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class PortfolioColumns:
+    """Node-level fields of every saved workflow as numpy columns.
+
+    Each node is one row holding its workflow code, status code, deadline
+    (day ordinal, NaN when missing) and estimated / actual cost; type,
+    owner and name are kept once per workflow. The first ``sync`` loads
+    every workflow; later ones read the store's change log and reload only
+    the rows of workflows saved, patched or deleted since, from the store's
+    indexed node columns rather than the node documents, so every worker
+    process stays current whichever worker made the change. If the log no
+    longer reaches back to the last sync, workflow versions are compared
+    with the whole store instead. Rows of replaced or deleted
+    workflows are marked dead and compacted away once they make up
+    COMPACT_FRACTION of the columns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.workflow = np.zeros(0, dtype=np.int32)
+        self.status = np.zeros(0, dtype=np.int16)
+        self.deadline = np.zeros(0, dtype=np.float64)
+        self.estimated = np.zeros(0, dtype=np.float64)
+        self.actual = np.zeros(0, dtype=np.float64)
+        self.live = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._dead = 0
+        self._statuses = Labels()
+        self._types = Labels()
+        self._owners = Labels()
+        self._codes: Dict[str, int] = {}  # workflow id -> workflow code
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._wf_type = np.zeros(0, dtype=np.int32)
+        self._wf_owner = np.zeros(0, dtype=np.int32)
+        self._wf_alive = np.zeros(0, dtype=bool)
+        self._versions: Dict[str, int] = {}
+        self._seq: Optional[int] = None  # store change log position of the last sync
+        self._rows: Dict[str, np.ndarray] = {}  # workflow id -> its row indices
+        self._days: Dict[Any, float] = {}  # deadline string -> day ordinal
+
+    def __len__(self) -> int:
+        return self._size - self._dead
+
+    def sync(self, store) -> int:
+        """Catch up with the store; returns the number of workflows reloaded"""
+        found = store.changes_since(self._seq) if self._seq is not None else None
+        if found is None:
+            seq = store.change_seq()  # read first: changes made during the scan are replayed next time
+            reloaded = self._load(store, store.versions(), None)
+        else:
+            seq, ids = found
+            reloaded = self._load(store, store.versions(ids), ids) if ids else 0
+        self._seq = seq
+        return reloaded
+
+    def _load(self, store, current: List[tuple], ids: Optional[List[str]]) -> int:
+        """Reload the workflows in ``current`` whose version changed and drop
+        those of ``ids`` (of every known workflow when None) not in it"""
+        with self._lock:
+            seen = set()
+            changed = []
+            for workflow_id, version, owner, workflow_type, name in current:
+                seen.add(workflow_id)
+                if self._versions.get(workflow_id) != version:
+                    changed.append((workflow_id, version, owner, workflow_type, name))
+            candidates = self._versions if ids is None else [w for w in ids if w in self._versions]
+            for workflow_id in [w for w in candidates if w not in seen]:
+                self._drop(workflow_id)
+                self._wf_alive[self._codes[workflow_id]] = False
+                del self._versions[workflow_id]
+            if changed:
+                ids = [entry[0] for entry in changed]
+                full_scan = len(changed) > FULL_SCAN_FRACTION * max(len(self._versions), len(current), 1)
+                rows = store.node_columns(None if full_scan else ids)
+                by_workflow: Dict[str, list] = {workflow_id: [] for workflow_id in ids}
+                for row in rows:
+                    found = by_workflow.get(row[0])
+                    if found is not None:
+                        found.append(row)
+                for workflow_id, version, owner, workflow_type, name in changed:
+                    code = self._workflow_code(workflow_id)
+                    self._names[code] = name
+                    self._wf_type[code] = self._types.code(workflow_type)
+                    self._wf_owner[code] = self._owners.code(owner)
+                    self._wf_alive[code] = True
+                    self._drop(workflow_id)
+                    self._rows[workflow_id] = self._append(code, by_workflow[workflow_id])
+                    self._versions[workflow_id] = version
+            if self._dead > COMPACT_FRACTION * max(self._size, 1):
+                self._compact()
+            return len(changed)
+
+    def _workflow_code(self, workflow_id: str) -> int:
+        code = self._codes.get(workflow_id)
+        if code is None:
+            code = self._codes[workflow_id] = len(self._ids)
+            self._ids.append(workflow_id)
+            self._names.append("")
+            if code == len(self._wf_type):
+                capacity = max(64, 2 * code)
+                self._wf_type = grow(self._wf_type, capacity, code)
+                self._wf_owner = grow(self._wf_owner, capacity, code)
+                self._wf_alive = grow(self._wf_alive, capacity, code)
+        return code
+
+    def _drop(self, workflow_id: str):
+        rows = self._rows.pop(workflow_id, None)
+        if rows is not None and len(rows):
+            self.live[rows] = False
+            self._dead += len(rows)
+
+    def _append(self, code: int, rows: List[tuple]) -> np.ndarray:
+        """Write node rows at the end of the columns and return their indices"""
+        start, end = self._size, self._size + len(rows)
+        if end > len(self.live):
+            capacity = max(1024, end, 2 * len(self.live))
+            for name in ROW_COLUMNS:
+                setattr(self, name, grow(getattr(self, name), capacity, self._size))
+        days = self._days
+        for _, _, deadline, _, _ in rows:
+            if deadline not in days:
+                days[deadline] = deadline_ordinal(deadline)
+        self.status[start:end] = [self._statuses.code(str(row[1] or "")) for row in rows]
+        self.deadline[start:end] = [days[row[2]] for row in rows]
+        self.estimated[start:end] = [as_cost(row[3]) for row in rows]
+        self.actual[start:end] = [as_cost(row[4]) for row in rows]
+        self.workflow[start:end] = code
+        self.live[start:end] = True
+        self._size = end
+        return np.arange(start, end)
+
+    def _compact(self):
+        keep = np.flatnonzero(self.live[:self._size])
+        remap = np.full(self._size, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        for name in ROW_COLUMNS:
+            setattr(self, name, getattr(self, name)[keep])
+        self._rows = {workflow_id: remap[rows] for workflow_id, rows in self._rows.items()}
+        self._size = len(keep)
+        self._dead = 0
+
+    def report(
+        self,
+        owner: Optional[str] = None,
+        workflow_type: Optional[str] = None,
+        as_of: Optional[date] = None,
+        bucket_days: int = 7,
+    ) -> Dict[str, Any]:
+        """Completion, cost variance, overdue steps and deadline burn-down
+        across the saved workflows, optionally of one owner and/or type"""
+        today = (as_of or date.today()).toordinal()
+        with self._lock:
+            n, workflows = self._size, len(self._ids)
+            row_workflow = self.workflow[:n]
+            mask = self.live[:n].copy()
+            selected = self._wf_alive[:workflows].copy()
+            for value, labels, column in (
+                (owner, self._owners, self._wf_owner), (workflow_type, self._types, self._wf_type)
+            ):
+                if value is not None:
+                    code = labels.get(value)
+                    selected &= column[:workflows] == (-1 if code is None else code)
+            mask &= selected[row_workflow]
+
+            types = self._wf_type[row_workflow[mask]]
+            type_count = len(self._types)
+            completed_code = self._statuses.get(COMPLETED_STATUS)
+            done = self.status[:n][mask] == (-1 if completed_code is None else completed_code)
+            deadline = self.deadline[:n][mask]
+            estimated = self.estimated[:n][mask]
+            actual = self.actual[:n][mask]
+            overdue = (deadline < today) & ~done
+
+            per_type = {
+                "workflows": np.bincount(self._wf_type[:workflows][selected], minlength=type_count),
+                "steps": np.bincount(types, minlength=type_count),
+                "completed": np.bincount(types, weights=done, minlength=type_count),
+                "overdue_steps": np.bincount(types, weights=overdue, minlength=type_count),
+                "over_budget_steps": np.bincount(types, weights=actual > estimated, minlength=type_count),
+                "estimated_cost": np.bincount(types, weights=estimated, minlength=type_count),
+                "actual_cost": np.bincount(types, weights=actual, minlength=type_count),
+            }
+            by_type = [
+                summarize(label, {name: values[code] for name, values in per_type.items()})
+                for code, label in sorted(enumerate(self._types.labels), key=lambda item: item[1])
+                if per_type["workflows"][code]
+            ]
+            totals = summarize(None, {name: values.sum() for name, values in per_type.items()})
+
+            overdue_per_workflow = np.bincount(row_workflow[mask], weights=overdue, minlength=workflows)
+            top = np.argsort(-overdue_per_workflow, kind="stable")[:OVERDUE_TOP]
+            overdue_workflows = [
+                {
+                    "workflow_id": self._ids[code],
+                    "name": self._names[code],
+                    "workflow_type": self._types.labels[self._wf_type[code]],
+                    "overdue_steps": int(overdue_per_workflow[code]),
+                }
+                for code in top
+                if overdue_per_workflow[code] > 0
+            ]
+
+        return {
+            "as_of": date.fromordinal(today).isoformat(),
+            "totals": totals,
+            "by_type": by_type,
+            "overdue_workflows": overdue_workflows,
+            "burndown": burndown(deadline, done, bucket_days),
+        }
+
+
+def summarize(workflow_type: Optional[str], sums: Dict[str, float]) -> Dict[str, Any]:
+    steps = int(sums["steps"])
+    estimated, actual = float(sums["estimated_cost"]), float(sums["actual_cost"])
+    summary = {"workflow_type": workflow_type} if workflow_type is not None else {}
+    summary.update({
+        "workflows": int(sums["workflows"]),
+        "steps": steps,
+        "completed": int(sums["completed"]),
+        "completion_rate": float(sums["completed"]) / steps if steps else 0.0,
+        "overdue_steps": int(sums["overdue_steps"]),
+        "over_budget_steps": int(sums["over_budget_steps"]),
+        "estimated_cost": estimated,
+        "actual_cost": actual,
+        "cost_variance": actual - estimated,
+        "cost_variance_pct": (actual - estimated) / estimated if estimated else None,
+    })
+    return summary
+
+
+def burndown(deadline: np.ndarray, done: np.ndarray, bucket_days: int) -> Dict[str, Any]:
+    """Steps due per deadline bucket, the steps still planned after each
+    bucket and how many of the steps due by then are still open"""
+    scheduled = ~np.isnan(deadline)
+    days, open_steps = deadline[scheduled].astype(np.int64), ~done[scheduled]
+    if not len(days):
+        return {"bucket_days": bucket_days, "points": []}
+    first, last = int(days.min()), int(days.max())
+    bucket_days = max(bucket_days, math.ceil((last - first + 1) / BURNDOWN_MAX_POINTS))
+    buckets = (days - first) // bucket_days
+    due = np.bincount(buckets)
+    still_open = np.bincount(buckets, weights=open_steps, minlength=len(due))
+    remaining = len(days) - np.cumsum(due)
+    open_due = np.cumsum(still_open)
+    return {
+        "bucket_days": bucket_days,
+        "points": [
+            {
+                "date": date.fromordinal(first + i * bucket_days).isoformat(),
+                "due": int(due[i]),
+                "remaining": int(remaining[i]),
+                "open_due": int(open_due[i]),
+            }
+            for i in range(len(due))
+        ],
+    }
+
+
+portfolio = PortfolioColumns()
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+# Render service configuration (overridable through the environment / .env file)
+RENDER_WORKERS = int(os.getenv("MINDFLOW_RENDER_WORKERS", "2"))
+RENDER_TIMEOUT = float(os.getenv("MINDFLOW_RENDER_TIMEOUT", "60"))
+RENDER_CACHE_DIR = os.getenv(
+    "MINDFLOW_RENDER_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_cache"),
+)
+RENDER_MAX_DOT_BYTES = int(os.getenv("MINDFLOW_RENDER_MAX_DOT_BYTES", str(512 * 1024)))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("MINDFLOW_RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RENDER_CACHE_MAX_AGE = float(os.getenv("MINDFLOW_RENDER_CACHE_MAX_AGE", str(7 * 86400)))
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+
+# Attributes (and HTML-label <IMG> tags) that make Graphviz read files from
+# the server; workflow diagrams never need them
+FILE_ATTRIBUTES = re.compile(
+    r"""(?<![\w"])"?(?:image|imagepath|shapefile|fontpath)"?\s*=|<\s*img\b""", re.IGNORECASE
+)
+
+# Graphviz refuses to load any image file when SERVER_NAME is set without
+# GV_FILE_PATH, which backs up the attribute check above
+DOT_ENV = {
+    **{name: value for name, value in os.environ.items() if name != "GV_FILE_PATH"},
+    "SERVER_NAME": "mindflow",
+}
+
+
+class RenderError(Exception):
+    """Raised when Graphviz rejects the DOT source or cannot be run"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def check_dot(source: str):
+    """Reject DOT source that is too large or would read files on the server"""
+    if len(source.encode("utf-8")) > RENDER_MAX_DOT_BYTES:
+        raise RenderError(f"Diagram too large: at most {RENDER_MAX_DOT_BYTES} bytes of DOT are rendered", 413)
+    if FILE_ATTRIBUTES.search(source):
+        raise RenderError("Diagrams may not reference files (image, imagepath, shapefile, fontpath, <IMG>)")
+
+
+def dot_digest(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class RenderService:
+    """Renders DOT source to PNG/SVG/PDF with the Graphviz ``dot`` binary.
+
+    At most ``workers`` ``dot`` subprocesses run at once; waiting for them
+    never blocks the event loop. Outputs are stored on disk under their
+    (DOT hash, format) address, so a repeated export of an unchanged
+    diagram is a file read. Concurrent requests for the same output share
+    one render. Cached files older than ``max_age`` are removed, then the
+    least recently used ones until the directory fits in ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = RENDER_CACHE_DIR,
+        workers: int = RENDER_WORKERS,
+        timeout: float = RENDER_TIMEOUT,
+        max_bytes: int = RENDER_CACHE_MAX_BYTES,
+        max_age: float = RENDER_CACHE_MAX_AGE,
+    ):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._slots = asyncio.Semaphore(workers)
+        self._pending: Dict[str, asyncio.Future] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, digest: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.{fmt}")
+
+    def cached_path(self, digest: str, fmt: str) -> Optional[str]:
+        path = self.path_for(digest, fmt)
+        try:
+            os.utime(path)  # the modification time doubles as last use for eviction
+        except FileNotFoundError:
+            return None
+        return path
+
+    async def render(self, source: str, fmt: str) -> Tuple[str, str, bool]:
+        """Return (digest, file path, served_from_cache) for the rendered diagram"""
+        if fmt not in MEDIA_TYPES:
+            raise RenderError(f"Unsupported format: {fmt}")
+        check_dot(source)
+        digest = dot_digest(source)
+        path = self.cached_path(digest, fmt)
+        if path is not None:
+            return digest, path, True
+
+        key = f"{digest}.{fmt}"
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(source, fmt, digest))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return digest, await asyncio.shield(pending), False
+
+    async def _render(self, source: str, fmt: str, digest: str) -> str:
+        async with self._slots:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    "dot", f"-T{fmt}",
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=DOT_ENV,
+                )
+            except FileNotFoundError:
+                raise RenderError("Graphviz 'dot' executable not found", status_code=503)
+            try:
+                output, stderr = await asyncio.wait_for(process.communicate(source.encode("utf-8")), self.timeout)
+            except asyncio.TimeoutError:
+                raise RenderError("Rendering timed out", status_code=504)
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+        if process.returncode != 0:
+            raise RenderError(f"Graphviz failed: {stderr.decode(errors='replace').strip()}")
+        return await asyncio.to_thread(self._store, self.path_for(digest, fmt), output)
+
+    def _store(self, path: str, output: bytes) -> str:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(output)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove expired outputs, then the least recently used ones over
+        ``max_bytes``, sparing ``keep`` (the output about to be served)"""
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(".tmp") and entry.path != keep:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        expires = time.time() - self.max_age
+        total = sum(size for _, size, _ in files) + (os.path.getsize(keep) if keep else 0)
+        for mtime, size, path in files:
+            if mtime >= expires and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+_render_service: Optional[RenderService] = None
+
+
+def get_render_service() -> RenderService:
+    """Return the process-wide render service, creating it on first use"""
+    global _render_service
+    if _render_service is None:
+        _render_service = RenderService()
+    return _render_service
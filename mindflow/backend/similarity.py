@@ -0,0 +1,218 @@
+import math
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Similarity index configuration (overridable through the environment / .env file)
+SIMILARITY_MAX_ENTRIES = int(os.getenv("MINDFLOW_SIMILARITY_MAX_ENTRIES", "100000"))
+SIMILARITY_DIMENSIONS = int(os.getenv("MINDFLOW_SIMILARITY_DIMENSIONS", "256"))
+SIMILARITY_THRESHOLD = float(os.getenv("MINDFLOW_SIMILARITY_THRESHOLD", "0.95"))
+SIMILARITY_EXAMPLE_MIN_SCORE = float(os.getenv("MINDFLOW_SIMILARITY_EXAMPLE_MIN_SCORE", "0.3"))
+SIMILARITY_EXAMPLES = int(os.getenv("MINDFLOW_SIMILARITY_EXAMPLES", "2"))
+# Picking up other workers' prompts only matters when several workers share
+# the disk tier and store, which production mode signals through MINDFLOW_STATE_PATH; 0 disables
+SIMILARITY_POLL_INTERVAL = float(os.getenv(
+    "MINDFLOW_SIMILARITY_POLL_INTERVAL", "5" if os.getenv("MINDFLOW_STATE_PATH") else "0"
+))
+
+# Row weights are recomputed with fresh IDF once this fraction of the rows changed
+IDF_REFRESH_FRACTION = 0.25
+# Rows reweighted at a time during an IDF refresh (bounds the temporary float32 copy)
+REFRESH_CHUNK_ROWS = 8192
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from i in into is it me my of on or our please "
+    "that the their this to we with want need create make generate".split()
+)
+
+Match = Tuple[float, str, str]  # (cosine similarity, cache key, prompt)
+
+
+def prompt_terms(prompt: str) -> List[str]:
+    """Content words of a prompt in order (case folded, stop words removed)"""
+    return [term for term in TOKEN_PATTERN.findall(prompt.casefold()) if term not in STOP_WORDS]
+
+
+def prompt_features(prompt: str, dimensions: int) -> Dict[int, int]:
+    """Hashed counts of a prompt's words and adjacent word pairs; the pairs
+    make word order count, so "from mysql to postgres" and "from postgres to
+    mysql" no longer score as the same prompt"""
+    terms = prompt_terms(prompt)
+    counts: Dict[int, int] = {}
+    for term in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+        index = zlib.crc32(term.encode("utf-8")) % dimensions
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def same_term_order(prompt: str, other: str) -> bool:
+    """Whether the content words two prompts share appear in the same order in both"""
+    terms, other_terms = prompt_terms(prompt), prompt_terms(other)
+    shared = set(terms) & set(other_terms)
+    return [t for t in terms if t in shared] == [t for t in other_terms if t in shared]
+
+
+def grow(array: np.ndarray, size: int, axis: int = 0) -> np.ndarray:
+    """Copy of ``array`` zero-padded to ``size`` along ``axis``"""
+    shape = list(array.shape)
+    shape[axis] = size
+    grown = np.zeros(shape, dtype=array.dtype)
+    grown[(slice(None),) * axis + (slice(0, array.shape[axis]),)] = array
+    return grown
+
+
+class SimilarityIndex:
+    """In-memory TF-IDF index over the prompts of generated workflows.
+
+    Prompts are hashed into ``dimensions`` buckets (no vocabulary to
+    maintain), weighted by sublinear TF times IDF and L2-normalized. The
+    weights are stored feature-major, so a search only reads the handful
+    of feature rows present in the query instead of the whole matrix. Rows are
+    added incrementally; IDF is snapshotted and the row weights are
+    recomputed only once IDF_REFRESH_FRACTION of the rows changed since
+    the last snapshot. Once ``max_entries`` is reached the oldest row is
+    overwritten.
+
+    Entries point at workflow cache keys or saved workflow ids; the
+    workflows themselves stay in the cache and the store.
+    """
+
+    def __init__(self, max_entries: int = SIMILARITY_MAX_ENTRIES, dimensions: int = SIMILARITY_DIMENSIONS):
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._tf = np.zeros((0, self.dimensions), dtype=np.float16)
+        self._weights = np.zeros((self.dimensions, 0), dtype=np.float32)  # feature-major
+        self._groups = np.zeros(0, dtype=np.int32)
+        self._df = np.zeros(self.dimensions, dtype=np.int64)
+        self._idf = np.ones(self.dimensions, dtype=np.float32)
+        self._changes = 0  # rows written since the last IDF refresh
+        self._keys: List[Optional[str]] = []
+        self._prompts: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._group_codes: Dict[str, int] = {}
+        self._size = 0
+        self._next = 0  # next row to write once the index is full
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def add(self, key: str, prompt: str, group: str):
+        """Index ``prompt`` under ``key``; searches only match rows of the same ``group``"""
+        counts = prompt_features(prompt, self.dimensions)
+        if not counts:
+            return
+        tf = np.zeros(self.dimensions, dtype=np.float32)
+        tf[list(counts)] = [1.0 + math.log(c) for c in counts.values()]
+
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._allocate()
+            else:
+                self._df -= self._tf[row] > 0
+            self._tf[row] = tf
+            self._df += tf > 0
+            self._groups[row] = self._group_codes.setdefault(group, len(self._group_codes))
+            self._keys[row] = key
+            self._prompts[row] = prompt
+            self._rows[key] = row
+            self._changes += 1
+            if self._changes >= self._size * IDF_REFRESH_FRACTION:
+                self._refresh_idf()
+            else:
+                self._weights[:, row] = self._weigh(tf)
+
+    def discard(self, key: str):
+        """Stop matching ``key`` (e.g. once its workflow left the cache)"""
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._df -= self._tf[row] > 0
+                self._tf[row] = 0
+                self._weights[:, row] = 0
+                self._groups[row] = -1
+                self._keys[row] = None
+
+    def search(self, prompt: str, group: str, k: int = SIMILARITY_EXAMPLES) -> List[Match]:
+        """The ``k`` most similar prompts of ``group``, best first"""
+        counts = prompt_features(prompt, self.dimensions)
+        with self._lock:
+            code = self._group_codes.get(group)
+            if code is None or not counts or k <= 0:
+                return []
+            features = np.fromiter(counts, dtype=np.intp, count=len(counts))
+            query = np.zeros(self.dimensions, dtype=np.float32)
+            query[features] = [1.0 + math.log(c) for c in counts.values()]
+            query = self._weigh(query)
+            scores = query[features] @ self._weights[features, :self._size]
+            scores[self._groups[:self._size] != code] = -1.0
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (float(scores[row]), self._keys[row], self._prompts[row])
+                for row in top
+                if scores[row] > 0
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._rows),
+                "max_entries": self.max_entries,
+                "dimensions": self.dimensions,
+                "groups": len(self._group_codes),
+                "memory_bytes": self._tf.nbytes + self._weights.nbytes,
+            }
+
+    def _allocate(self) -> int:
+        """Row for a new entry: the next free one, or the oldest once full"""
+        if self._size < self.max_entries:
+            if self._size == len(self._tf):
+                capacity = min(self.max_entries, max(64, 2 * len(self._tf)))
+                self._tf = grow(self._tf, capacity)
+                self._weights = grow(self._weights, capacity, axis=1)
+                self._groups = grow(self._groups, capacity)
+                self._keys.extend([None] * (capacity - len(self._keys)))
+                self._prompts.extend([""] * (capacity - len(self._prompts)))
+            self._size += 1
+            return self._size - 1
+        row = self._next
+        self._next = (self._next + 1) % self.max_entries
+        old_key = self._keys[row]
+        if old_key is not None:
+            del self._rows[old_key]
+            self._df -= self._tf[row] > 0
+        return row
+
+    def _weigh(self, tf: np.ndarray) -> np.ndarray:
+        weights = tf * self._idf
+        norm = np.linalg.norm(weights, axis=-1, keepdims=True)
+        return weights / np.maximum(norm, 1e-12)
+
+    def _refresh_idf(self):
+        entries = max(len(self._rows), 1)
+        self._idf = (np.log((1 + entries) / (1 + self._df)) + 1.0).astype(np.float32)
+        for start in range(0, self._size, REFRESH_CHUNK_ROWS):
+            end = min(start + REFRESH_CHUNK_ROWS, self._size)
+            self._weights[:, start:end] = self._weigh(self._tf[start:end].astype(np.float32)).T
+        self._changes = 0
+
+
+similarity_index = SimilarityIndex()
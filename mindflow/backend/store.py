@@ -0,0 +1,436 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Workflow store configuration (overridable through the environment / .env file)
+DB_PATH = os.getenv(
+    "MINDFLOW_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "mindflow.db")
+)
+# Node patches kept per workflow in workflow_ops (collaboration conflict checks and reconnects)
+OP_LOG_SIZE = int(os.getenv("MINDFLOW_COLLAB_LOG_SIZE", "1000"))
+# Workflow saves, patches and deletes kept in workflow_changes (portfolio column updates)
+CHANGE_LOG_SIZE = int(os.getenv("MINDFLOW_CHANGE_LOG_SIZE", "10000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    workflow_type TEXT NOT NULL,
+    prompt TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    edges TEXT NOT NULL DEFAULT '[]',
+    node_count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workflows_owner ON workflows (owner, created_at);
+CREATE INDEX IF NOT EXISTS idx_workflows_type ON workflows (workflow_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_workflows_created_at ON workflows (created_at);
+
+CREATE TABLE IF NOT EXISTS workflow_nodes (
+    workflow_id TEXT NOT NULL REFERENCES workflows (id) ON DELETE CASCADE,
+    node_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT,
+    deadline TEXT,
+    estimated_cost REAL,
+    actual_cost REAL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, node_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS workflow_ops (
+    workflow_id TEXT NOT NULL REFERENCES workflows (id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    changes TEXT NOT NULL,
+    writers TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, version)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS workflow_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow_id TEXT NOT NULL
+);
+"""
+
+SUMMARY_COLUMNS = "id, owner, name, workflow_type, node_count, version, created_at, updated_at"
+
+
+class WorkflowNotFound(LookupError):
+    pass
+
+
+class NodeNotFound(LookupError):
+    pass
+
+
+Writers = Dict[Tuple[str, str], str]  # (node id, field) -> client that set it
+Op = Tuple[int, List[Dict[str, Any]], Writers]  # (version, changed fields per node, writers)
+
+
+class VersionConflict(Exception):
+    """Raised when a patch was based on an outdated workflow version"""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Workflow is at version {current_version}")
+        self.current_version = current_version
+
+
+def log_change(conn: sqlite3.Connection, workflow_id: str):
+    """Record a change to ``workflow_id`` inside the caller's transaction"""
+    seq = conn.execute("INSERT INTO workflow_changes (workflow_id) VALUES (?)", (workflow_id,)).lastrowid
+    conn.execute("DELETE FROM workflow_changes WHERE seq <= ?", (seq - CHANGE_LOG_SIZE,))
+
+
+def node_row(workflow_id: str, position: int, node: Dict[str, Any]) -> tuple:
+    return (
+        workflow_id,
+        node["id"],
+        position,
+        node.get("status"),
+        node.get("deadline"),
+        node.get("estimated_cost"),
+        node.get("actual_cost"),
+        json.dumps(node),
+    )
+
+
+class WorkflowStore:
+    """SQLite (WAL mode) store for saved workflows.
+
+    Workflow metadata and edges live in ``workflows``; each node is its own
+    row in ``workflow_nodes`` so listing never touches node data and single
+    nodes can be updated in place. Every node patch is also logged in
+    ``workflow_ops`` (the latest OP_LOG_SIZE per workflow), so the
+    collaboration hubs of all worker processes can follow each other's
+    edits. Every save, patch and delete appends the workflow id to
+    ``workflow_changes`` (the latest CHANGE_LOG_SIZE entries), which the
+    portfolio columns follow instead of rescanning the store. Connections are per thread, which lets WAL serve readers
+    concurrently with a writer.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def create(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a workflow and return its summary"""
+        workflow_id = f"wf_{uuid.uuid4().hex[:12]}"
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO workflows (id, owner, name, workflow_type, prompt, description, "
+                "edges, node_count, version, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                (
+                    workflow_id,
+                    workflow["owner"],
+                    workflow["name"],
+                    workflow["workflow_type"],
+                    workflow.get("prompt", ""),
+                    workflow.get("description", ""),
+                    json.dumps(workflow["edges"]),
+                    len(workflow["nodes"]),
+                    workflow.get("created_at") or now,
+                    now,
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO workflow_nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [node_row(workflow_id, i, n) for i, n in enumerate(workflow["nodes"])],
+            )
+            log_change(conn, workflow_id)
+        return self.summary(workflow_id)
+
+    def replace(self, workflow_id: str, workflow: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Overwrite a workflow's graph and metadata, bumping its version"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE workflows SET owner = ?, name = ?, workflow_type = ?, prompt = ?, "
+                "description = ?, edges = ?, node_count = ?, version = version + 1, "
+                "updated_at = ? WHERE id = ?",
+                (
+                    workflow["owner"],
+                    workflow["name"],
+                    workflow["workflow_type"],
+                    workflow.get("prompt", ""),
+                    workflow.get("description", ""),
+                    json.dumps(workflow["edges"]),
+                    len(workflow["nodes"]),
+                    datetime.now().isoformat(),
+                    workflow_id,
+                ),
+            ).rowcount
+            if not updated:
+                return None
+            conn.execute("DELETE FROM workflow_nodes WHERE workflow_id = ?", (workflow_id,))
+            conn.execute("DELETE FROM workflow_ops WHERE workflow_id = ?", (workflow_id,))
+            conn.executemany(
+                "INSERT INTO workflow_nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [node_row(workflow_id, i, n) for i, n in enumerate(workflow["nodes"])],
+            )
+            log_change(conn, workflow_id)
+        return self.summary(workflow_id)
+
+    def summary(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM workflows WHERE id = ?", (workflow_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Load a workflow with its full graph"""
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM workflows WHERE id = ?", (workflow_id,)).fetchone()
+        if row is None:
+            return None
+        workflow = dict(row)
+        workflow["edges"] = json.loads(workflow["edges"])
+        workflow["nodes"] = [
+            json.loads(data)
+            for (data,) in conn.execute(
+                "SELECT data FROM workflow_nodes WHERE workflow_id = ? ORDER BY position",
+                (workflow_id,),
+            )
+        ]
+        return workflow
+
+    def list(
+        self,
+        owner: Optional[str] = None,
+        workflow_type: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Summaries of saved workflows, newest first"""
+        clauses, params = [], []
+        if owner is not None:
+            clauses.append("owner = ?")
+            params.append(owner)
+        if workflow_type is not None:
+            clauses.append("workflow_type = ?")
+            params.append(workflow_type)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM workflows {where} "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def versions(self, workflow_ids: Optional[List[str]] = None) -> List[Tuple[str, int, str, str, str]]:
+        """(id, version, owner, workflow_type, name) of each of ``workflow_ids``
+        that still exists (of every saved workflow when None)"""
+        query = "SELECT id, version, owner, workflow_type, name FROM workflows"
+        if workflow_ids is None:
+            return [tuple(row) for row in self._conn().execute(query)]
+        rows = []
+        for start in range(0, len(workflow_ids), 500):
+            chunk = workflow_ids[start:start + 500]
+            rows.extend(tuple(row) for row in self._conn().execute(
+                f"{query} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def change_seq(self) -> int:
+        """Sequence number of the latest logged workflow change (0 before any)"""
+        row = self._conn().execute("SELECT MAX(seq) FROM workflow_changes").fetchone()
+        return row[0] or 0
+
+    def changes_since(self, seq: int) -> Optional[Tuple[int, List[str]]]:
+        """Latest change sequence number and the ids of the workflows saved,
+        patched or deleted after ``seq``, or None when the log no longer
+        reaches back to ``seq``"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            first = conn.execute("SELECT MIN(seq) FROM workflow_changes").fetchone()[0]
+            rows = conn.execute(
+                "SELECT seq, workflow_id FROM workflow_changes WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        if rows and first > seq + 1:
+            return None
+        return (rows[-1][0] if rows else seq), list(dict.fromkeys(row[1] for row in rows))
+
+    def current_versions(self, workflow_ids: List[str]) -> Dict[str, int]:
+        """Version of each of ``workflow_ids`` that still exists"""
+        found: Dict[str, int] = {}
+        for start in range(0, len(workflow_ids), 500):
+            chunk = workflow_ids[start:start + 500]
+            found.update(self._conn().execute(
+                f"SELECT id, version FROM workflows WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return found
+
+    def prompts(self, workflow_ids: Optional[List[str]] = None) -> List[Tuple[str, str, str]]:
+        """(id, workflow_type, prompt) of each of ``workflow_ids`` that still
+        exists (of every saved workflow that has a prompt when None)"""
+        if workflow_ids is None:
+            rows = self._conn().execute(
+                "SELECT id, workflow_type, prompt FROM workflows WHERE prompt != ''"
+            ).fetchall()
+            return [tuple(row) for row in rows]
+        rows = []
+        for start in range(0, len(workflow_ids), 500):
+            chunk = workflow_ids[start:start + 500]
+            rows.extend(tuple(row) for row in self._conn().execute(
+                f"SELECT id, workflow_type, prompt FROM workflows WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def node_columns(self, workflow_ids: Optional[List[str]] = None) -> List[Tuple[str, Any, Any, Any, Any]]:
+        """(workflow_id, status, deadline, estimated_cost, actual_cost) of the
+        nodes of ``workflow_ids`` (of every workflow when None), read from the
+        indexed columns without decoding the node documents"""
+        cursor = self._conn().cursor()
+        cursor.row_factory = None  # plain tuples
+        query = "SELECT workflow_id, status, deadline, estimated_cost, actual_cost FROM workflow_nodes"
+        if workflow_ids is None:
+            return cursor.execute(query).fetchall()
+        rows = []
+        for start in range(0, len(workflow_ids), 500):
+            chunk = workflow_ids[start:start + 500]
+            rows.extend(cursor.execute(f"{query} WHERE workflow_id IN ({', '.join('?' * len(chunk))})", chunk))
+        return rows
+
+    def patch_nodes(
+        self,
+        workflow_id: str,
+        expected_version: int,
+        deltas: List[Dict[str, Any]],
+        author: str = "rest",
+        writers: Optional[Writers] = None,
+    ) -> Dict[str, Any]:
+        """Apply per-node field updates if the workflow is still at ``expected_version``.
+
+        Each delta is ``{"id": node_id, field: value, ...}``. Only nodes whose
+        fields actually change are rewritten, and the version is bumped only
+        when something changed. Returns the new version and, for every
+        changed node, just the fields that changed. The patch is logged with
+        the client that set each field: its entry in ``writers``, else ``author``.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT version FROM workflows WHERE id = ?", (workflow_id,)
+            ).fetchone()
+            if row is None:
+                raise WorkflowNotFound(workflow_id)
+            if row["version"] != expected_version:
+                raise VersionConflict(row["version"])
+
+            changes = []
+            for delta in deltas:
+                node_id = delta["id"]
+                found = conn.execute(
+                    "SELECT position, data FROM workflow_nodes WHERE workflow_id = ? AND node_id = ?",
+                    (workflow_id, node_id),
+                ).fetchone()
+                if found is None:
+                    raise NodeNotFound(node_id)
+                node = json.loads(found["data"])
+                changed = {
+                    field: value
+                    for field, value in delta.items()
+                    if field != "id" and node.get(field) != value
+                }
+                if not changed:
+                    continue
+                node.update(changed)
+                conn.execute(
+                    "UPDATE workflow_nodes SET status = ?, deadline = ?, estimated_cost = ?, "
+                    "actual_cost = ?, data = ? WHERE workflow_id = ? AND node_id = ?",
+                    node_row(workflow_id, found["position"], node)[3:] + (workflow_id, node_id),
+                )
+                changes.append({"id": node_id, **changed})
+
+            version = row["version"]
+            if changes:
+                version += 1
+                conn.execute(
+                    "UPDATE workflows SET version = ?, updated_at = ? WHERE id = ?",
+                    (version, datetime.now().isoformat(), workflow_id),
+                )
+                logged = [
+                    [change["id"], field, (writers or {}).get((change["id"], field), author)]
+                    for change in changes
+                    for field in change
+                    if field != "id"
+                ]
+                conn.execute(
+                    "INSERT INTO workflow_ops (workflow_id, version, changes, writers) VALUES (?, ?, ?, ?)",
+                    (workflow_id, version, json.dumps(changes), json.dumps(logged)),
+                )
+                conn.execute(
+                    "DELETE FROM workflow_ops WHERE workflow_id = ? AND version <= ?",
+                    (workflow_id, version - OP_LOG_SIZE),
+                )
+                log_change(conn, workflow_id)
+        return {"workflow_id": workflow_id, "version": version, "nodes": changes}
+
+    def ops_since(self, workflow_id: str, version: int) -> Optional[Tuple[int, List[Op]]]:
+        """Current version of a workflow and its logged patches after ``version``,
+        oldest first, or None when the workflow does not exist.
+
+        The log is cleared when a workflow is replaced, so the patches only
+        cover the way up to the current version if there is no gap in them.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            row = conn.execute("SELECT version FROM workflows WHERE id = ?", (workflow_id,)).fetchone()
+            if row is None:
+                return None
+            rows = conn.execute(
+                "SELECT version, changes, writers FROM workflow_ops "
+                "WHERE workflow_id = ? AND version > ? ORDER BY version",
+                (workflow_id, version),
+            ).fetchall()
+        ops = [
+            (r["version"], json.loads(r["changes"]), {(n, f): c for n, f, c in json.loads(r["writers"])})
+            for r in rows
+        ]
+        return row["version"], ops
+
+    def delete(self, workflow_id: str) -> bool:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute("DELETE FROM workflows WHERE id = ?", (workflow_id,)).rowcount:
+                return False
+            log_change(conn, workflow_id)
+        return True
+
+
+_workflow_store: Optional[WorkflowStore] = None
+
+
+def get_workflow_store() -> WorkflowStore:
+    """Return the process-wide workflow store, opening it on first use"""
+    global _workflow_store
+    if _workflow_store is None:
+        _workflow_store = WorkflowStore()
+    return _workflow_store
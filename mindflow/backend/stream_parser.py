@@ -0,0 +1,135 @@
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Top-level arrays whose items are emitted one by one as soon as they close
+ITEM_ARRAYS = ("nodes", "edges")
+
+
+class WorkflowStreamParser:
+    """Incremental scanner for a workflow JSON document arriving in chunks.
+
+    ``feed`` returns ``(kind, value)`` events as soon as they are complete:
+    ``("node", item)`` / ``("edge", item)`` for every closed object or array
+    item of the top-level ``nodes`` / ``edges`` arrays, and ``(key, value)`` for every
+    top-level string or scalar value (e.g. ``("description", "...")``).
+    Text before the first ``{`` (such as a Markdown code fence) is ignored.
+
+    Strings may contain raw control characters (as models sometimes emit);
+    a value that still cannot be decoded (e.g. an invalid escape) is left
+    out and counted in ``dropped``.
+
+    Only the unfinished tail of the document (the open item, string or
+    scalar) is kept in ``buffer``, so feeding n characters costs O(n).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._scalar_start: Optional[int] = None
+        self.complete = False
+        self.dropped = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.buffer += chunk
+        events = list(self._scan())
+        self._compact()
+        return events
+
+    def _compact(self):
+        """Drop the scanned prefix of the buffer that no open value still needs"""
+        starts = [self._pos]
+        if self._item_start is not None:
+            starts.append(self._item_start)
+        if self._in_string:
+            starts.append(self._string_start)
+        if self._scalar_start is not None:
+            starts.append(self._scalar_start)
+        keep = min(starts)
+        if keep == 0:
+            return
+        self.buffer = self.buffer[keep:]
+        self._pos -= keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        if self._in_string:
+            self._string_start -= keep
+        if self._scalar_start is not None:
+            self._scalar_start -= keep
+
+    def _scan(self) -> Iterable[Tuple[str, Any]]:
+        buf = self.buffer
+        stack = self._stack
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self.complete:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(stack) == 1:
+                        try:
+                            text = json.loads(buf[self._string_start:i + 1], strict=False)
+                        except json.JSONDecodeError:
+                            self.dropped += 1
+                            text = None
+                        if self._expect_key:
+                            self._key = text
+                        elif text is not None:
+                            yield self._key, text
+                continue
+            if not stack and c != "{":
+                continue
+            if self._scalar_start is not None and c in ",}":
+                raw = buf[self._scalar_start:i].strip()
+                self._scalar_start = None
+                try:
+                    yield self._key, json.loads(raw)
+                except json.JSONDecodeError:
+                    self.dropped += 1
+            if c == '"':
+                if stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif c in "{[":
+                if (
+                    len(stack) == 2
+                    and stack[-1] == "["
+                    and self._key in ITEM_ARRAYS
+                ):
+                    self._item_start = i
+                stack.append(c)
+                if len(stack) == 1:
+                    self._expect_key = True
+            elif c in "}]":
+                if stack:
+                    stack.pop()
+                if not stack:
+                    self.complete = True
+                elif len(stack) == 2 and self._item_start is not None:
+                    raw = buf[self._item_start:i + 1]
+                    self._item_start = None
+                    try:
+                        item = json.loads(raw, strict=False)
+                    except json.JSONDecodeError:
+                        self.dropped += 1
+                        continue
+                    yield self._key[:-1], item
+            elif len(stack) == 1:
+                if c == ",":
+                    self._expect_key = True
+                elif c == ":":
+                    self._expect_key = False
+                elif not c.isspace() and self._scalar_start is None:
+                    self._scalar_start = i
+        self._pos = len(buf)
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other by their flat names
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store  # noqa: E402
+
+
+@pytest.fixture
+def workflow_store(tmp_path, monkeypatch):
+    """A fresh workflow store in a temporary file, installed as the process-wide one"""
+    fresh = store.WorkflowStore(str(tmp_path / "workflows.db"))
+    monkeypatch.setattr(store, "_workflow_store", fresh)
+    return fresh
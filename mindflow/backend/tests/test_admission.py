@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_waiters_run_by_priority_then_arrival():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_depth=8, max_queue_wait=5)
+        holder = await controller.acquire("a")
+        order = []
+
+        async def request(name, priority):
+            ticket = await controller.acquire(name, priority=priority)
+            order.append(name)
+            await asyncio.sleep(0)
+            ticket.release()
+
+        tasks = []
+        for name, priority in (("low", 0), ("high", 5), ("low2", 0), ("high2", 5)):
+            tasks.append(asyncio.create_task(request(name, priority)))
+            await asyncio.sleep(0)
+        assert controller.queue_depth == 4
+        holder.release()
+        await asyncio.gather(*tasks)
+        return controller, order
+
+    controller, order = asyncio.run(run())
+    assert order == ["high", "high2", "low", "low2"]
+    assert controller.in_flight == 0 and controller.queue_depth == 0
+
+
+def test_full_queue_rejects_at_once():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_depth=1, max_queue_wait=5)
+        holder = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        holder.release()
+        (await waiter).release()
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(run())
+    assert "busy" in rejected.detail
+    assert rejected.retry_after == 2.5
+    assert controller.rejected == 1
+
+
+def test_queue_wait_times_out_and_frees_its_place():
+    async def run():
+        controller = AdmissionController(max_concurrency=1, max_queue_depth=4, max_queue_wait=0.05)
+        holder = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        depth = controller.queue_depth
+        holder.release()
+        return controller, rejected.value, depth
+
+    controller, rejected, depth = asyncio.run(run())
+    assert "Timed out" in rejected.detail
+    assert depth == 0
+    assert controller.in_flight == 0
+
+
+def test_client_budget_rejects_with_retry_hint_and_refunds_unused_tokens():
+    async def run():
+        controller = AdmissionController(max_concurrency=4, global_tpm=0, client_tpm=600, state_path="")
+        ticket = await controller.acquire("alice", tokens=600)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("alice", tokens=100)
+        other = await controller.acquire("bob", tokens=100)  # budgets are per client
+        other.release()
+        ticket.used_tokens = 200
+        ticket.release()
+        again = await controller.acquire("alice", tokens=300)
+        again.release()
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert "budget" in rejected.detail
+    assert rejected.retry_after == pytest.approx(10, rel=0.05)  # 100 tokens at 10 per second
+
+
+def test_shared_budget_is_not_overdrawn(tmp_path):
+    async def run():
+        path = str(tmp_path / "state.db")
+        workers = [
+            AdmissionController(max_concurrency=8, global_tpm=1000, client_tpm=0, state_path=path)
+            for _ in range(2)
+        ]
+        results = await asyncio.gather(
+            *(worker.acquire(tokens=100) for worker in workers for _ in range(8)), return_exceptions=True
+        )
+        return results
+
+    results = asyncio.run(run())
+    assert sum(not isinstance(r, AdmissionRejected) for r in results) == 10
+
+
+def test_stats_never_read_the_shared_state_on_the_event_loop(tmp_path, monkeypatch):
+    async def run():
+        controller = AdmissionController(max_concurrency=2, global_tpm=1000, client_tpm=0, state_path=str(tmp_path / "s.db"))
+        (await controller.acquire(tokens=400)).release()
+        before = controller.stats()["global_tokens_available"]
+        reported = (await controller.astats())["global_tokens_available"]
+        monkeypatch.setattr(controller._state, "level", lambda *args: pytest.fail("read on the loop"))
+        return before, reported, controller.stats()["global_tokens_available"]
+
+    before, reported, cached = asyncio.run(run())
+    assert before is None
+    assert reported == pytest.approx(600, abs=1)
+    assert cached == reported
@@ -0,0 +1,82 @@
+import pytest
+
+from analytics import AnalyticsCache, GraphAnalytics
+
+NODES = [
+    {"id": "1", "type": "start", "status": "Completed", "deadline": "2025-01-01", "estimated_cost": 100, "actual_cost": 120},
+    {"id": "2", "type": "task", "deadline": "2025-01-11", "estimated_cost": 50, "actual_cost": 0},
+    {"id": "3", "type": "task", "deadline": "2025-01-04", "estimated_cost": 30},
+    {"id": "4", "type": "end", "deadline": "2025-01-15", "dependencies": ["3"]},
+]
+EDGES = [{"source": "1", "target": "2"}, {"source": "1", "target": "3"}, {"source": "2", "target": "4"}]
+
+
+def test_critical_path_and_slack():
+    report = GraphAnalytics(NODES, EDGES).report()
+    assert report["topological_order"][0] == "1" and report["topological_order"][-1] == "4"
+    assert report["critical_path"] == ["1", "2", "4"]
+    assert report["project_duration_days"] == 14
+    assert report["slack_days"] == {"1": 0, "2": 0, "3": 7, "4": 0}
+    assert report["edge_count"] == 4  # three edges plus the dependency 3 -> 4
+
+
+def test_cycles_are_reported_without_a_schedule():
+    report = GraphAnalytics(NODES, EDGES + [{"source": "4", "target": "1"}]).report()
+    assert report["has_cycle"]
+    assert sorted(report["cycle_nodes"]) == ["1", "2", "3", "4"]
+    assert report["critical_path"] == [] and report["project_duration_days"] is None
+
+
+def test_cost_rollups():
+    costs = GraphAnalytics(NODES, EDGES).report()["costs"]
+    assert costs["total"] == {"estimated": 180, "actual": 120, "variance": -60}
+    assert costs["by_type"]["task"] == {"estimated": 80, "actual": 0, "variance": -80}
+    assert costs["by_status"]["Completed"]["actual"] == 120
+    assert len(costs["by_component"]) == 1
+
+
+def test_in_place_updates_match_a_rebuild():
+    analytics = GraphAnalytics(NODES, EDGES)
+    analytics.report()
+    changes = [
+        {"id": "2", "actual_cost": 70, "status": "Completed"},
+        {"id": "3", "deadline": "2025-01-14"},
+    ]
+    assert analytics.update_nodes(changes)
+    rebuilt = GraphAnalytics([{**n, **next((c for c in changes if c["id"] == n["id"]), {})} for n in NODES], EDGES)
+    assert analytics.report() == rebuilt.report()
+    assert analytics.report()["critical_path"] == ["1", "3", "4"]
+
+
+def test_structural_changes_need_a_rebuild():
+    assert not GraphAnalytics(NODES, EDGES).update_nodes([{"id": "4", "dependencies": []}])
+    assert not GraphAnalytics(NODES, EDGES).update_nodes([{"id": "9", "status": "Completed"}])
+
+
+def test_cache_rolls_forward_by_one_patch_and_drops_otherwise():
+    cache, loads = AnalyticsCache(), []
+
+    def load(version):
+        def loader():
+            loads.append(version)
+            return {"version": version, "nodes": NODES, "edges": EDGES}
+        return loader
+
+    assert cache.report("wf", 1, load(1))["version"] == 1
+    cache.apply_patch("wf", {"version": 2, "nodes": [{"id": "3", "actual_cost": 45}]})
+    report = cache.report("wf", 2, load(2))
+    assert loads == [1]  # rolled forward without reloading
+    assert report["version"] == 2 and report["costs"]["total"]["actual"] == 165
+
+    cache.apply_patch("wf", {"version": 4, "nodes": [{"id": "3", "actual_cost": 1}]})  # version 3 was missed
+    cache.report("wf", 4, load(4))
+    cache.apply_patch("wf", {"version": 5, "nodes": [{"id": "4", "type": "task"}]})  # structural
+    cache.report("wf", 5, load(5))
+    assert loads == [1, 4, 5]
+
+
+@pytest.mark.parametrize("deadline", [None, "", "soon", "2025-13-40"])
+def test_missing_or_malformed_deadlines_have_no_duration(deadline):
+    nodes = [{"id": "1", "deadline": "2025-01-01"}, {"id": "2", "deadline": deadline}]
+    report = GraphAnalytics(nodes, [{"source": "1", "target": "2"}]).report()
+    assert report["project_duration_days"] == 0
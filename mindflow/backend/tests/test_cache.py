@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import DiskCache, WorkflowCache, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def rows(disk):
+    return disk._conn.execute("SELECT key FROM workflow_cache ORDER BY key").fetchall()
+
+
+def test_keys_ignore_whitespace_and_case_but_not_parameters():
+    key = make_cache_key("Open a  Bakery", "business_plan", None, model="gpt-4")
+    assert key == make_cache_key(" open a bakery ", "business_plan", "", model="gpt-4")
+    assert key != make_cache_key("open a bakery", "business_plan", None, model="gpt-3.5")
+    assert key != make_cache_key("open a bakery", "timeline", None, model="gpt-4")
+
+
+def test_least_recently_used_entry_is_evicted():
+    workflows = WorkflowCache(max_entries=2, path=None)
+    workflows.set("a", {"n": 1})
+    workflows.set("b", {"n": 2})
+    workflows.get("a")
+    workflows.set("c", {"n": 3})
+    assert workflows.get("b") is None
+    assert workflows.get("a") == {"n": 1} and workflows.get("c") == {"n": 3}
+    assert workflows.stats()["hits"] == 3 and workflows.stats()["misses"] == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    workflows = WorkflowCache(ttl=10, path=None)
+    workflows.set("a", {"n": 1})
+    clock.now += 10
+    assert workflows.get("a") == {"n": 1}
+    clock.now += 0.1
+    assert workflows.get("a") is None
+    assert workflows.stats()["entries"] == 0
+
+
+def test_disk_tier_survives_a_restart_and_keeps_the_expiry(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    WorkflowCache(ttl=10, path=path).set("a", {"n": 1}, prompt="open a bakery", group="business_plan")
+
+    clock.now += 6
+    restarted = WorkflowCache(ttl=10, path=path)
+    assert restarted.prompts() == [("a", "open a bakery", "business_plan", 1000010.0)]
+    assert restarted.prompts(expires_after=1000010.0) == []
+    assert asyncio.run(restarted.aget("a")) == {"n": 1}
+    assert restarted.stats()["disk_hits"] == 1
+
+    clock.now += 5  # 11 seconds after the write: expired in memory too
+    assert restarted.get("a") is None
+    assert restarted.prompts() == []
+
+
+def test_count_false_leaves_the_counters_alone():
+    workflows = WorkflowCache(path=None)
+    workflows.set("a", {"n": 1})
+    workflows.get("a", count=False)
+    workflows.get("b", count=False)
+    assert (workflows.stats()["hits"], workflows.stats()["misses"]) == (0, 0)
+
+
+def test_disk_sweep_removes_expired_rows_and_caps_the_table(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(cache, "SWEEP_EVERY", 5)
+    disk = DiskCache(str(tmp_path / "cache.db"), max_entries=3)
+    for i in range(4):
+        disk.set(f"old{i}", {"n": i}, clock.now + 10)
+    clock.now += 20
+    disk.set("new0", {}, clock.now + 10)  # fifth write: the four old rows have expired
+    assert rows(disk) == [("new0",)]
+
+    for i in range(1, 5):
+        clock.now += 1
+        disk.set(f"new{i}", {}, clock.now + 10)
+    clock.now += 1
+    disk.set("new5", {}, clock.now + 10)  # tenth write: only the three newest stay
+    assert rows(disk) == [("new3",), ("new4",), ("new5",)]
+
+
+def test_disk_sweep_runs_when_the_file_is_opened(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    disk = DiskCache(path)
+    disk.set("a", {}, clock.now + 10)
+    disk.set("b", {}, clock.now + 100)
+    clock.now += 50
+    assert rows(DiskCache(path)) == [("b",)]
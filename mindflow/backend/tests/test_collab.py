@@ -0,0 +1,121 @@
+import asyncio
+
+import orjson
+
+from collab import CollaborationHub, Subscriber
+
+
+def make_workflow(workflow_store):
+    return workflow_store.create({
+        "owner": "alice",
+        "name": "Launch",
+        "workflow_type": "business_plan",
+        "edges": [],
+        "nodes": [
+            {"id": "1", "label": "Research", "status": "Not Started", "notes": ""},
+            {"id": "2", "label": "Build", "status": "Not Started", "notes": ""},
+        ],
+    })["id"]
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(orjson.loads(subscriber.queue.get_nowait()))
+    return messages
+
+
+def acks(subscriber):
+    return {m["op"]: m for m in drain(subscriber) if m["type"] == "ack"}
+
+
+async def flush(hub, workflow_id):
+    await hub.rooms[workflow_id].flush_task
+
+
+def test_first_writer_wins_within_a_batch(workflow_store):
+    async def run():
+        workflow_id = make_workflow(workflow_store)
+        hub = CollaborationHub(batch_window=0, poll_interval=0)
+        alice, bob = Subscriber("alice"), Subscriber("bob")
+        assert await hub.join(workflow_id, alice)
+        assert await hub.join(workflow_id, bob)
+        drain(alice), drain(bob)
+
+        hub.submit(workflow_id, alice, "a1", 1, [{"id": "1", "status": "In Progress"}])
+        hub.submit(workflow_id, bob, "b1", 1, [{"id": "1", "status": "Blocked"}, {"id": "2", "notes": "db first"}])
+        await flush(hub, workflow_id)
+        return workflow_id, alice, bob
+
+    workflow_id, alice, bob = asyncio.run(run())
+    alice_acks, bob_acks = acks(alice), acks(bob)
+    assert alice_acks["a1"]["rejected"] == []
+    assert bob_acks["b1"]["rejected"] == [{"id": "1", "field": "status"}]
+    assert alice_acks["a1"]["version"] == bob_acks["b1"]["version"] == 2
+
+    workflow = workflow_store.get(workflow_id)
+    assert workflow["version"] == 2  # one patch for the whole batch
+    assert [n["status"] for n in workflow["nodes"]] == ["In Progress", "Not Started"]
+    assert workflow["nodes"][1]["notes"] == "db first"
+
+
+def test_stale_edit_loses_only_the_fields_changed_since_its_version(workflow_store):
+    async def run():
+        workflow_id = make_workflow(workflow_store)
+        hub = CollaborationHub(batch_window=0, poll_interval=0)
+        alice, bob = Subscriber("alice"), Subscriber("bob")
+        await hub.join(workflow_id, alice)
+        await hub.join(workflow_id, bob)
+
+        hub.submit(workflow_id, alice, "a1", 1, [{"id": "1", "status": "Completed"}])
+        await flush(hub, workflow_id)
+        # Bob has not seen version 2 yet
+        hub.submit(workflow_id, bob, "b1", 1, [{"id": "1", "status": "Blocked", "notes": "waiting"}])
+        await flush(hub, workflow_id)
+        first = acks(bob)
+        # Once caught up, bob may change the field
+        hub.submit(workflow_id, bob, "b2", 3, [{"id": "1", "status": "Blocked"}])
+        await flush(hub, workflow_id)
+        return workflow_id, first, acks(bob)
+
+    workflow_id, first, second = asyncio.run(run())
+    assert first["b1"]["rejected"] == [{"id": "1", "field": "status"}]
+    assert first["b1"]["version"] == 3
+    assert second["b2"]["rejected"] == []
+    node = workflow_store.get(workflow_id)["nodes"][0]
+    assert (node["status"], node["notes"]) == ("Blocked", "waiting")
+
+
+def test_same_client_edits_overwrite_each_other(workflow_store):
+    async def run():
+        workflow_id = make_workflow(workflow_store)
+        hub = CollaborationHub(batch_window=0, poll_interval=0)
+        alice = Subscriber("alice")
+        await hub.join(workflow_id, alice)
+        drain(alice)
+        hub.submit(workflow_id, alice, "a1", 1, [{"id": "2", "notes": "d"}])
+        hub.submit(workflow_id, alice, "a2", 1, [{"id": "2", "notes": "dr"}])
+        await flush(hub, workflow_id)
+        return workflow_id, drain(alice)
+
+    workflow_id, messages = asyncio.run(run())
+    deltas = [m for m in messages if m["type"] == "delta"]
+    assert [d["nodes"] for d in deltas] == [[{"id": "2", "notes": "dr"}]]
+    assert all(m["rejected"] == [] for m in messages if m["type"] == "ack")
+    assert workflow_store.get(workflow_id)["nodes"][1]["notes"] == "dr"
+
+
+def test_unknown_node_is_reported_and_the_rest_applied(workflow_store):
+    async def run():
+        workflow_id = make_workflow(workflow_store)
+        hub = CollaborationHub(batch_window=0, poll_interval=0)
+        alice = Subscriber("alice")
+        await hub.join(workflow_id, alice)
+        drain(alice)
+        hub.submit(workflow_id, alice, "a1", 1, [{"id": "9", "notes": "x"}, {"id": "1", "notes": "y"}])
+        await flush(hub, workflow_id)
+        return workflow_id, drain(alice)
+
+    workflow_id, messages = asyncio.run(run())
+    assert {"type": "error", "op": "a1", "detail": "Node not found: 9"} in messages
+    assert workflow_store.get(workflow_id)["nodes"][0]["notes"] == "y"
@@ -0,0 +1,66 @@
+import pytest
+from pydantic import ValidationError
+
+from hierarchy import parse_outline, phase_boundaries, stitch_phases
+
+
+def outline(*phases):
+    return {
+        "phases": [{"id": pid, "name": pid.upper(), "goal": "", "depends_on": deps} for pid, deps in phases],
+        "description": "plan",
+    }
+
+
+def chain(*ids):
+    """Sub-workflow whose nodes run one after another"""
+    return {
+        "nodes": [{"id": i, "label": i, "dependencies": [a] if a else []} for a, i in zip((None,) + ids, ids)],
+        "edges": [{"id": f"e{k}", "source": a, "target": b, "label": ""} for k, (a, b) in enumerate(zip(ids, ids[1:]), 1)],
+    }
+
+
+def links(workflow):
+    return sorted((e["source"], e["target"]) for e in workflow["edges"] if e["label"] == "next phase")
+
+
+def test_outline_drops_duplicates_forward_references_and_extra_phases():
+    parsed = parse_outline(
+        '{"phases":[{"id":"a","name":"A","depends_on":["b"]},{"id":"b","name":"B","depends_on":["a","a"]},'
+        '{"id":"a","name":"again"},{"id":"c","name":"C","depends_on":["zz","b"]},{"id":"d","name":"D"}],'
+        '"description":"d"}',
+        max_phases=3,
+    )
+    assert [(p["id"], p["depends_on"]) for p in parsed["phases"]] == [("a", []), ("b", ["a"]), ("c", ["b"])]
+    assert parsed["phases"][0]["goal"] == ""
+
+
+def test_outline_without_phases_is_rejected():
+    with pytest.raises(ValueError):
+        parse_outline('{"phases":[],"description":"d"}')
+    with pytest.raises(ValidationError):
+        parse_outline('{"phases":[{"id":"a"}],"description":"d"}')
+
+
+def test_boundaries_come_from_edges_and_dependencies():
+    assert phase_boundaries(chain("1", "2", "3")["nodes"], []) == (["1"], ["3"])
+    assert phase_boundaries([{"id": "1"}, {"id": "2"}], []) == (["1", "2"], ["1", "2"])
+
+
+def test_phases_are_prefixed_and_linked_exit_to_entry():
+    stitched = stitch_phases(outline(("a", []), ("b", ["a"]), ("c", ["a"])), [chain("1", "2"), chain("1"), chain("1", "2")])
+    ids = [node["id"] for node in stitched["nodes"]]
+    assert ids == ["p1-1", "p1-2", "p2-1", "p3-1", "p3-2"]
+    assert links(stitched) == [("p1-2", "p2-1"), ("p1-2", "p3-1")]
+    by_id = {node["id"]: node for node in stitched["nodes"]}
+    assert by_id["p1-2"]["dependencies"] == ["p1-1"]
+    assert by_id["p3-1"]["dependencies"] == ["p1-2"]
+    assert len({edge["id"] for edge in stitched["edges"]}) == len(stitched["edges"])
+
+
+def test_failed_phase_is_bridged_to_its_own_predecessors():
+    phases = outline(("a", []), ("b", []), ("c", ["a", "b"]), ("d", ["c", "a"]))
+    stitched = stitch_phases(phases, [chain("1"), chain("1"), None, chain("1")])
+    assert [node["id"] for node in stitched["nodes"]] == ["p1-1", "p2-1", "p4-1"]
+    # d depended on the failed c (after a and b) and on a: linked once to each
+    assert links(stitched) == [("p1-1", "p4-1"), ("p2-1", "p4-1")]
+    assert sorted(stitched["nodes"][2]["dependencies"]) == ["p1-1", "p2-1"]
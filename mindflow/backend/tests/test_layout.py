@@ -0,0 +1,67 @@
+from layout import LAYOUT_X_SPACING, LAYOUT_Y_SPACING, LayoutEngine
+
+
+def graph(ids, pairs):
+    return [{"id": i} for i in ids], [{"source": s, "target": t} for s, t in pairs]
+
+
+BASE = graph(["a", "b", "c", "d", "e"], [("a", "b"), ("a", "c"), ("b", "d"), ("c", "e")])
+
+
+def test_nodes_are_layered_by_longest_path():
+    layout = LayoutEngine().layout(*graph(["a", "b", "c"], [("a", "b"), ("b", "c"), ("a", "c")]))
+    assert layout.layers == [["a"], ["b"], ["c"]]
+    assert layout.positions["c"] == {"x": 0.0, "y": 2 * LAYOUT_Y_SPACING}
+
+
+def test_layers_are_centred_and_ordered_to_avoid_crossings():
+    layout = LayoutEngine().layout(*BASE)
+    assert layout.layers[1] == ["b", "c"]
+    assert layout.layers[2] == ["d", "e"]  # under their parents, no crossing
+    assert [layout.positions[i]["x"] for i in ("b", "c")] == [-LAYOUT_X_SPACING / 2, LAYOUT_X_SPACING / 2]
+
+
+def test_layout_is_deterministic():
+    assert LayoutEngine().layout(*BASE).positions == LayoutEngine().layout(*BASE).positions
+
+
+def test_cycles_are_broken():
+    layout = LayoutEngine().layout(*graph(["a", "b", "c"], [("a", "b"), ("b", "c"), ("c", "a")]))
+    assert sorted(layout.positions) == ["a", "b", "c"]
+    assert len(layout.layers) == 3
+
+
+def test_an_edit_only_moves_the_layers_it_touches():
+    engine = LayoutEngine()
+    before = engine.layout(*BASE, key="wf")
+    nodes, edges = BASE
+    after = engine.layout(nodes + [{"id": "f"}], edges + [{"source": "c", "target": "f"}], key="wf")
+    assert after.moved_layers == [1, 2]
+    assert after.positions["a"] == before.positions["a"]
+    assert after.positions["b"] == before.positions["b"]
+    assert after.layers[2] == ["d", "e", "f"]
+
+
+def test_cache_hits_report_layers_moved_since_the_workflows_last_layout():
+    engine = LayoutEngine()
+    extended = (BASE[0] + [{"id": "f"}], BASE[1] + [{"source": "c", "target": "f"}])
+    engine.layout(*BASE, key="wf")
+    assert engine.layout(*extended, key="wf").moved_layers == [1, 2]
+    # Back to a graph whose layout is cached: only layer 2 differs from the last layout
+    assert engine.layout(*BASE, key="wf").moved_layers == [2]
+    # Unchanged graph: nothing moved, and the cached layout keeps its own value
+    assert engine.layout(*BASE, key="wf").moved_layers == []
+    assert engine.layout(*BASE).moved_layers == [0, 1, 2]
+
+
+def test_apply_writes_positions_into_the_nodes():
+    nodes, edges = graph(["a", "b"], [("a", "b")])
+    LayoutEngine().apply(nodes, edges)
+    assert nodes[1]["position"] == {"x": 0.0, "y": LAYOUT_Y_SPACING}
+
+
+def test_cache_is_bounded():
+    engine = LayoutEngine(max_entries=2)
+    for n in range(4):
+        engine.layout(*graph([str(i) for i in range(n + 1)], []), key=f"wf{n}")
+    assert len(engine._by_hash) == 2 and len(engine._latest) == 2
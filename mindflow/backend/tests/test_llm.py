@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import llm
+from llm import LLMClient
+
+
+def fake_client(create):
+    client = LLMClient(api_key="test", timeout=60, connect_timeout=5)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return client
+
+
+def test_per_call_timeout_keeps_the_connect_limit():
+    seen = []
+
+    async def create(**params):
+        seen.append(params["timeout"])
+        return SimpleNamespace(usage=None, choices=[])
+
+    client = fake_client(create)
+    asyncio.run(client.chat([{"role": "user", "content": "hi"}], timeout=120))
+    asyncio.run(client.chat([{"role": "user", "content": "hi"}]))
+    assert seen[0] == httpx.Timeout(120, connect=5)
+    assert seen[1] == httpx.Timeout(60, connect=5)
+
+
+def rate_limited(retry_after):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("slow down", response=response, body=None)
+
+
+def throttled_client(monkeypatch, retry_after):
+    calls, delays = [], []
+
+    async def create(**params):
+        calls.append(params)
+        if len(calls) == 1:
+            raise rate_limited(retry_after)
+        return SimpleNamespace(usage=None, choices=[])
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(llm.asyncio, "sleep", sleep)
+    return fake_client(create), calls, delays
+
+
+def test_retry_after_within_the_cap_is_honoured(monkeypatch):
+    client, calls, delays = throttled_client(monkeypatch, "2")
+    asyncio.run(client.chat([{"role": "user", "content": "hi"}]))
+    assert len(calls) == 2 and 2 <= delays[0] <= llm.LLM_BACKOFF_MAX
+
+
+def test_retry_after_beyond_the_cap_fails_fast(monkeypatch):
+    client, calls, delays = throttled_client(monkeypatch, "3600")
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(client.chat([{"role": "user", "content": "hi"}]))
+    assert len(calls) == 1 and delays == []
@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+
+from api import app
+
+client = TestClient(app)
+
+
+def save():
+    return client.post("/workflows", json={
+        "name": "Launch",
+        "workflow_type": "business_plan",
+        "nodes": [
+            {"id": "1", "label": "Research", "type": "start", "estimated_cost": 100},
+            {"id": "2", "label": "Build", "type": "task"},
+        ],
+        "edges": [{"id": "e1", "source": "1", "target": "2"}],
+    }).json()["id"]
+
+
+def test_patch_returns_only_changed_fields_and_bumps_the_version(workflow_store):
+    workflow_id = save()
+    response = client.patch(
+        f"/workflows/{workflow_id}/nodes/1", json={"version": 1, "status": "Completed", "estimated_cost": 100}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"workflow_id": workflow_id, "version": 2, "nodes": [{"id": "1", "status": "Completed"}]}
+    node = client.get(f"/workflows/{workflow_id}").json()["nodes"][0]
+    assert (node["status"], node["label"]) == ("Completed", "Research")
+
+
+def test_patch_without_changes_keeps_the_version(workflow_store):
+    workflow_id = save()
+    response = client.patch(f"/workflows/{workflow_id}/nodes/2", json={"version": 1, "label": "Build"})
+    assert response.json() == {"workflow_id": workflow_id, "version": 1, "nodes": []}
+
+
+def test_stale_version_is_a_conflict(workflow_store):
+    workflow_id = save()
+    client.patch(f"/workflows/{workflow_id}/nodes/1", json={"version": 1, "notes": "first"})
+    response = client.patch(f"/workflows/{workflow_id}/nodes/1", json={"version": 1, "notes": "second"})
+    assert response.status_code == 409
+    assert "version 2" in response.json()["detail"]
+    assert client.get(f"/workflows/{workflow_id}").json()["nodes"][0]["notes"] == "first"
+
+
+def test_batch_patch_is_atomic(workflow_store):
+    workflow_id = save()
+    response = client.patch(f"/workflows/{workflow_id}/nodes", json={
+        "version": 1, "nodes": [{"id": "1", "status": "Completed"}, {"id": "9", "status": "Completed"}],
+    })
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Node not found: 9"
+    workflow = client.get(f"/workflows/{workflow_id}").json()
+    assert workflow["version"] == 1 and workflow["nodes"][0]["status"] == "Not Started"
+
+    response = client.patch(f"/workflows/{workflow_id}/nodes", json={
+        "version": 1, "nodes": [{"id": "1", "status": "Completed"}, {"id": "2", "actual_cost": 40}],
+    })
+    assert response.json()["version"] == 2
+    assert response.json()["nodes"] == [{"id": "1", "status": "Completed"}, {"id": "2", "actual_cost": 40}]
+
+
+def test_patch_of_a_missing_workflow_is_not_found(workflow_store):
+    response = client.patch("/workflows/wf_missing/nodes/1", json={"version": 1, "status": "Completed"})
+    assert response.status_code == 404
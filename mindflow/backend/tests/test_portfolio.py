@@ -0,0 +1,86 @@
+from datetime import date
+
+import store
+from portfolio import PortfolioColumns
+
+
+def save(workflow_store, statuses, workflow_type="business_plan", owner="alice"):
+    return workflow_store.create({
+        "owner": owner, "name": "n", "workflow_type": workflow_type, "edges": [],
+        "nodes": [
+            {"id": str(i), "status": status, "deadline": "2025-01-10", "estimated_cost": 10, "actual_cost": 12}
+            for i, status in enumerate(statuses)
+        ],
+    })["id"]
+
+
+def totals(columns, **filters):
+    return columns.report(as_of=date(2025, 2, 1), **filters)["totals"]
+
+
+def test_report_aggregates_by_type_and_owner(workflow_store):
+    columns = PortfolioColumns()
+    save(workflow_store, ["Completed", "Not Started"])
+    save(workflow_store, ["Completed"], workflow_type="timeline", owner="bob")
+    columns.sync(workflow_store)
+    report = columns.report(as_of=date(2025, 2, 1))
+    assert report["totals"]["steps"] == 3 and report["totals"]["completed"] == 2
+    assert report["totals"]["overdue_steps"] == 1
+    assert report["totals"]["cost_variance"] == 6
+    assert [t["workflow_type"] for t in report["by_type"]] == ["business_plan", "timeline"]
+    assert totals(columns, owner="bob")["workflows"] == 1
+    assert totals(columns, owner="nobody")["steps"] == 0
+
+
+def test_sync_follows_saves_patches_replaces_and_deletes(workflow_store):
+    columns = PortfolioColumns()
+    first = save(workflow_store, ["Not Started", "Not Started"])
+    second = save(workflow_store, ["Completed"])
+    assert columns.sync(workflow_store) == 2
+    assert columns.sync(workflow_store) == 0  # nothing changed
+
+    workflow_store.patch_nodes(first, 1, [{"id": "0", "status": "Completed"}])
+    assert columns.sync(workflow_store) == 1
+    assert totals(columns)["completed"] == 2
+
+    workflow_store.replace(second, {
+        "owner": "alice", "name": "n", "workflow_type": "timeline", "edges": [],
+        "nodes": [{"id": "a", "status": "Not Started"}, {"id": "b", "status": "Not Started"}],
+    })
+    workflow_store.delete(first)
+    assert columns.sync(workflow_store) == 1
+    assert totals(columns)["steps"] == 2 and totals(columns)["completed"] == 0
+    assert len(columns) == 2
+
+
+def test_sync_reads_only_the_change_log(workflow_store, monkeypatch):
+    columns = PortfolioColumns()
+    save(workflow_store, ["Completed"])
+    columns.sync(workflow_store)
+    scans = []
+    original = workflow_store.versions
+    monkeypatch.setattr(workflow_store, "versions", lambda ids=None: scans.append(ids) or original(ids))
+    columns.sync(workflow_store)
+    added = save(workflow_store, ["Completed"])
+    columns.sync(workflow_store)
+    assert scans == [[added]]
+
+
+def test_sync_rescans_when_the_log_was_pruned(workflow_store, monkeypatch):
+    monkeypatch.setattr(store, "CHANGE_LOG_SIZE", 2)
+    columns = PortfolioColumns()
+    save(workflow_store, ["Completed"])
+    columns.sync(workflow_store)
+    for _ in range(4):
+        save(workflow_store, ["Not Started"])
+    assert columns.sync(workflow_store) == 4
+    assert totals(columns)["workflows"] == 5
+
+
+def test_columns_are_compacted_after_many_replacements(workflow_store):
+    columns = PortfolioColumns()
+    workflow_id = save(workflow_store, ["Not Started"] * 10)
+    for version in range(1, 6):
+        workflow_store.patch_nodes(workflow_id, version, [{"id": "0", "actual_cost": version}])
+        columns.sync(workflow_store)
+    assert columns._size == 10 and len(columns) == 10
@@ -0,0 +1,47 @@
+import pytest
+
+from api import salvage_generated_workflow
+from stream_parser import WorkflowStreamParser
+
+NODES = '{"nodes":[{"i":"1","l":"Plan"},{"i":"2","l":"Build"}],"edges":[["1","2"]],'
+
+
+def test_raw_control_characters_in_strings_are_kept():
+    workflow, partial = salvage_generated_workflow(NODES + '"description":"line one\nline\ttwo"}')
+    assert workflow["description"] == "line one\nline\ttwo"
+    assert not partial
+
+
+def test_undecodable_description_is_dropped_and_marks_the_result_partial():
+    workflow, partial = salvage_generated_workflow(NODES + '"description":"bad \\q escape"}')
+    assert [node["id"] for node in workflow["nodes"]] == ["1", "2"]
+    assert workflow["nodes"][1]["dependencies"] == ["1"]
+    assert workflow["description"] == ""
+    assert partial
+
+
+def test_undecodable_item_is_dropped_and_counted():
+    parser = WorkflowStreamParser()
+    events = parser.feed('{"nodes":[{"i":"1","l":"bad \\q"},{"i":"2","l":"ok"}],"description":"d"}')
+    assert events == [("node", {"i": "2", "l": "ok"}), ("description", "d")]
+    assert parser.dropped == 1
+
+
+def test_truncated_completion_keeps_complete_items():
+    workflow, partial = salvage_generated_workflow(NODES + '"description":"cut sh')
+    assert len(workflow["nodes"]) == 2 and len(workflow["edges"]) == 1
+    assert partial
+
+
+def test_duplicate_nodes_and_dangling_edges_are_dropped():
+    workflow, partial = salvage_generated_workflow(
+        '{"nodes":[{"i":"1","l":"A"},{"i":"1","l":"again"}],"edges":[["1","9"]],"description":"d"}'
+    )
+    assert [node["label"] for node in workflow["nodes"]] == ["A"]
+    assert workflow["edges"] == []
+    assert partial
+
+
+def test_no_complete_node_is_an_error():
+    with pytest.raises(ValueError):
+        salvage_generated_workflow('{"nodes":[{"i":"1","l":"A"')
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import pytest
+
+import api
+from cache import WorkflowCache
+from similarity import SimilarityIndex, same_term_order
+
+LLM = SimpleNamespace(model="gpt-4")
+
+
+def test_identical_prompts_match_best_first():
+    index = SimilarityIndex()
+    index.add("k1", "Open a bakery in Rome", "g")
+    index.add("k2", "Open a coffee shop in Rome", "g")
+    index.add("k3", "Plan a wedding in Paris", "g")
+    matches = index.search("open a BAKERY in rome", "g", k=3)
+    assert [key for _, key, _ in matches] == ["k1", "k2"]  # k3 shares no content word
+    assert matches[0][0] == pytest.approx(1.0, abs=1e-3)
+    assert matches[0][0] > matches[1][0] > 0
+
+
+def test_word_order_lowers_the_score_below_a_direct_hit():
+    index = SimilarityIndex()
+    index.add("k", "migrate from mysql to postgres", "g")
+    (score, _, prompt), = index.search("migrate from postgres to mysql", "g")
+    assert score < api.SIMILARITY_THRESHOLD
+    assert not same_term_order("migrate from postgres to mysql", prompt)
+    assert same_term_order("Migrate our data from MySQL to Postgres", prompt)
+
+
+def test_groups_discard_and_replace():
+    index = SimilarityIndex()
+    index.add("k", "open a bakery", "business_plan")
+    assert index.search("open a bakery", "timeline") == []
+    index.add("k", "plan a wedding", "business_plan")  # same key, new prompt
+    assert [key for _, key, _ in index.search("plan a wedding", "business_plan")] == ["k"]
+    assert index.search("open a bakery", "business_plan") == []
+    index.discard("k")
+    assert index.search("plan a wedding", "business_plan") == [] and len(index) == 0
+
+
+def test_full_index_overwrites_the_oldest_row():
+    index = SimilarityIndex(max_entries=2)
+    for key, prompt in (("a", "bakery rome"), ("b", "wedding paris"), ("c", "garage berlin")):
+        index.add(key, prompt, "g")
+    assert len(index) == 2
+    assert index.search("bakery rome", "g") == []
+    assert [key for _, key, _ in index.search("garage berlin", "g")] == ["c"]
+
+
+def test_scores_survive_idf_refreshes():
+    index = SimilarityIndex()
+    for i in range(50):
+        index.add(f"k{i}", f"open shop number{i} downtown", "g")
+    (score, key, _), = index.search("open shop number7 downtown", "g", k=1)
+    assert key == "k7" and score == pytest.approx(1.0, abs=1e-3)
+
+
+@pytest.fixture
+def similar(monkeypatch, workflow_store):
+    index, workflows = SimilarityIndex(), WorkflowCache(path=None)
+    monkeypatch.setattr(api, "similarity_index", index)
+    monkeypatch.setattr(api, "workflow_cache", workflows)
+
+    def remember(key, prompt, steps, workflow_type="business_plan"):
+        request = api.WorkflowRequest(prompt=prompt, type=workflow_type)
+        workflows.set(key, {"nodes": [{"label": step} for step in steps]})
+        index.add(key, prompt, api.similarity_group(request, LLM))
+
+    return remember
+
+
+def find(prompt, **options):
+    return api.find_similar(api.WorkflowRequest(prompt=prompt, type="business_plan", **options), LLM)
+
+
+def test_near_duplicate_prompt_returns_the_cached_workflow(similar):
+    similar("k", "Open a bakery in Rome", ["Lease", "Bake"])
+    workflow, examples = find("open a bakery in rome please")
+    assert workflow == {"nodes": [{"label": "Lease"}, {"label": "Bake"}]} and examples == []
+    assert find("open a bakery in rome", use_cache=False)[0] is None
+
+
+def test_reordered_or_related_prompts_only_give_examples(similar):
+    similar("k", "migrate from mysql to postgres", ["Dump", "Load"])
+    workflow, examples = find("migrate from postgres to mysql")
+    assert workflow is None
+    assert len(examples) == 1 and "Dump" in examples[0]
+
+
+def test_saved_workflows_are_examples_and_stale_entries_are_dropped(similar, workflow_store):
+    saved = workflow_store.create({
+        "owner": "a", "name": "n", "workflow_type": "business_plan", "prompt": "open a bakery in rome",
+        "edges": [], "nodes": [{"id": "1", "label": "Find a lease"}],
+    })["id"]
+    api.index_saved_workflow(saved, "business_plan", "open a bakery in rome")
+    api.similarity_index.add("gone", "open a bakery in rome", api.similarity_group(
+        api.WorkflowRequest(prompt="", type="business_plan"), LLM
+    ))
+    workflow, examples = find("open a bakery in rome")
+    assert workflow is None  # saved workflows are never returned directly
+    assert len(examples) == 1 and "Find a lease" in examples[0]
+    assert len(api.similarity_index) == 1  # "gone" is no longer cached
+
+
+def test_sync_picks_up_what_other_workers_cached_or_saved(monkeypatch, workflow_store, tmp_path):
+    path = str(tmp_path / "cache.db")
+    ours, theirs = WorkflowCache(path=path), WorkflowCache(path=path)
+    monkeypatch.setattr(api, "similarity_index", SimilarityIndex())
+    monkeypatch.setattr(api, "workflow_cache", ours)
+    api.rebuild_similarity_index()
+    assert len(api.similarity_index) == 0
+
+    theirs.set("k", {"nodes": [{"label": "Lease"}]}, prompt="open a bakery in rome", group="business_plan")
+    saved = workflow_store.create({
+        "owner": "a", "name": "n", "workflow_type": "business_plan", "prompt": "migrate from mysql to postgres",
+        "edges": [], "nodes": [{"id": "1", "label": "Dump"}],
+    })["id"]
+    api.sync_similarity_index()
+    assert "k" in api.similarity_index and api.SAVED_KEY_PREFIX + saved in api.similarity_index
+
+    workflow_store.delete(saved)
+    api.sync_similarity_index()
+    assert "k" in api.similarity_index and api.SAVED_KEY_PREFIX + saved not in api.similarity_index
@@ -0,0 +1,77 @@
+import asyncio
+
+import orjson
+import pytest
+
+import api
+
+
+class FakeStream:
+    """Completion deltas as the LLM client streams them"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.finish_reason = "stop"
+
+    def __aiter__(self):
+        return self._deltas()
+
+    async def _deltas(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.fixture
+def remembered(monkeypatch):
+    cached = []
+
+    async def remember(request, llm_client, cache_key, workflow):
+        cached.append(cache_key)
+
+    monkeypatch.setattr(api, "remember_workflow", remember)
+    monkeypatch.setattr(api, "get_llm_client", lambda: None)
+    return cached
+
+
+def frames(completion, chunk=7):
+    async def run():
+        request = api.WorkflowRequest(prompt="p", type="business_plan")
+        stream = FakeStream([completion[i:i + chunk] for i in range(0, len(completion), chunk)])
+        return [orjson.loads(frame) async for frame in api.stream_workflow_frames(request, stream, "key", None)]
+
+    return asyncio.run(run())
+
+
+def test_complete_stream_is_cached(remembered):
+    sent = frames('{"nodes":[{"i":"1","l":"A"},{"i":"2","l":"B"}],"edges":[["1","2"]],"description":"d"}')
+    assert [frame["type"] for frame in sent] == ["node", "node", "edge", "description", "done"]
+    done = sent[-1]["data"]
+    assert not done["partial"] and done["skipped"] == 0
+    assert done["dependencies"] == {"1": [], "2": ["1"]}
+    assert remembered == ["key"]
+
+
+def test_duplicate_nodes_and_dangling_edges_are_skipped_and_not_cached(remembered):
+    sent = frames(
+        '{"nodes":[{"i":"1","l":"A"},{"i":"1","l":"again"},{"i":"2","l":"B"}],'
+        '"edges":[["1","2"],["2","9"]],"description":"d"}'
+    )
+    assert [frame["type"] for frame in sent] == ["node", "node", "edge", "description", "done"]
+    assert [frame["data"]["label"] for frame in sent if frame["type"] == "node"] == ["A", "B"]
+    done = sent[-1]["data"]
+    assert done["partial"] and done["skipped"] == 2
+    assert done["edge_count"] == 1
+    assert remembered == []
+
+
+def test_edge_before_its_node_is_sent_once_the_node_arrives(remembered):
+    sent = frames('{"edges":[["1","2"]],"nodes":[{"i":"1","l":"A"},{"i":"2","l":"B"}],"description":"d"}')
+    assert [frame["type"] for frame in sent] == ["node", "node", "edge", "description", "done"]
+    assert not sent[-1]["data"]["partial"]
+
+
+def test_undecodable_description_still_sends_the_nodes(remembered):
+    sent = frames('{"nodes":[{"i":"1","l":"A"}],"edges":[],"description":"bad \\q"}')
+    assert [frame["type"] for frame in sent] == ["node", "done"]
+    assert sent[-1]["data"]["partial"]
+    assert remembered == []
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from stream_parser import WorkflowStreamParser
+
+DOCUMENT = (
+    '```json\n{"nodes": [{"i": "1", "l": "Say \\"hi\\" \\\\ {not a brace} [x]", "c": 1500},'
+    '{"i": "2", "l": "caf\\u00e9", "r": ["A", "B"]}],'
+    ' "edges": [["1", "2"], ["1", "2", "next"]], "count": -12.5e1, "final": true,'
+    ' "description": "Ends with \\"quotes\\", commas, and }"}\n```'
+)
+EXPECTED = [
+    ("node", {"i": "1", "l": 'Say "hi" \\ {not a brace} [x]', "c": 1500}),
+    ("node", {"i": "2", "l": "café", "r": ["A", "B"]}),
+    ("edge", ["1", "2"]),
+    ("edge", ["1", "2", "next"]),
+    ("count", -125.0),
+    ("final", True),
+    ("description", 'Ends with "quotes", commas, and }'),
+]
+
+
+def parse(chunks):
+    parser = WorkflowStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def test_whole_document():
+    parser, events = parse([DOCUMENT])
+    assert events == EXPECTED
+    assert parser.complete
+
+
+@pytest.mark.parametrize("split", range(1, len(DOCUMENT)))
+def test_every_split_point(split):
+    """Two chunks split anywhere: inside strings, escapes, \\u sequences and scalars"""
+    parser, events = parse([DOCUMENT[:split], DOCUMENT[split:]])
+    assert events == EXPECTED
+    assert parser.complete
+
+
+def test_one_character_at_a_time_keeps_only_the_open_tail():
+    parser = WorkflowStreamParser()
+    events, longest = [], 0
+    for c in DOCUMENT:
+        events.extend(parser.feed(c))
+        longest = max(longest, len(parser.buffer))
+    assert events == EXPECTED
+    assert longest < len(DOCUMENT) / 3  # about the longest single item, not the whole document
+
+
+def test_events_arrive_as_soon_as_values_close():
+    parser = WorkflowStreamParser()
+    assert parser.feed('{"nodes": [{"i": "1", "l": "A"}') == [("node", {"i": "1", "l": "A"})]
+    assert parser.feed(', {"i": "2", "l": "B"') == []
+    assert parser.feed('}], "count": 4') == [("node", {"i": "2", "l": "B"})]
+    assert parser.feed("2") == []  # a scalar only ends at , or }
+    assert parser.feed("}") == [("count", 42)]
+    assert parser.complete
+
+
+def test_truncated_document_is_not_complete():
+    document = json.dumps({"nodes": [{"i": "1"}, {"i": "2"}], "description": "cut"})
+    parser, events = parse([document[:-12]])
+    assert events == [("node", {"i": "1"}), ("node", {"i": "2"})]
+    assert not parser.complete
@@ -0,0 +1,51 @@
+import orjson
+import pytest
+from pydantic import ValidationError
+
+from api import WorkflowResponse, invalid_output_exception, parse_generated_workflow
+from wire import expand_edges
+
+
+def nodes(*ids):
+    return [{"id": node_id, "dependencies": []} for node_id in ids]
+
+
+def test_expand_edges_links_dependencies_once():
+    graph = nodes("1", "2")
+    graph[1]["dependencies"].append("1")
+    edges = expand_edges(graph, [["1", "2"], ["1", "2", "again"]])
+    assert edges == [
+        {"id": "e1", "source": "1", "target": "2", "label": ""},
+        {"id": "e2", "source": "1", "target": "2", "label": "again"},
+    ]
+    assert graph[1]["dependencies"] == ["1"]
+
+
+@pytest.mark.parametrize("graph, edges, message", [
+    (nodes("1", "1"), [], "Duplicate node ids"),
+    (nodes("1", "2"), [["1", "9"]], "Edge e1 references an unknown node"),
+    (nodes("1", "2"), [["1", "2"], ["9", "2"]], "Edge e2 references an unknown node"),
+])
+def test_expand_edges_rejects_inconsistent_graphs(graph, edges, message):
+    with pytest.raises(ValueError, match=message):
+        expand_edges(graph, edges)
+
+
+def test_parse_validates_and_expands_in_one_pass():
+    workflow = parse_generated_workflow(b'{"nodes":[{"i":"1","l":"A","c":"12.5"},{"i":"2","l":"B"}],"edges":[["1","2"]],"description":"d"}')
+    assert workflow["nodes"][0]["estimated_cost"] == 12.5  # numeric strings are coerced
+    assert workflow["nodes"][1]["dependencies"] == ["1"]
+    assert WorkflowResponse(**workflow, workflow_type="t", created_at="", updated_at="").nodes[1].type == "task"
+
+
+def test_parse_errors_are_classified():
+    with pytest.raises(orjson.JSONDecodeError) as invalid_json:
+        parse_generated_workflow('{"nodes": [')
+    assert invalid_output_exception(invalid_json.value, "").detail.startswith("Failed to parse")
+
+    with pytest.raises(ValidationError):
+        parse_generated_workflow('{"nodes":[{"l":"no id"}],"edges":[],"description":""}')
+    with pytest.raises(ValidationError):
+        parse_generated_workflow('{"nodes":[],"edges":[["1"]],"description":""}')
+    with pytest.raises(ValueError, match="unknown node"):
+        parse_generated_workflow('{"nodes":[{"i":"1","l":"A"}],"edges":[["1","2"]],"description":""}')
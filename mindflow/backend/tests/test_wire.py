@@ -0,0 +1,51 @@
+import json
+from types import SimpleNamespace
+
+from api import WorkflowRequest, build_messages, parse_generated_workflow
+from wire import SYSTEM_PROMPT, WIRE_DEFAULTS, to_wire, wire_node_validator
+
+WORKFLOW = {
+    "nodes": [
+        {"id": "1", "label": "Research", "type": "start", "status": "Not Started", "notes": "",
+         "deadline": "2025-03-01", "resources": ["Analyst"], "dependencies": [],
+         "estimated_cost": 1500, "actual_cost": 0},
+        {"id": "2", "label": "Plan", "type": "task", "status": "In Progress", "notes": "Risks",
+         "deadline": None, "resources": [], "dependencies": ["1"], "estimated_cost": 0, "actual_cost": 40},
+        {"id": "3", "label": "Done", "type": "end", "status": "Not Started", "notes": "",
+         "deadline": None, "resources": [], "dependencies": ["1", "2"], "estimated_cost": 0, "actual_cost": 0},
+    ],
+    "edges": [
+        {"id": "e1", "source": "1", "target": "2", "label": ""},
+        {"id": "e2", "source": "2", "target": "3", "label": "approved"},
+    ],
+    "description": "A plan",
+}
+
+
+def test_wire_nodes_expand_keys_and_fill_defaults():
+    node = wire_node_validator.validate_python({"i": "7", "l": "Ship"})
+    assert node == {"id": "7", "label": "Ship", **WIRE_DEFAULTS}
+    other = wire_node_validator.validate_python({"i": "8", "l": "Test"})
+    other["resources"].append("QA")
+    assert node["resources"] == []  # list defaults are not shared
+
+
+def test_to_wire_leaves_out_defaults_and_edge_implied_dependencies():
+    wire = to_wire(WORKFLOW)
+    assert wire["nodes"][0] == {"i": "1", "l": "Research", "t": "start", "d": "2025-03-01", "c": 1500, "r": ["Analyst"]}
+    assert wire["nodes"][1] == {"i": "2", "l": "Plan", "s": "In Progress", "n": "Risks", "a": 40}
+    assert wire["nodes"][2] == {"i": "3", "l": "Done", "t": "end", "p": ["1"]}  # 2 -> 3 is an edge
+    assert wire["edges"] == [["1", "2"], ["2", "3", "approved"]]
+
+
+def test_wire_round_trip():
+    compact = json.dumps(to_wire(WORKFLOW), separators=(",", ":"))
+    assert parse_generated_workflow(compact) == WORKFLOW
+    assert len(compact) < len(json.dumps(WORKFLOW, separators=(",", ":"))) / 2
+
+
+def test_system_prompt_is_the_same_for_every_request():
+    first = build_messages(WorkflowRequest(prompt="open a bakery", type="business_plan"), SimpleNamespace(template="a"))
+    second = build_messages(WorkflowRequest(prompt="plan a wedding", type="timeline"), SimpleNamespace(template="b"))
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert "open a bakery" in first[1]["content"]
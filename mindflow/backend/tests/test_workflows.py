@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+from api import app
+
+client = TestClient(app)
+
+
+def workflow(name="Launch", nodes=("1", "2"), edges=(("1", "2"),)):
+    return {
+        "name": name,
+        "owner": "alice",
+        "workflow_type": "business_plan",
+        "nodes": [{"id": node_id, "label": f"Step {node_id}", "type": "task"} for node_id in nodes],
+        "edges": [{"id": f"e{i}", "source": s, "target": t} for i, (s, t) in enumerate(edges, start=1)],
+    }
+
+
+def test_save_load_replace_delete(workflow_store):
+    saved = client.post("/workflows", json=workflow())
+    assert saved.status_code == 201
+    workflow_id = saved.json()["id"]
+    assert saved.json()["version"] == 1 and saved.json()["node_count"] == 2
+
+    loaded = client.get(f"/workflows/{workflow_id}").json()
+    assert [node["id"] for node in loaded["nodes"]] == ["1", "2"]
+    assert loaded["edges"][0]["source"] == "1"
+
+    replaced = client.put(f"/workflows/{workflow_id}", json=workflow("Renamed", nodes=("1", "2", "3")))
+    assert replaced.json()["version"] == 2 and replaced.json()["node_count"] == 3
+    assert client.get(f"/workflows/{workflow_id}").json()["name"] == "Renamed"
+
+    assert client.delete(f"/workflows/{workflow_id}").status_code == 204
+    assert client.get(f"/workflows/{workflow_id}").status_code == 404
+    assert client.delete(f"/workflows/{workflow_id}").status_code == 404
+
+
+def test_list_is_paginated_newest_first(workflow_store):
+    for i in range(5):
+        client.post("/workflows", json=workflow(f"w{i}"))
+    first = client.get("/workflows", params={"limit": 2}).json()
+    assert [w["name"] for w in first["workflows"]] == ["w4", "w3"]
+    assert first["next_offset"] == 2
+    last = client.get("/workflows", params={"limit": 2, "offset": 4}).json()
+    assert [w["name"] for w in last["workflows"]] == ["w0"]
+    assert last["next_offset"] is None
+
+
+def test_duplicate_node_ids_are_rejected(workflow_store):
+    response = client.post("/workflows", json=workflow(nodes=("1", "1"), edges=()))
+    assert response.status_code == 422
+    assert "Duplicate node ids" in response.text
+
+    workflow_id = client.post("/workflows", json=workflow()).json()["id"]
+    response = client.put(f"/workflows/{workflow_id}", json=workflow(nodes=("1", "2", "2")))
+    assert response.status_code == 422
+    assert client.get(f"/workflows/{workflow_id}").json()["version"] == 1
+
+
+def test_edges_to_unknown_nodes_are_rejected(workflow_store):
+    response = client.post("/workflows", json=workflow(edges=(("1", "9"),)))
+    assert response.status_code == 422
+    assert "unknown node" in response.text
+    assert client.get("/workflows").json()["workflows"] == []
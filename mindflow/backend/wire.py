@@ -0,0 +1,131 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import Field, TypeAdapter
+from typing_extensions import Annotated, TypedDict
+
+# System prompt shared by every workflow generation request. It is a constant
+# (nothing request-specific, no indentation) so every request starts with the
+# same bytes and the provider's prompt cache can reuse it.
+SYSTEM_PROMPT = (
+    "You are a workflow designer. Reply with one JSON object describing a workflow diagram "
+    "for the user's request, in this compact format:\n"
+    '{"nodes":[{"i":"1","l":"Market research","t":"start","d":"2025-03-01","c":1500,"r":["Analyst"]},'
+    '{"i":"2","l":"Write the plan","d":"2025-03-15","c":800,"n":"Include a risk section"}],'
+    '"edges":[["1","2"]],"description":"string"}\n'
+    "Node keys: i id, l label, t type (start|task|end; omit for task), d deadline (YYYY-MM-DD), "
+    "c estimated cost (number), r resources, n notes. Omit keys without a value.\n"
+    "Edges are [source id, target id] or [source id, target id, label]; they define the order "
+    "of the steps, so do not list dependencies. Do not add whitespace outside strings."
+)
+
+# Wire key of each node field; the model is shown all but status, dependencies
+# and actual cost, which are accepted if it sends them anyway
+WIRE_KEYS = {
+    "id": "i",
+    "label": "l",
+    "type": "t",
+    "status": "s",
+    "notes": "n",
+    "deadline": "d",
+    "resources": "r",
+    "dependencies": "p",
+    "estimated_cost": "c",
+    "actual_cost": "a",
+}
+
+# Values the wire format leaves out because the backend fills them in
+WIRE_DEFAULTS = {
+    "type": "task",
+    "status": "Not Started",
+    "notes": "",
+    "deadline": None,
+    "resources": [],
+    "dependencies": [],
+    "estimated_cost": 0,
+    "actual_cost": 0,
+}
+
+
+# Validating into TypedDicts whose fields are aliased to the wire keys expands
+# the keys and fills in the defaults inside pydantic-core, in the same pass
+class WireNode(TypedDict):
+    id: Annotated[str, Field(alias="i")]
+    label: Annotated[str, Field(alias="l")]
+    type: Annotated[str, Field(alias="t", default=WIRE_DEFAULTS["type"])]
+    status: Annotated[str, Field(alias="s", default=WIRE_DEFAULTS["status"])]
+    notes: Annotated[str, Field(alias="n", default=WIRE_DEFAULTS["notes"])]
+    deadline: Annotated[Optional[str], Field(alias="d", default=WIRE_DEFAULTS["deadline"])]
+    resources: Annotated[List[str], Field(alias="r", default_factory=list)]
+    dependencies: Annotated[List[str], Field(alias="p", default_factory=list)]
+    estimated_cost: Annotated[float, Field(alias="c", default=WIRE_DEFAULTS["estimated_cost"])]
+    actual_cost: Annotated[float, Field(alias="a", default=WIRE_DEFAULTS["actual_cost"])]
+
+
+WireEdge = Annotated[List[str], Field(min_length=2, max_length=3)]  # [source, target(, label)]
+
+
+class WireWorkflow(TypedDict):
+    nodes: List[WireNode]
+    edges: List[WireEdge]
+    description: str
+
+
+wire_workflow_validator = TypeAdapter(WireWorkflow)
+wire_node_validator = TypeAdapter(WireNode)
+wire_edge_validator = TypeAdapter(WireEdge)
+
+
+def expand_edge(edge: List[str], index: int) -> Dict[str, Any]:
+    """Edge dict for the ``index``-th (1-based) wire edge"""
+    return {"id": f"e{index}", "source": edge[0], "target": edge[1], "label": edge[2] if len(edge) > 2 else ""}
+
+
+def expand_edges(nodes: List[Dict[str, Any]], edges: List[List[str]]) -> List[Dict[str, Any]]:
+    """Expand wire edges into edge dicts, checking that both endpoints exist
+    and adding each source to its target's dependencies, all in one pass.
+    Raises ValueError for duplicate node ids or edges to unknown nodes."""
+    dependencies = {node["id"]: node["dependencies"] for node in nodes}
+    if len(dependencies) != len(nodes):
+        raise ValueError("Duplicate node ids")
+    expanded = []
+    for index, edge in enumerate(edges, start=1):
+        source, target = edge[0], edge[1]
+        listed = dependencies.get(target)
+        if listed is None or source not in dependencies:
+            raise ValueError(f"Edge e{index} references an unknown node")
+        if source not in listed:
+            listed.append(source)
+        expanded.append({"id": f"e{index}", "source": source, "target": target, "label": edge[2] if len(edge) > 2 else ""})
+    return expanded
+
+
+def link_dependencies(dependencies: Dict[str, List[str]], pairs: Iterable[Tuple[str, str]]):
+    """Add the source of every (source, target) edge to its target's dependency list"""
+    for source, target in pairs:
+        listed = dependencies.get(target)
+        if listed is not None and source not in listed:
+            listed.append(source)
+
+
+def to_wire(workflow: Dict[str, Any]) -> Dict[str, Any]:
+    """A full workflow in the wire format: what the model would have sent for it"""
+    incoming: Dict[str, set] = {}
+    for edge in workflow["edges"]:
+        incoming.setdefault(edge["target"], set()).add(edge["source"])
+    nodes = []
+    for node in workflow["nodes"]:
+        implied = incoming.get(node["id"], set())
+        wire = {}
+        for field, key in WIRE_KEYS.items():
+            value = node.get(field, WIRE_DEFAULTS.get(field))
+            if field == "dependencies":
+                value = [dep for dep in value or [] if dep not in implied]
+            if field in WIRE_DEFAULTS and value in (WIRE_DEFAULTS[field], None):
+                continue
+            wire[key] = value
+        nodes.append(wire)
+    edges = [
+        [edge["source"], edge["target"], edge["label"]] if edge.get("label") else [edge["source"], edge["target"]]
+        for edge in workflow["edges"]
+    ]
+    return {"nodes": nodes, "edges": edges, "description": workflow["description"]}
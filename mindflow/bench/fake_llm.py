@@ -0,0 +1,167 @@
+"""Local stand-in for the OpenAI chat-completions API.
+
+Point the backend at it with ``OPENAI_BASE_URL=http://127.0.0.1:9000/v1``
+(any ``OPENAI_API_KEY`` works) to exercise it offline:
+
+    python fake_llm.py --latency 0.8 --nodes 15 --malformed-rate 0.05
+
+A prompt containing ``nodes=N`` overrides ``--nodes`` for that request.
+Replies longer than ``max_tokens`` (about four characters per token) stop
+with ``finish_reason="length"``; a follow-up request carrying the partial
+reply as an assistant message gets the rest of the same workflow.
+Workflows are sent in the backend's compact wire format. Requests for a
+phase outline (hierarchical generation) get ``--phases`` phases, each
+depending on the one before.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from typing import Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from workloads import synthetic_workflow
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from wire import to_wire  # noqa: E402
+
+NODES_PATTERN = re.compile(r"nodes=(\d+)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction applied to --latency")
+    parser.add_argument("--nodes", type=int, default=10, help="nodes per generated workflow")
+    parser.add_argument("--phases", type=int, default=4, help="phases per hierarchical outline")
+    parser.add_argument("--chunk-chars", type=int, default=40, help="characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="seconds between streamed chunks")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of truncated JSON replies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 replies")
+    return parser.parse_args(argv)
+
+
+def completion_text(messages, args, rng: random.Random) -> str:
+    # The workflow is seeded by the first user message, so a continuation sees the same reply
+    prompt = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+    match = NODES_PATTERN.search(prompt)
+    node_count = int(match.group(1)) if match else args.nodes
+    seed = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:4], "big")
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if '"phases"' in system:
+        text = json.dumps(synthetic_outline(args.phases), separators=(",", ":"))
+    else:
+        text = json.dumps(to_wire(synthetic_workflow(node_count, seed=seed)), separators=(",", ":"))
+    partial = "".join(m.get("content", "") for m in messages if m.get("role") == "assistant")
+    if partial:
+        return text[len(partial):] if text.startswith(partial) else text
+    if rng.random() < args.malformed_rate:
+        text = text[: rng.randrange(1, len(text))]
+    return text
+
+
+def synthetic_outline(phase_count: int):
+    phases = [
+        {
+            "id": f"phase{i}",
+            "name": f"Phase {i}",
+            "goal": f"Synthetic goal {i}",
+            "depends_on": [f"phase{i - 1}"] if i > 1 else [],
+        }
+        for i in range(1, phase_count + 1)
+    ]
+    return {"phases": phases, "description": f"Synthetic plan with {phase_count} phases"}
+
+
+def truncate(text: str, max_tokens) -> Tuple[str, str]:
+    """The reply cut to ``max_tokens`` and its finish_reason"""
+    if max_tokens and len(text) > max_tokens * 4:
+        return text[: max_tokens * 4], "length"
+    return text, "stop"
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    rng = random.Random()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(max(0.0, args.latency * (1 + rng.uniform(-args.jitter, args.jitter))))
+        if rng.random() < args.error_rate:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"retry-after": "1"},
+            )
+
+        text, finish_reason = truncate(completion_text(body.get("messages", []), args, rng), body.get("max_tokens"))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4")
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(text) // 4,
+                    "total_tokens": prompt_tokens + len(text) // 4,
+                },
+            }
+
+        def chunk(delta, finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for start in range(0, len(text), args.chunk_chars):
+                yield chunk({"content": text[start:start + args.chunk_chars]})
+                if args.chunk_delay:
+                    await asyncio.sleep(args.chunk_delay)
+            yield chunk({}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-4", "object": "model", "owned_by": "fake"}]}
+
+    return app
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Closed-loop load generator for the MindFlow backend.
+
+Runs ``--concurrency`` workers that keep issuing requests from a weighted
+mix of endpoints until ``--requests`` have been sent (or ``--duration``
+seconds have passed), then reports latency percentiles and throughput:
+
+    python loadgen.py --concurrency 32 --requests 500 --mix generate=2,types=1,health=1
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+ENDPOINTS = ("generate", "stream", "types", "health")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the MindFlow backend")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="total requests to send")
+    parser.add_argument("--duration", type=float, default=None, help="run for this many seconds instead")
+    parser.add_argument(
+        "--mix", default="generate=1,types=1,health=1",
+        help=f"endpoint weights, from: {', '.join(ENDPOINTS)}",
+    )
+    parser.add_argument("--type", default="business_plan", help="workflow type to generate")
+    parser.add_argument("--nodes", type=int, default=None, help="ask the fake LLM for this many nodes")
+    parser.add_argument("--cached", action="store_true", help="reuse one prompt so generations hit the cache")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def parse_mix(mix: str) -> Tuple[List[str], List[float]]:
+    names, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+async def call(client: httpx.AsyncClient, endpoint: str, args) -> int:
+    if endpoint in ("types", "health"):
+        response = await client.get("/workflow-types" if endpoint == "types" else "/health")
+        return response.status_code
+
+    prompt = "Benchmark workflow" if args.cached else f"Benchmark workflow {uuid.uuid4().hex}"
+    if args.nodes:
+        prompt += f" nodes={args.nodes}"
+    payload = {"prompt": prompt, "type": args.type}
+    if endpoint == "generate":
+        response = await client.post("/generate-workflow", json=payload)
+        return response.status_code
+
+    # Streamed generations count as failed when the last frame is an error
+    async with client.stream("POST", "/generate-workflow/stream", json=payload) as response:
+        last = None
+        async for line in response.aiter_lines():
+            if line:
+                last = line
+        if response.status_code == 200 and (last is None or json.loads(last)["type"] != "done"):
+            return 599
+        return response.status_code
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    names, weights = parse_mix(args.mix)
+    samples: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    remaining = args.requests
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    rng = random.Random()
+
+    def next_endpoint():
+        nonlocal remaining
+        if deadline is not None:
+            return rng.choices(names, weights)[0] if time.perf_counter() < deadline else None
+        if remaining <= 0:
+            return None
+        remaining -= 1
+        return rng.choices(names, weights)[0]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+
+        async def worker():
+            while True:
+                endpoint = next_endpoint()
+                if endpoint is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    status = await call(client, endpoint, args)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                samples[endpoint].append(time.perf_counter() - start)
+                statuses[endpoint][str(status)] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = {}
+    for endpoint in names:
+        latencies = sorted(samples[endpoint])
+        if not latencies:
+            continue
+        report[endpoint] = {
+            "requests": len(latencies),
+            "errors": sum(n for s, n in statuses[endpoint].items() if s != "200"),
+            "throughput_rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "statuses": dict(statuses[endpoint]),
+        }
+    report["total"] = {
+        "requests": sum(len(v) for v in samples.values()),
+        "elapsed_s": elapsed,
+        "throughput_rps": sum(len(v) for v in samples.values()) / elapsed,
+    }
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]]):
+    print(f"{'endpoint':<10} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for endpoint, row in report.items():
+        if endpoint == "total":
+            continue
+        print(
+            f"{endpoint:<10} {row['requests']:>6} {row['errors']:>6} {row['throughput_rps']:>8.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}  {row['statuses']}"
+        )
+    total = report["total"]
+    print(f"total: {total['requests']} requests in {total['elapsed_s']:.2f}s ({total['throughput_rps']:.1f} req/s)")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
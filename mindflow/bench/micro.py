@@ -0,0 +1,106 @@
+"""Micro-benchmarks for the per-workflow hot paths at growing graph sizes.
+
+Times JSON parsing, single-pass validation, orjson serialization, incremental stream parsing,
+layout, analytics and DOT generation (plus Graphviz rendering with
+``--render``) on synthetic workflows:
+
+    python micro.py --sizes 10,100,1000,10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import orjson
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "backend"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "frontend"))
+
+from workloads import synthetic_workflow  # noqa: E402
+from analytics import GraphAnalytics  # noqa: E402
+from api import parse_generated_workflow  # noqa: E402
+from diagram import build_digraph  # noqa: E402
+from layout import LayeredLayout, graph_pairs  # noqa: E402
+from stream_parser import WorkflowStreamParser  # noqa: E402
+from wire import to_wire  # noqa: E402
+
+# Chunk size used to replay a completion through the stream parser
+STREAM_CHUNK_CHARS = 64
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks over synthetic workflows")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma-separated node counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--render", action="store_true", help="also render SVG with the Graphviz dot binary")
+    parser.add_argument("--render-max-nodes", type=int, default=1000, help="skip rendering above this size")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # warm-up
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {"min_ms": min(runs) * 1000, "median_ms": statistics.median(runs) * 1000}
+
+
+def stream_parse(raw: str):
+    parser = WorkflowStreamParser()
+    for start in range(0, len(raw), STREAM_CHUNK_CHARS):
+        parser.feed(raw[start:start + STREAM_CHUNK_CHARS])
+    return parser
+
+
+def benchmarks(size: int, args) -> Dict[str, Callable[[], object]]:
+    workflow = synthetic_workflow(size)
+    raw = json.dumps(to_wire(workflow), separators=(",", ":"))  # as the model sends it
+    ids = [n["id"] for n in workflow["nodes"]]
+    pairs = graph_pairs(workflow["nodes"], workflow["edges"])
+    statuses = {n["id"]: n["status"] for n in workflow["nodes"]}
+    source = build_digraph(workflow["nodes"], workflow["edges"], statuses).source
+
+    cases = {
+        "json.loads": lambda: json.loads(raw),
+        "parse_validate": lambda: parse_generated_workflow(raw),
+        "serialize": lambda: orjson.dumps(workflow),
+        "stream_parse": lambda: stream_parse(raw),
+        "layout": lambda: LayeredLayout(ids, pairs),
+        "analytics": lambda: GraphAnalytics(workflow["nodes"], workflow["edges"]).report(),
+        "dot_source": lambda: build_digraph(workflow["nodes"], workflow["edges"], statuses).source,
+    }
+    if args.render and size <= args.render_max_nodes:
+        cases["dot_render_svg"] = lambda: subprocess.run(
+            ["dot", "-Tsvg"], input=source.encode("utf-8"), capture_output=True, timeout=600
+        )
+    return cases
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.render and shutil.which("dot") is None:
+        print("Graphviz 'dot' not found on PATH; skipping render benchmarks", file=sys.stderr)
+        args.render = False
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        for name, fn in benchmarks(size, args).items():
+            results.append({"nodes": size, "benchmark": name, **time_call(fn, args.repeat)})
+            if not args.json:
+                row = results[-1]
+                print(f"{size:>7} nodes  {name:<16} min {row['min_ms']:>10.3f} ms   median {row['median_ms']:>10.3f} ms")
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
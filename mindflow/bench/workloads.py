@@ -0,0 +1,48 @@
+import random
+from datetime import date, timedelta
+from typing import Any, Dict
+
+NODE_TYPES = ("task", "milestone", "decision")
+STATUSES = ("Not Started", "In Progress", "Completed")
+
+
+def synthetic_workflow(node_count: int, seed: int = 0, branching: float = 0.3) -> Dict[str, Any]:
+    """A workflow shaped like the model's output (no positions), with ``node_count`` nodes.
+
+    Nodes mostly follow a chain; with probability ``branching`` a node hangs
+    off a random earlier node instead, which gives the layout and analytics
+    code wide layers and parallel paths to work through.
+    """
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    nodes, edges = [], []
+    for i in range(1, node_count + 1):
+        node_id = str(i)
+        dependencies = []
+        if i > 1:
+            parent = rng.randint(max(1, i - 50), i - 1) if rng.random() < branching else i - 1
+            dependencies.append(str(parent))
+            edges.append({
+                "id": f"e{i}",
+                "source": str(parent),
+                "target": node_id,
+                "label": "then",
+            })
+        estimated = round(rng.uniform(100, 5000), 2)
+        nodes.append({
+            "id": node_id,
+            "label": f"Step {i}: {rng.choice(['Research', 'Design', 'Build', 'Review', 'Launch'])}",
+            "type": rng.choice(NODE_TYPES),
+            "status": rng.choice(STATUSES),
+            "notes": f"Synthetic step {i} of {node_count}",
+            "deadline": (start + timedelta(days=i)).isoformat(),
+            "resources": [f"team{i % 7}"],
+            "estimated_cost": estimated,
+            "actual_cost": round(estimated * rng.uniform(0.5, 1.5), 2),
+            "dependencies": dependencies,
+        })
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "description": f"Synthetic workflow with {node_count} steps",
+    }
@@ -0,0 +1,92 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Backend client configuration (overridable through the environment)
+BACKEND_URL = os.getenv("MINDFLOW_API_URL", "http://localhost:8000").rstrip("/")
+API_CONNECT_TIMEOUT = float(os.getenv("MINDFLOW_API_CONNECT_TIMEOUT", "3"))
+API_READ_TIMEOUT = float(os.getenv("MINDFLOW_API_READ_TIMEOUT", "30"))
+API_GENERATE_TIMEOUT = float(os.getenv("MINDFLOW_API_GENERATE_TIMEOUT", "90"))
+API_MAX_RETRIES = int(os.getenv("MINDFLOW_API_MAX_RETRIES", "3"))
+API_POOL_SIZE = int(os.getenv("MINDFLOW_API_POOL_SIZE", "10"))
+WORKFLOW_TYPES_TTL = int(os.getenv("MINDFLOW_WORKFLOW_TYPES_TTL", "300"))
+
+# Transient statuses worth retrying; only idempotent methods are retried on them
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+
+class APIClient:
+    """Keep-alive HTTP client for the MindFlow backend.
+
+    Every request has a connect and a read timeout. Failed connections are
+    retried with exponential backoff for every method (nothing was sent);
+    transient error statuses only for idempotent ones, honouring Retry-After.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BACKEND_URL,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        read_timeout: float = API_READ_TIMEOUT,
+        max_retries: int = API_MAX_RETRIES,
+        pool_size: int = API_POOL_SIZE,
+    ):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=max_retries,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(
+        self, method: str, path: str, timeout: Optional[Tuple[float, float]] = None, **kwargs
+    ) -> requests.Response:
+        return self.session.request(
+            method, f"{self.base_url}{path}", timeout=timeout or self.timeout, **kwargs
+        )
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def stream(self, path: str, **kwargs) -> requests.Response:
+        """POST with a streamed response; the read timeout applies between chunks"""
+        return self.request(
+            "POST", path, timeout=(self.timeout[0], API_GENERATE_TIMEOUT), stream=True, **kwargs
+        )
+
+
+@st.cache_resource
+def get_api_client() -> APIClient:
+    """Return the client shared by every session and rerun"""
+    return APIClient()
+
+
+@st.cache_data(ttl=WORKFLOW_TYPES_TTL, show_spinner=False)
+def get_workflow_types() -> List[Dict[str, Any]]:
+    """Workflow types offered by the backend (cached; failures are not cached)"""
+    response = get_api_client().get("/workflow-types")
+    response.raise_for_status()
+    return response.json()["workflow_types"]
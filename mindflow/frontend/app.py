@@ -1,14 +1,21 @@
 import streamlit as st
-import requests
 import json
-from graphviz import Digraph
 import sys, os
+import hashlib
+import time
 from datetime import datetime
 import pandas as pd
 
+from api_client import get_api_client, get_workflow_types
+from diagram import build_digraph, graph_structure_key, node_line
+
 # Add parent directory to Python path to access api module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+CURRENT_USER = "weiyu_li"
+STEP_STATUSES = ["Not Started", "In Progress", "Completed"]
+PAGE_SIZE = 50
+
 # Configure Streamlit page
 st.set_page_config(
     page_title="Workflow Creator",
@@ -31,13 +38,16 @@ if "workflow" not in st.session_state:
     st.session_state.step_details = {}
     st.session_state.node_positions = {}
     st.session_state.edge_labels = {}
+    st.session_state.workflow_id = None
+    st.session_state.workflow_version = None
+    st.session_state.saved_nodes = []
+    st.session_state.saved_name = ""
+    st.session_state.workflow_name = ""
+    st.session_state.workflow_type = "business_plan"
+    st.session_state.prompt = ""
 
-# Stub data (in a real app, load from DB or file)
-if "past_projects" not in st.session_state:
-    st.session_state.past_projects = [
-        {"id": "wf_001", "name": "T-Shirt Startup Plan", "created": "2025-05-01"},
-        {"id": "wf_002", "name": "Mobile App MVP", "created": "2025-05-07"},
-    ]
+if "projects_offset" not in st.session_state:
+    st.session_state.projects_offset = 0
 if "collaborators" not in st.session_state:
     st.session_state.collaborators = [
         {"username": "alice", "icon": None},
@@ -48,7 +58,7 @@ if "collaborators" not in st.session_state:
 # 2) Navbar
 # -----------------------
 def render_navbar():
-    cols = st.columns([1, 1, 1, 1, 6])
+    cols = st.columns([1, 1, 1, 1, 1, 5])
     with cols[0]:
         if st.button("👤", help="Profile", key="nav_profile"):
             st.session_state.page = "profile"
@@ -59,15 +69,250 @@ def render_navbar():
         if st.button("🤝", help="Collaborations", key="nav_collab"):
             st.session_state.page = "collaborations"
     with cols[3]:
+        if st.button("📊", help="Portfolio", key="nav_portfolio"):
+            st.session_state.page = "portfolio"
+    with cols[4]:
         if st.button("🔄", help="Workflow", key="nav_workflow"):
             st.session_state.page = "workflow"
-    # cols[4] is just a spacer
+    # cols[5] is just a spacer
 
 # -----------------------
 # 3) Page renderers
 # -----------------------
+def workflow_diagram(statuses):
+    """Digraph of the current workflow, memoized across reruns.
+
+    The DOT source is rebuilt only when the graph structure changes; a
+    status change rewrites just the affected node statements, and any
+    other edit (notes, costs, ...) reuses the cached source untouched.
+    """
+    cache = st.session_state.get("diagram")
+    if cache is None or cache["key"] != st.session_state.graph_key:
+        nodes = st.session_state.nodes
+        dot = build_digraph(nodes, st.session_state.edges, statuses)
+        cache = {
+            "key": st.session_state.graph_key,
+            "dot": dot,
+            "nodes": {n["id"]: n for n in nodes},
+            "lines": {n["id"]: i for i, n in enumerate(nodes)},
+            "statuses": dict(statuses),
+            "source": dot.source,
+        }
+        st.session_state.diagram = cache
+    elif statuses != cache["statuses"]:
+        for node_id, status in statuses.items():
+            if cache["statuses"].get(node_id) != status:
+                cache["dot"].body[cache["lines"][node_id]] = node_line(
+                    cache["nodes"][node_id], status
+                )
+        cache["statuses"] = dict(statuses)
+        cache["source"] = cache["dot"].source
+    return cache
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+def step_details_from_nodes(nodes):
+    """Per-step editor state (keyed by 1-based step number) from stored node fields"""
+    details = {}
+    for idx, n in enumerate(nodes, start=1):
+        details[str(idx)] = {
+            "name": n["label"],
+            "status": n.get("status") if n.get("status") in STEP_STATUSES else "Not Started",
+            "notes": n.get("notes") or "",
+            "deadline": parse_date(n.get("deadline")),
+            "resources": n.get("resources") or [],
+            "estimated_cost": float(n.get("estimated_cost") or 0.0),
+            "actual_cost": float(n.get("actual_cost") or 0.0),
+        }
+    return details
+
+def nodes_with_step_details():
+    """Session nodes with the user's step edits folded back into their fields"""
+    nodes = []
+    for idx, node in enumerate(st.session_state.nodes, start=1):
+        details = st.session_state.step_details.get(str(idx))
+        if details is None:
+            nodes.append(node)
+            continue
+        deadline = details["deadline"]
+        nodes.append({
+            **node,
+            "status": details["status"],
+            "notes": details["notes"],
+            "deadline": deadline.strftime("%Y-%m-%d") if deadline else None,
+            "resources": [r for r in details["resources"] if r.strip()],
+            "estimated_cost": details["estimated_cost"],
+            "actual_cost": details["actual_cost"],
+        })
+    return nodes
+
+def load_workflow(workflow):
+    """Make a workflow (generated or loaded from the store) the current one"""
+    st.session_state.nodes = workflow["nodes"]
+    st.session_state.edges = workflow["edges"]
+    st.session_state.graph_key = graph_structure_key(workflow["nodes"], workflow["edges"])
+    st.session_state.description = workflow.get("description", "")
+    st.session_state.step_details = step_details_from_nodes(workflow["nodes"])
+    st.session_state.current_step = 1
+    st.session_state.workflow_id = workflow.get("id")
+    st.session_state.workflow_version = workflow.get("version")
+    st.session_state.saved_nodes = workflow["nodes"] if workflow.get("id") else []
+    st.session_state.saved_name = workflow.get("name", "")
+    st.session_state.workflow_name = workflow.get("name", "")
+    st.session_state.workflow_type = workflow.get("workflow_type", "business_plan")
+    st.session_state.prompt = workflow.get("prompt", "")
+    st.session_state.workflow = True
+
+def node_deltas(saved_nodes, nodes):
+    """Changed fields of each node, compared with the last saved copy"""
+    saved = {n["id"]: n for n in saved_nodes}
+    deltas = []
+    for node in nodes:
+        before = saved.get(node["id"], {})
+        changed = {k: v for k, v in node.items() if k != "id" and before.get(k) != v}
+        if changed:
+            deltas.append({"id": node["id"], **changed})
+    return deltas
+
+def export_diagram(source, export_format):
+    """Render the diagram on the backend, which caches outputs by (DOT hash, format)"""
+    response = get_api_client().post(
+        "/render",
+        json={"dot": source, "format": export_format.lower()},
+    )
+    if response.status_code != 200:
+        raise RuntimeError(response.json().get("detail", response.text))
+    return {
+        "key": (hashlib.sha256(source.encode("utf-8")).hexdigest(), export_format),
+        "data": response.content,
+        "mime": response.headers.get("content-type"),
+    }
+
+def save_workflow():
+    """Save the current workflow to the backend store.
+
+    A workflow that is already stored under the same name only sends the
+    node fields that changed since the last save; anything else is written
+    in full.
+    """
+    nodes = nodes_with_step_details()
+    if (
+        st.session_state.workflow_id
+        and st.session_state.workflow_name == st.session_state.saved_name
+    ):
+        deltas = node_deltas(st.session_state.saved_nodes, nodes)
+        if deltas:
+            response = get_api_client().patch(
+                f"/workflows/{st.session_state.workflow_id}/nodes",
+                json={"version": st.session_state.workflow_version, "nodes": deltas},
+            )
+            if response.status_code == 409:
+                raise RuntimeError(response.json()["detail"])
+            response.raise_for_status()
+            st.session_state.workflow_version = response.json()["version"]
+            st.session_state.saved_nodes = nodes
+        return
+
+    payload = {
+        "name": st.session_state.workflow_name or "Untitled workflow",
+        "owner": CURRENT_USER,
+        "prompt": st.session_state.prompt,
+        "workflow_type": st.session_state.workflow_type,
+        "description": st.session_state.description,
+        "nodes": nodes,
+        "edges": st.session_state.edges,
+    }
+    if st.session_state.workflow_id:
+        response = get_api_client().put(
+            f"/workflows/{st.session_state.workflow_id}", json=payload
+        )
+    else:
+        response = get_api_client().post("/workflows", json=payload)
+    response.raise_for_status()
+    summary = response.json()
+    st.session_state.workflow_id = summary["id"]
+    st.session_state.workflow_version = summary["version"]
+    st.session_state.saved_nodes = nodes
+    st.session_state.saved_name = summary["name"]
+
+def stream_workflow(prompt, workflow_type, live_diagram, hierarchical=False):
+    """Generate a workflow through the streaming endpoint, drawing nodes and
+    edges into ``live_diagram`` as they arrive"""
+    nodes, edges, description, summary = [], [], "", {}
+    last_draw = 0.0
+    try:
+        with get_api_client().stream(
+            "/generate-workflow/stream",
+            json={"prompt": prompt, "type": workflow_type, "hierarchical": hierarchical},
+        ) as response:
+            if response.status_code != 200:
+                try:
+                    detail = response.json().get("detail", response.text)
+                except ValueError:
+                    detail = response.text
+                retry_after = response.headers.get("Retry-After")
+                if retry_after:
+                    detail = f"{detail} (try again in {retry_after} s)"
+                st.error(f"Failed to generate workflow: {detail}")
+                return
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                frame = json.loads(line)
+                if frame["type"] == "node":
+                    nodes.append(frame["data"])
+                elif frame["type"] == "edge":
+                    edges.append(frame["data"])
+                elif frame["type"] == "description":
+                    description = frame["data"]
+                elif frame["type"] == "error":
+                    st.error(f"Failed to generate workflow: {frame['data']['detail']}")
+                    return
+                elif frame["type"] == "done":
+                    summary = frame["data"]
+                    break
+                # Redraw at most a few times per second while the graph grows
+                if frame["type"] in ("node", "edge") and time.monotonic() - last_draw > 0.25:
+                    statuses = {str(n["id"]): n.get("status") for n in nodes}
+                    live_diagram.graphviz_chart(build_digraph(nodes, edges, statuses).source)
+                    last_draw = time.monotonic()
+    except Exception as e:
+        st.error(f"Error: {str(e)}")
+        return
+    finally:
+        live_diagram.empty()
+
+    # Node frames are sent before the edges exist; the final dependencies
+    # (derived from the edges) and layout positions arrive with "done"
+    dependencies, positions = summary.get("dependencies", {}), summary.get("positions", {})
+    for node in nodes:
+        node["dependencies"] = dependencies.get(node["id"], node.get("dependencies", []))
+        node["position"] = positions.get(node["id"], node.get("position"))
+
+    load_workflow({
+        "nodes": nodes,
+        "edges": edges,
+        "description": description,
+        "workflow_type": workflow_type,
+        "prompt": prompt,
+    })
+    if not summary:
+        st.warning(
+            "The stream ended before the workflow was finished; "
+            f"only the steps received so far ({len(nodes)}) were loaded"
+        )
+    elif summary.get("partial"):
+        st.warning("The workflow was generated incomplete; review it before saving")
+    else:
+        st.success("Workflow generated successfully!")
+
 def render_workflow_page():
     st.title("Workflow Visualization")
+    live_diagram = st.empty()
 
     # Sidebar form (the same “Generate Workflow” form you already had)
     with st.sidebar:
@@ -78,62 +323,34 @@ def render_workflow_page():
                 height=150,
                 help="Describe your business idea, target market, and growth plan",
             )
-            workflow_type = st.selectbox(
-                "Workflow Type",
-                ["Business Plan", "Project Timeline", "Process Flow", "Custom"],
+            try:
+                workflow_types = get_workflow_types()
+            except Exception as e:
+                workflow_types = []
+                st.error(f"Could not load workflow types: {str(e)}")
+            type_ids = {wt["name"]: wt["id"] for wt in workflow_types}
+            workflow_type = st.selectbox("Workflow Type", list(type_ids))
+            hierarchical = st.checkbox(
+                "Large multi-phase plan",
+                help="Outline the phases first, then generate them in parallel",
             )
             submitted = st.form_submit_button("Generate Workflow")
-            if submitted and prompt and workflow_type == "Business Plan":
-                try:
-                    response = requests.post(
-                        "http://localhost:8000/generate-workflow",
-                        json={"prompt": prompt, "type": workflow_type.lower()},
-                    )
-                    if response.status_code == 200:
-                        wf = response.json()
-                        st.session_state.nodes = wf.get("nodes", [])
-                        st.session_state.edges = wf.get("edges", [])
-                        st.session_state.description = wf.get("description", "")
-                        # Initialize step_details if empty
-                        if not st.session_state.step_details:
-                            for idx, n in enumerate(st.session_state.nodes, start=1):
-                                st.session_state.step_details[str(idx)] = {
-                                    "name": n["label"],
-                                    "status": "Not Started",
-                                    "notes": "",
-                                    "deadline": None,
-                                    "resources": [],
-                                    "estimated_cost": 0.0,
-                                    "actual_cost": 0.0,
-                                }
-                            st.session_state.current_step = 1
-                        st.session_state.workflow = True
-                        st.success("Workflow generated successfully!")
-                    else:
-                        st.error("Failed to generate workflow")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            if submitted and prompt and workflow_type:
+                stream_workflow(prompt, type_ids[workflow_type], live_diagram, hierarchical)
 
     if st.session_state.workflow:
-        dot = Digraph()
-        for node in st.session_state.nodes:
-            status = st.session_state.step_details[str(node["id"])]["status"]
-            color = (
-                "#FF0000"
-                if status == "Not Started"
-                else "#00FF00"
-                if status == "Completed"
-                else "#FFA500"
-            )
-            dot.node(node["id"], node["label"], style="filled", fillcolor=color)
-        for edge in st.session_state.edges:
-            dot.edge(edge["source"], edge["target"], label=edge.get("label", ""))
+        # step_details is keyed by 1-based step number, the diagram by node id
+        statuses = {
+            node["id"]: st.session_state.step_details[str(idx)]["status"]
+            for idx, node in enumerate(st.session_state.nodes, start=1)
+        }
+        diagram = workflow_diagram(statuses)
 
         st.subheader("Workflow Description")
         st.write(st.session_state.description)
 
         st.subheader("Workflow Diagram")
-        st.graphviz_chart(dot.source)
+        st.graphviz_chart(diagram["source"])
 
         # Current step controls
         current_step = str(st.session_state.current_step)
@@ -206,26 +423,28 @@ def render_workflow_page():
         # Export & Save
         with st.expander("Export Options"):
             export_format = st.selectbox("Export Format", ["PNG", "SVG", "PDF"])
+            export_key = (hashlib.sha256(diagram["source"].encode("utf-8")).hexdigest(), export_format)
             if st.button("Export"):
                 try:
-                    dot.format = export_format.lower()
-                    filename = f"workflow_{export_format.lower()}"
-                    dot.render(filename, view=True)
-                    st.success(f"Workflow exported as {filename}")
+                    st.session_state.export = export_diagram(diagram["source"], export_format)
                 except Exception as e:
                     st.error(f"Export failed: {str(e)}")
+            export = st.session_state.get("export")
+            if export and export["key"] == export_key:
+                st.download_button(
+                    f"Download {export_format}",
+                    data=export["data"],
+                    file_name=f"workflow.{export_format.lower()}",
+                    mime=export["mime"],
+                )
 
+        st.session_state.workflow_name = st.text_input(
+            "Workflow Name", value=st.session_state.workflow_name
+        )
         if st.button("Save Workflow"):
             try:
-                workflow_data = {
-                    "nodes": st.session_state.nodes,
-                    "edges": st.session_state.edges,
-                    "description": st.session_state.description,
-                    "step_details": st.session_state.step_details,
-                }
-                with open("workflow.json", "w") as f:
-                    json.dump(workflow_data, f)
-                st.success("Workflow saved successfully!")
+                save_workflow()
+                st.success(f"Workflow saved as `{st.session_state.workflow_id}`!")
             except Exception as e:
                 st.error(f"Error saving workflow: {str(e)}")
     else:
@@ -236,7 +455,7 @@ def render_profile_page():
     st.write("🛠 **Work in progress**: Show user’s avatar & profile details here.")
 
     st.subheader("👤 Personal Info")
-    st.text_input("Username", value="weiyu_li", disabled=True)
+    st.text_input("Username", value=CURRENT_USER, disabled=True)
     st.text_input("Email", value="weiyu@example.com", disabled=True)
     st.text_area("Bio", value="(User bio goes here)", disabled=True)
 
@@ -250,19 +469,140 @@ def render_business_ideas_page():
         "Type an ID below to load/edit a project."
     )
 
-    df = pd.DataFrame(st.session_state.past_projects)
+    try:
+        response = get_api_client().get(
+            "/workflows",
+            params={
+                "owner": CURRENT_USER,
+                "limit": PAGE_SIZE,
+                "offset": st.session_state.projects_offset,
+            },
+        )
+        response.raise_for_status()
+        page = response.json()
+    except Exception as e:
+        st.error(f"Could not load saved workflows: {str(e)}")
+        return
+
+    df = pd.DataFrame(
+        page["workflows"],
+        columns=["id", "name", "workflow_type", "node_count", "created_at", "updated_at"],
+    )
     st.dataframe(df, use_container_width=True)
 
+    p1, p2 = st.columns(2)
+    with p1:
+        if st.button("Previous Page", disabled=page["offset"] == 0):
+            st.session_state.projects_offset = max(0, page["offset"] - PAGE_SIZE)
+            st.experimental_rerun()
+    with p2:
+        if st.button("Next Page", disabled=page["next_offset"] is None):
+            st.session_state.projects_offset = page["next_offset"]
+            st.experimental_rerun()
+
     selected_id = st.text_input(
         "Enter the ID of the workflow you want to load/edit:",
         value="",
-        placeholder="e.g. wf_001",
+        placeholder="e.g. wf_3f2a9c1b7d4e",
     )
     if st.button("Load Project"):
-        if selected_id in [p["id"] for p in st.session_state.past_projects]:
-            st.success(f"Loading workflow `{selected_id}`… (not implemented yet)")
-        else:
+        if not selected_id.strip():
+            st.error("Please enter a workflow ID.")
+            return
+        try:
+            response = get_api_client().get(f"/workflows/{selected_id.strip()}")
+        except Exception as e:
+            st.error(f"Failed to load workflow: {str(e)}")
+            return
+        if response.status_code == 200:
+            load_workflow(response.json())
+            st.session_state.page = "workflow"
+            st.experimental_rerun()
+        elif response.status_code == 404:
             st.error("That ID does not exist.")
+        else:
+            st.error("Failed to load workflow")
+
+def render_portfolio_page():
+    st.title("Portfolio")
+    st.write("Progress, cost and deadlines across all saved workflows.")
+
+    f1, f2 = st.columns(2)
+    with f1:
+        scope = st.radio("Workflows", ["Mine", "Everyone's"], horizontal=True)
+    with f2:
+        try:
+            types = {t["name"]: t["id"] for t in get_workflow_types()}
+        except Exception:
+            types = {}
+        type_name = st.selectbox("Workflow type", ["All types", *types])
+    params = {}
+    if scope == "Mine":
+        params["owner"] = CURRENT_USER
+    if type_name != "All types":
+        params["workflow_type"] = types[type_name]
+
+    try:
+        response = get_api_client().get("/portfolio/analytics", params=params)
+        response.raise_for_status()
+        report = response.json()
+    except Exception as e:
+        st.error(f"Could not load portfolio analytics: {str(e)}")
+        return
+
+    totals = report["totals"]
+    if not totals["workflows"]:
+        st.info("No saved workflows yet.")
+        return
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Workflows", totals["workflows"], f"{totals['steps']} steps", delta_color="off")
+    m2.metric("Completion", f"{totals['completion_rate']:.0%}")
+    m3.metric("Overdue steps", totals["overdue_steps"])
+    variance = totals["cost_variance_pct"]
+    m4.metric(
+        "Cost variance",
+        f"${totals['cost_variance']:,.0f}",
+        f"{variance:+.0%}" if variance is not None else None,
+        delta_color="inverse",
+    )
+
+    type_names = {type_id: name for name, type_id in types.items()}
+    by_type = pd.DataFrame(report["by_type"])
+    by_type["workflow_type"] = by_type["workflow_type"].map(lambda t: type_names.get(t, t))
+    by_type = by_type.set_index("workflow_type")
+    st.subheader("By workflow type")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.caption("Completion rate")
+        st.bar_chart(by_type["completion_rate"])
+    with c2:
+        st.caption("Estimated vs. actual cost")
+        st.bar_chart(by_type[["estimated_cost", "actual_cost"]])
+    st.dataframe(
+        by_type[[
+            "workflows", "steps", "completed", "overdue_steps", "over_budget_steps",
+            "estimated_cost", "actual_cost", "cost_variance",
+        ]],
+        use_container_width=True,
+    )
+
+    points = report["burndown"]["points"]
+    if points:
+        st.subheader("Deadline burn-down")
+        st.caption(
+            f"Steps still planned after each {report['burndown']['bucket_days']}-day period "
+            "and steps due by then that are not completed"
+        )
+        burndown = pd.DataFrame(points).set_index("date")
+        st.line_chart(burndown[["remaining", "open_due"]])
+
+    if report["overdue_workflows"]:
+        st.subheader("Most overdue workflows")
+        st.dataframe(
+            pd.DataFrame(report["overdue_workflows"]),
+            use_container_width=True,
+            hide_index=True,
+        )
 
 def render_collaborations_page():
     st.title("Collaborations")
@@ -317,6 +657,8 @@ elif st.session_state.page == "profile":
     render_profile_page()
 elif st.session_state.page == "business_ideas":
     render_business_ideas_page()
+elif st.session_state.page == "portfolio":
+    render_portfolio_page()
 elif st.session_state.page == "collaborations":
     render_collaborations_page()
 else:
@@ -0,0 +1,41 @@
+import hashlib
+import json
+
+from graphviz import Digraph, quoting
+
+
+def status_color(status):
+    return (
+        "#FF0000"
+        if status == "Not Started"
+        else "#00FF00"
+        if status == "Completed"
+        else "#FFA500"
+    )
+
+
+def build_digraph(nodes, edges, statuses):
+    dot = Digraph()
+    for node in nodes:
+        color = status_color(statuses.get(str(node["id"]), "Not Started"))
+        dot.node(node["id"], node["label"], style="filled", fillcolor=color)
+    for edge in edges:
+        dot.edge(edge["source"], edge["target"], label=edge.get("label", ""))
+    return dot
+
+
+def graph_structure_key(nodes, edges):
+    """Hash of everything in the diagram except node statuses"""
+    payload = json.dumps([
+        [(n["id"], n["label"]) for n in nodes],
+        [(e["source"], e["target"], e.get("label", "")) for e in edges],
+    ])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def node_line(node, status):
+    """DOT statement for one node, in the same form Digraph.node writes"""
+    attrs = quoting.attr_list(
+        node["label"], {"fillcolor": status_color(status), "style": "filled"}
+    )
+    return f"\t{quoting.quote(node['id'])}{attrs}\n"
@@ -16,12 +16,49 @@ echo "Installing frontend dependencies..."
 pip install -r mindflow/frontend/requirements.txt
 
 # 4. Start the FastAPI backend in the background
-echo "Starting FastAPI backend..."
+#    ./start.sh --prod (or MINDFLOW_MODE=production) runs one pre-forked worker per
+#    core (MINDFLOW_WORKERS) sharing the cache and token budgets through SQLite files;
+#    the default development mode runs a single auto-reloading worker.
+if [ "$1" = "--prod" ]; then
+    MINDFLOW_MODE=production
+fi
 cd mindflow/backend
-uvicorn api:app --reload --host 0.0.0.0 --port 8000 &
+if [ "$MINDFLOW_MODE" = "production" ]; then
+    export MINDFLOW_CACHE_PATH="${MINDFLOW_CACHE_PATH:-$PWD/cache.db}"
+    export MINDFLOW_STATE_PATH="${MINDFLOW_STATE_PATH:-$PWD/state.db}"
+    WORKERS="${MINDFLOW_WORKERS:-$(nproc 2>/dev/null || echo 2)}"
+    echo "Starting FastAPI backend ($WORKERS workers)..."
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers "$WORKERS" --no-access-log &
+else
+    echo "Starting FastAPI backend..."
+    uvicorn api:app --reload --host 0.0.0.0 --port 8000 &
+fi
+BACKEND_PID=$!
+trap 'kill $BACKEND_PID 2>/dev/null' EXIT
 
-# 5. Give the backend a moment to spin up
-sleep 2
+# 5. Wait until the backend reports ready (a failed warm-up, e.g. without
+#    OPENAI_API_KEY, answers "Startup failed" and never recovers)
+READY=0
+READY_BODY=""
+for _ in $(seq 1 120); do
+    if READY_BODY=$(curl -sf http://localhost:8000/ready); then
+        READY=1
+        break
+    fi
+    READY_BODY=$(curl -s http://localhost:8000/ready)
+    if ! kill -0 "$BACKEND_PID" 2>/dev/null; then
+        echo "The backend failed to start." >&2
+        exit 1
+    fi
+    case "$READY_BODY" in
+        *"Startup failed"*) break ;;
+    esac
+    sleep 0.5
+done
+if [ "$READY" != 1 ]; then
+    echo "The backend did not become ready: ${READY_BODY:-no response from /ready}" >&2
+    exit 1
+fi
 
 # 6. Start the Streamlit frontend
 echo "Starting Streamlit frontend..."